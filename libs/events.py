@@ -0,0 +1,204 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# Timestamp external events (rising edges on a spare GPIO) against the IRIG
+# timebase, as frame index and offset into the frame.
+#
+# 'event_stamp' runs at the CPU clock and counts X down, 2 clocks per count
+# whether the pin is high or low - so an edge is resolved to 1 count
+# (16.7ns at 120MHz), like the precision trigger. At each rising edge X is
+# pushed, which costs the counter 1 count. X wraps every ~72s (at 120MHz),
+# which is silent whilst the pin is high, but falls into the push whilst low
+# - pushing 0xffffffff and costing 1 extra clock. So the number of wraps is
+# resolved from 'ticks_us()', and the markers only count the extra clocks.
+#
+# The count is tied to the IRIG timebase by first pointing the SM's jmp pin
+# at the DCLS output (GPIO6): its first rising edge is a bit boundary, which
+# one is known from 'ticks_us()' to well within half a bit. The jmp pin is
+# then switched to the event pin. Everything runs from the same (10MHz
+# disciplined) clock, so there is no drift to correct afterwards.
+#
+# Events are kept in a ring buffer, and streamed to the host as binary
+# telemetry records (kind 2, see 'libs/telemetry.py'):
+#   u32 frame index (0 = first frame after the trigger)
+#   u32 offset into the frame (ns)
+#   u16 sequence, u8 pin, u8 flags (bit 0: events were lost before this)
+
+import rp2
+import utime
+from array import array
+from machine import Pin, mem32
+
+KIND_EVENTS = 2
+EVENT_RECORD = "<IIHBB"
+EVENT_LOST = 0x01
+EVENT_WRAP = 0xffffffff
+
+SM_EXECCTRL_JMP_PIN = 0x1f000000
+
+
+@rp2.asm_pio(in_shiftdir=rp2.PIO.SHIFT_LEFT, autopush=True, push_thresh=32,
+             fifo_join=rp2.PIO.JOIN_RX)
+
+def event_stamp():
+    wrap_target()
+    label("low")
+    jmp(pin, "rise")                # 2 clocks per count whilst low
+    jmp(x_dec, "low")
+    label("rise")                   # also when X wraps, pushing 0xffffffff
+    in_(x, 32)
+    label("high")
+    jmp(x_dec, "still")             # 2 clocks per count whilst high
+    label("still")
+    jmp(pin, "high")
+    wrap()
+
+
+class EventStamper:
+    def __init__(self, sm, execctrl, fdebug, flag, pin, cpu_freq, irig_freq, \
+                    ref_pin=6, size=256):
+        # 'execctrl'/'fdebug' registers of the SM, and its 'flag' (1 << sm)
+        self.sm = sm
+        self.execctrl = execctrl
+        self.fdebug = fdebug
+        self.flag = flag
+        self.pin = pin
+        self.ref_pin = ref_pin
+
+        self.cpu_freq = cpu_freq
+        self.bit_clocks = cpu_freq * 10 // irig_freq
+        self.frame_clocks = self.bit_clocks * 100
+        # DCLS is a copy of the encoder's output, 1 SM clock late
+        self.ref_delay = cpu_freq // (irig_freq * 12)
+
+        # ring of (frame, offset ns, sequence, flags)
+        self.size = size
+        self.frames = array("I", [0] * size)
+        self.offsets = array("I", [0] * size)
+        self.seqs = array("H", [0] * size)
+        self.flags = array("B", [0] * size)
+        self.head = 0
+        self.tail = 0
+
+        self.ref = None                 # clocks at the reference X
+        self.ref_x = 0
+        self.est = 0                    # counts since the reference, from ticks
+        self.est_us = 0
+        self.wraps = 0                  # markers, ie. extra clocks
+        self.events = 0
+        self.lost = 0
+        self.pending_lost = 0
+
+    def _jmp_pin(self, pin):
+        mem32[self.execctrl] = (mem32[self.execctrl] & ~SM_EXECCTRL_JMP_PIN) | \
+                (pin << 24)
+
+    def start(self, frame0_us, timeout_ms=100):
+        # capture a DCLS rising edge, 'frame0_us' being the ticks_us() of the
+        # start of frame 0 (ie. when the precision handler fired)
+        self._jmp_pin(self.ref_pin)
+        mem32[self.fdebug] = self.flag
+        ref = Pin(self.ref_pin)
+
+        # start whilst DCLS is low, just after a falling edge (at least 0.2
+        # bit to the next rising), otherwise the first push is not an edge
+        start = utime.ticks_ms()
+        last = 0
+        while True:
+            level = ref.value()
+            if last and not level:
+                break
+            last = level
+            if utime.ticks_diff(utime.ticks_ms(), start) > timeout_ms:
+                raise OSError("no DCLS edge for event reference")
+            utime.sleep_us(1)
+        self.sm.active(1)
+
+        # X starts at 0, so there may be a wrap marker first
+        x = EVENT_WRAP
+        while x == EVENT_WRAP:
+            while not self.sm.rx_fifo():
+                if utime.ticks_diff(utime.ticks_ms(), start) > timeout_ms:
+                    self.sm.active(0)
+                    raise OSError("no DCLS edge for event reference")
+                utime.sleep_us(1)
+            seen = utime.ticks_us()
+            x = self.sm.get()
+        self._jmp_pin(self.pin)
+
+        # which bit boundary, from the CPU's time
+        bit_us = self.bit_clocks * 1000000 // self.cpu_freq
+        bits = (utime.ticks_diff(seen, frame0_us) + (bit_us // 2)) // bit_us
+        self.ref = (bits * self.bit_clocks) + self.ref_delay
+        self.ref_x = x
+        self.est = 0
+        self.est_us = seen
+
+    def poll(self):
+        # read any timestamps into the ring, returns the count
+        if mem32[self.fdebug] & self.flag:
+            # RX FIFO was full, the counter stalled so the timebase is lost
+            mem32[self.fdebug] = self.flag
+            self.lost += 1
+            self.pending_lost = EVENT_LOST
+
+        # approximate counts, advanced in steps as 'ticks_us()' wraps
+        now = utime.ticks_us()
+        self.est += utime.ticks_diff(now, self.est_us) * self.cpu_freq // 2000000
+        self.est_us = now
+
+        count = 0
+        while self.sm.rx_fifo():
+            x = self.sm.get()
+            if x == EVENT_WRAP:
+                self.wraps += 1
+                continue
+
+            # counts since the reference, the whole wraps of X being the
+            # nearest to the estimate
+            counts = (self.ref_x - x) & 0xffffffff
+            counts += ((self.est - counts + 0x80000000) >> 32) << 32
+
+            # each push (reference included) costs 1 count, markers 1 clock
+            self.events += 1
+            clocks = self.ref + (counts * 2) + (self.events * 2) + self.wraps
+
+            if (self.head - self.tail) % (self.size * 2) >= self.size:
+                self.tail = (self.tail + 1) % (self.size * 2)
+                self.pending_lost = EVENT_LOST
+            i = self.head % self.size
+            self.frames[i] = clocks // self.frame_clocks
+            self.offsets[i] = ((clocks % self.frame_clocks) * 1000000000) // self.cpu_freq
+            self.seqs[i] = self.events & 0xffff
+            self.flags[i] = self.pending_lost
+            self.pending_lost = 0
+            self.head = (self.head + 1) % (self.size * 2)
+            count += 1
+        return count
+
+    def pending(self):
+        return (self.head - self.tail) % (self.size * 2)
+
+    def get(self):
+        # oldest event as (frame, offset ns, sequence, pin, flags), or None
+        if self.head == self.tail:
+            return None
+        i = self.tail % self.size
+        self.tail = (self.tail + 1) % (self.size * 2)
+        return (self.frames[i], self.offsets[i], self.seqs[i], self.pin, \
+                self.flags[i])
+
+    def stream(self, telemetry):
+        # everything in the ring, as telemetry records
+        e = self.get()
+        while e:
+            telemetry.add(*e)
+            e = self.get()
+
+    def report(self):
+        print("Events: %d on GPIO%d, %d pending, %d lost, %d wraps" % \
+                (self.events, self.pin, self.pending(), self.lost, self.wraps))
@@ -0,0 +1,242 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# Time labelling of the GPS(DO) 1PPS. The PPS edge marks the start of a
+# second, but which second is only known from the NMEA sentence (RMC or
+# ZDA) which arrives some time afterwards.
+#
+# PPS edges are timestamped (ticks_us) by a hard IRQ, NMEA sentences are
+# timestamped as their '$' is read from the UART. The IRQ is paused whilst
+# the precision handler is armed, as both would be serviced on the same
+# edge - the edge it triggers on is stamped by the handler instead. Each sentence is matched
+# to the latest PPS edge before it (within 'window_ms'), and the time it
+# carries becomes that edge's label - with 'describes=1' for receivers
+# which report the time of the *next* PPS.
+#
+# From the last labelled edge, the label of any other edge (ie. the next
+# one, when arming the IRIG trigger) follows by counting seconds.
+#
+# Inconsistent labels (ie. a label that does not follow from the previous
+# one) and encoder checks which disagree are counted as mismatches, and the
+# NMEA-after-PPS latency is tracked.
+#
+# Reading the UART allocates nothing (fixed buffers, 'readinto()'), but each
+# complete sentence does: the labels are UTC seconds since 1970, a long int on
+# the Pico, and the latency stats are floats. So 'pico-irig.py' exempts
+# 'poll()' from the GC-free frame loop alarm (see 'libs/heap.py'), counting
+# its allocations separately.
+
+import utime
+from array import array
+from machine import Pin
+
+from libs.stats import Stats
+
+RING = 8
+NMEA_MAX = 96                   # bytes, a sentence is at most 82
+UART_CHUNK = 32
+
+
+def nmea_checksum(line):
+    # 'line' is the text between '$' and '*'
+    c = 0
+    for ch in line:
+        c ^= ord(ch)
+    return c
+
+
+def nmea_time(sentence):
+    # UTC seconds from a RMC or ZDA sentence, or None if not valid
+    sentence = sentence.strip()
+    if not sentence.startswith("$") or "*" not in sentence:
+        return None
+    body, cs = sentence[1:].split("*", 1)
+    try:
+        if nmea_checksum(body) != int(cs[:2], 16):
+            return None
+    except ValueError:
+        return None
+
+    f = body.split(",")
+    kind = f[0][2:]
+    try:
+        if kind == "RMC" and len(f) > 9 and f[2] == "A":
+            hms, dmy = f[1], f[9]
+            year = 2000 + int(dmy[4:6])
+            month, day = int(dmy[2:4]), int(dmy[0:2])
+        elif kind == "ZDA" and len(f) > 4 and f[4]:
+            hms = f[1]
+            year, month, day = int(f[4]), int(f[3]), int(f[2])
+        else:
+            return None
+        hour, minute, sec = int(hms[0:2]), int(hms[2:4]), int(hms[4:6])
+    except (ValueError, IndexError):
+        return None
+
+    return utime.mktime((year, month, day, hour, minute, sec, 0, 0))
+
+
+class GPSTime:
+    def __init__(self, uart, pps=18, rising=True, describes=0, window_ms=1000):
+        self.uart = uart
+        self.describes = describes
+        self.window_us = window_ms * 1000
+
+        # PPS edges, filled by hard IRQ so pre-allocated
+        self.edges = array("i", [0] * RING)
+        self.edge_count = 0
+        self.pin = Pin(pps)
+        self.trigger = Pin.IRQ_RISING if rising else Pin.IRQ_FALLING
+        self.resume()
+
+        self.chunk = bytearray(UART_CHUNK)
+        self.line = bytearray(NMEA_MAX)
+        self.length = 0
+        self.line_us = 0
+        self.encoder = None             # [seconds, edge] of the encoder
+
+        self.last_label = None          # (UTC seconds, edge ticks_us)
+        self.labels = 0
+        self.mismatches = 0
+        self.unmatched = 0
+        self.latency = Stats()          # NMEA after PPS, in us
+
+    def _pps(self, pin):
+        self.edges[self.edge_count % RING] = utime.ticks_us()
+        self.edge_count += 1
+
+    def pause(self):
+        # no IRQ, whilst the precision handler is armed
+        self.pin.irq(None)
+
+    def resume(self, stamp=None):
+        # IRQ again, adding the edge the precision handler stamped
+        if stamp is not None:
+            self.edges[self.edge_count % RING] = stamp
+            self.edge_count += 1
+        self.pin.irq(self._pps, self.trigger, hard=True)
+
+    def last_edge(self, before=None):
+        # ticks_us of the latest PPS edge (before 'before'), or None
+        for i in range(min(self.edge_count, RING)):
+            t = self.edges[(self.edge_count - 1 - i) % RING]
+            if before is None or utime.ticks_diff(before, t) >= 0:
+                return t
+        return None
+
+    def poll(self):
+        # read the UART, returns the label if a new one was assigned
+        label = None
+        while self.uart.any():
+            n = self.uart.readinto(self.chunk)
+            if not n:
+                break
+            for i in range(n):
+                b = self.chunk[i]
+                if b == 0x24:                   # '$', start of sentence
+                    self.length = 0
+                    self.line_us = utime.ticks_us()
+                if self.length < NMEA_MAX:
+                    self.line[self.length] = b
+                    self.length += 1
+                if b == 0x0a:                   # '\n', end
+                    l = self._sentence(bytes(self.line[:self.length]), \
+                            self.line_us)
+                    if l is not None:
+                        label = l
+                    self.length = 0
+        return label
+
+    def _sentence(self, line, arrived):
+        try:
+            t = nmea_time(line.decode())
+        except UnicodeError:
+            return None
+        if t is None:
+            return None
+
+        edge = self.last_edge(arrived)
+        if edge is None or utime.ticks_diff(arrived, edge) > self.window_us:
+            self.unmatched += 1
+            return None
+        if self.last_label and self.last_label[1] == edge:
+            return None                         # already labelled, ie. RMC + ZDA
+
+        label = t - self.describes
+        self.latency.add(utime.ticks_diff(arrived, edge))
+
+        # does this follow on from the previous label?
+        if self.last_label and self.label(edge) != label:
+            self.mismatches += 1
+            print("GPS: label %d does not follow %d" % (label, self.label(edge)))
+
+        self.last_label = (label, edge)
+        self.labels += 1
+
+        if self.encoder:
+            # advance the encoder's time to this edge, and compare
+            n = self._seconds(utime.ticks_diff(edge, self.encoder[1]))
+            self.encoder = [self.encoder[0] + n, edge]
+            self.check(self.encoder[0], edge)
+        return label
+
+    def _seconds(self, dt):
+        # whole seconds, rounded, from a ticks_us difference
+        if dt >= 0:
+            return (dt + 500000) // 1000000
+        return -((500000 - dt) // 1000000)
+
+    def locked(self):
+        return self.last_label is not None
+
+    def label(self, edge):
+        # UTC seconds for the PPS edge at ticks_us 'edge'
+        seconds, t = self.last_label
+        return seconds + self._seconds(utime.ticks_diff(edge, t))
+
+    def next_edge(self, now=None):
+        # (label, ticks_us due) of the next PPS edge after 'now'
+        if now is None:
+            now = utime.ticks_us()
+        seconds, t = self.last_label
+        n = utime.ticks_diff(now, t) // 1000000 + 1
+        return (seconds + n, utime.ticks_add(t, n * 1000000))
+
+    def safe_to_arm(self, margin_ms=100):
+        # not too close to a PPS edge, so the next edge is the one expected
+        now = utime.ticks_us()
+        due = self.next_edge(now)[1]
+        last = utime.ticks_add(due, -1000000)
+        return utime.ticks_diff(now, last) > margin_ms * 1000 and \
+                utime.ticks_diff(due, now) > margin_ms * 1000
+
+    def seed(self, seconds, edge):
+        # The encoder started at PPS 'edge' with time 'seconds', which is
+        # then checked against every following label. Returns the correct
+        # time for 'edge'.
+        self.encoder = [seconds, edge]
+        if self.last_label is None or self.check(seconds, edge):
+            return seconds
+        self.encoder[0] = self.label(edge)
+        return self.encoder[0]
+
+    def check(self, seconds, edge):
+        # check the encoder's time for the PPS edge at 'edge'
+        if self.last_label is None:
+            return True
+        if self.label(edge) != seconds:
+            self.mismatches += 1
+            print("GPS: encoder %d, GPS %d" % (seconds, self.label(edge)))
+            return False
+        return True
+
+    def report(self):
+        s = self.latency
+        print("GPS: %d labels, %d mismatches, %d unmatched, latency %.1f/%.1f/%.1f ms (min/mean/max) sigma %.2f ms" % \
+                (self.labels, self.mismatches, self.unmatched, \
+                (s.min or 0) / 1000, s.mean / 1000, (s.max or 0) / 1000, \
+                s.sigma() / 1000))
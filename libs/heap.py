@@ -0,0 +1,112 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# GC-free steady state. MicroPython collects when an allocation finds the heap
+# full, which is whenever the small allocations (ie. 'print()') add up to it -
+# and a collection at the wrong moment can take longer than the refill slack
+# of an IRIG-A frame. So once running the automatic GC is disabled, and the
+# heap is collected right after each frame is pushed to the FIFO, when there
+# is a whole frame of slack.
+#
+# With the GC disabled nothing is freed between collections, so the heap used
+# since the last one is the allocations of that frame. The frame loop should
+# allocate nothing, so after the first few frames (warming up) an allocation
+# raises the alarm - frames with the periodic reports are expected to, and
+# are not counted. Work which is known to allocate (ie. parsing a GPS
+# sentence) is bracketed by 'mark()'/'exempt()', and counted separately.
+#
+# Per frame records can be streamed as binary telemetry (kind 3, see
+# 'libs/telemetry.py'):
+#   u32 frame index
+#   u32 free heap (bytes), after the collection
+#   u16 collection time (us, capped)
+#   u16 allocated since the previous collection (bytes, capped)
+
+import gc
+import struct
+import utime
+
+KIND_HEAP = 3
+HEAP_RECORD = "<IIHH"
+HEAP_WARMUP = 10                # frames before allocations raise the alarm
+
+
+class HeapMonitor:
+    def __init__(self, warmup=HEAP_WARMUP, telemetry=None):
+        self.warmup = warmup
+        self.telemetry = telemetry
+        self.frames = 0
+        self.collect_us = 0
+        self.collect_max = 0
+        self.alloc = 0
+        self.alloc_max = 0
+        self.exempted = 0               # since the last collection
+        self.exempt_max = 0
+        self.free = 0
+        self.free_min = None
+        self.alarms = 0
+        self.alarm_frame = None
+
+    def start(self):
+        gc.collect()
+        gc.disable()
+        self.used = gc.mem_alloc()
+        self.free = self.free_min = gc.mem_free()
+
+    def stop(self):
+        gc.enable()
+
+    def mark(self):
+        return gc.mem_alloc()
+
+    def exempt(self, mark):
+        # allocations since 'mark()' are expected, so do not raise the alarm
+        self.exempted += gc.mem_alloc() - mark
+
+    def rebase(self):
+        # do not count what was allocated since the collection, ie. the
+        # alarm's own print
+        self.used = gc.mem_alloc()
+
+    def frame(self, frame, reported=False):
+        # Right after the frame is pushed, returns True if this frame raised
+        # the alarm (only the first of a run, so it is not reported for ever)
+        alloc = gc.mem_alloc() - self.used - self.exempted
+        self.exempt_max = max(self.exempt_max, self.exempted)
+        self.exempted = 0
+        start = utime.ticks_us()
+        gc.collect()
+        self.collect_us = utime.ticks_diff(utime.ticks_us(), start)
+        self.used = gc.mem_alloc()
+        self.free = gc.mem_free()
+
+        self.frames += 1
+        self.alloc = alloc
+        self.collect_max = max(self.collect_max, self.collect_us)
+        self.free_min = min(self.free_min, self.free)
+        t = self.telemetry
+        if t:
+            struct.pack_into(HEAP_RECORD, t.buf, t.slot(), frame, self.free, \
+                    min(self.collect_us, 0xffff), min(max(alloc, 0), 0xffff))
+            t.commit()
+
+        if self.frames <= self.warmup or reported:
+            return False
+        self.alloc_max = max(self.alloc_max, alloc)
+        if alloc > 0:
+            self.alarms += 1
+            if self.alarm_frame is None:
+                self.alarm_frame = frame
+                return True
+        else:
+            self.alarm_frame = None
+        return False
+
+    def report(self):
+        print("Heap: %d free (min %d), collect %d us (max %d), %d bytes/frame (max %d), %d exempt (max), %d alarm(s)" % \
+                (self.free, self.free_min, self.collect_us, self.collect_max, \
+                self.alloc, self.alloc_max, self.exempt_max, self.alarms))
@@ -0,0 +1,124 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# "What time is it now", for other code on the device - the IRIG time of the
+# output at this moment, rather than that of the next frame to be queued.
+#
+# The StateMachines' PCs can not give this on their own: the FIFO's and the
+# encoder's loop counts are in X/Y (which can't be read), and one instruction
+# with a delay can be 20 clocks at the same PC. Instead SysTick counts the CPU
+# clock, which the SMs are divided from, so once triggered it is in lockstep
+# with them. 'precision_handler' stamps SysTick just after the trigger writes
+# (table word 0x3C), which is the start of frame 0.
+#
+# SysTick is only 24 bits (140ms at 120MHz), so each query unwraps it with
+# 'ticks_us()' - which only needs to be right to half of that - and moves the
+# anchor up to now, counting whole frames on a Timebase. So the time is exact
+# to a few CPU cycles (within one SM-0 clock), even if 'ticks_us()' runs from
+# a different clock to the CPU (ie. with an external 10MHz).
+#
+# The anchor only moves when 'update()' runs, and it must run at least every
+# 8s: 'ticks_diff()' is only valid to +/-2^29 us (~9 minutes), beyond that the
+# time comes back wrong by whole 2^30 us wraps - and beyond 8s the arithmetic
+# needs a long int (an allocation). The frame loop in 'pico-irig.py' calls it
+# once per frame, so queries may be any time apart.
+#
+# A query is one 'mem32' read, 'ticks_us()' and small int arithmetic, with no
+# allocation if given a result array:
+#   now()     -> (UTC day, seconds since midnight, ns into the second)
+#   symbol()  -> (frame since the trigger, symbol 0..99, encoder clock 0..119)
+
+import utime
+from machine import mem32
+
+from libs.timebase import Timebase
+from libs.trigger_window import SYST_CVR, SYST_RVR, systick
+
+DIAG_TRIGGER = 0x3C
+TRIGGER_STAMP = 12              # CPU cycles from trigger 1 to the SysTick read
+
+
+class IrigClock:
+    def __init__(self, cpu_freq, irig_freq, seconds, sub=0):
+        # 'seconds' (UTC, int) and 'sub' of the first frame; before arming,
+        # so that SysTick is running when the handler stamps it
+        systick()
+        self.period = (mem32[SYST_RVR] & 0xffffff) + 1
+        self.mhz = cpu_freq // 1000000
+        self.rate = irig_freq // 1000
+        self.per_frame = cpu_freq // self.rate
+        self.per_symbol = self.per_frame // 100
+        self.per_clock = cpu_freq // (irig_freq * 12)
+        self.ns_sub = 1000000000 // self.rate
+        self.time = Timebase(seconds, self.rate)
+        self.time.set(seconds, sub)
+        self.frames = 0
+        self.cycles = None              # into the current frame
+        self.cvr = 0
+        self.us = 0
+
+    def start(self, stamp, done_us):
+        # after the trigger, from the handler's stamp (table word 0x3C) and
+        # 'irig_done_us'
+        self.cvr = stamp & 0xffffff
+        self.us = done_us
+        self.cycles = TRIGGER_STAMP
+
+    def running(self):
+        return self.cycles is not None
+
+    def shift(self, seconds):
+        # ie. when re-seeded from GPS
+        self.time.shift(seconds)
+
+    def update(self):
+        # move the anchor up to now, at least every 8s (see above)
+        cvr = mem32[SYST_CVR] & 0xffffff
+        us = utime.ticks_us()
+        d = (self.cvr - cvr) % self.period      # counts down
+        # whole SysTick periods, from the elapsed 'ticks_us()'
+        gap = utime.ticks_diff(us, self.us) * self.mhz
+        d += ((gap - d + (self.period >> 1)) // self.period) * self.period
+        self.cvr = cvr
+        self.us = us
+
+        cycles = self.cycles + d
+        if cycles >= self.per_frame:
+            frames = cycles // self.per_frame
+            cycles -= frames * self.per_frame
+            self.frames += frames
+            self.time.advance(frames)
+        self.cycles = cycles
+
+    def now(self, result=None):
+        self.update()
+        t = self.time
+        c = self.cycles
+        ns = (t.sub() * self.ns_sub) + ((c // self.mhz) * 1000) + \
+                ((c % self.mhz) * 1000 // self.mhz)
+        if result is None:
+            return (t.day, t.tod(), ns)
+        result[0] = t.day
+        result[1] = t.tod()
+        result[2] = ns
+        return result
+
+    def symbol(self, result=None):
+        self.update()
+        c = self.cycles
+        s = c // self.per_symbol
+        clock = (c - (s * self.per_symbol)) // self.per_clock
+        if result is None:
+            return (self.frames, s, clock)
+        result[0] = self.frames
+        result[1] = s
+        result[2] = clock
+        return result
+
+    def __str__(self):
+        day, tod, ns = self.now()
+        return "%d.%9.9d" % (self.time.seconds(), ns)
@@ -0,0 +1,265 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# Alternative modulator, replacing the 'irig_ask' StateMachine (and its
+# pull-resistor tricks) with a sine table played through PWM by DMA. This
+# frees a StateMachine and its 8 instructions of PIO memory.
+#
+# 'pico-irig.py' then moves the FIFO StateMachine into the freed slot on
+# PIO Block-2, so 'trigger 1' starts it with the Encoder, and the precision
+# handler's 'trigger 2' is free to start the PWM slice at the same instant.
+#
+# The PWM output needs a simple RC low-pass (ie. 1K/10nF for IRIG-B), as
+# the PWM rate is 'samples' times the carrier frequency.
+#
+# Three 'symbol' tables are pre-computed (data-0, data-1 and marker), each
+# 10 carrier cycles with the amplitude switched per the IRIG spec:
+#
+#   data-0: 2 high cycles, 8 low
+#   data-1: 5 high cycles, 5 low
+#   marker: 8 high cycles, 2 low
+#
+# Two DMA channels are used:
+#   data    - copies a symbol table into the PWM's CC register, paced by
+#             the PWM 'wrap' DREQ, then chains to...
+#   control - copies the next symbol table address from a ring into the
+#             data channel's READ_ADDR (trigger alias), restarting it.
+#
+# So the CPU only writes 100 addresses per frame, decoded from the same
+# bit-pairs that are pushed into the FIFO StateMachine. The PWM is clocked
+# from SysClk with an integer TOP, so it is locked to the PIO clocks, and
+# starting the PWM slice from the precision trigger aligns the carrier
+# with the encoder.
+#
+# The symbols written and consumed (read by the control channel) are
+# counted, the latter from its read address - unwrapped with the time
+# elapsed, as the ring could be lapped between looks - so an overrun (the
+# DMA reading entries not yet written for this pass) is detected, once until
+# the next frame is queued. It is reported with the CPU time spent queueing
+# frames.
+
+import uctypes
+import utime
+from array import array
+from math import sin, pi
+from machine import Pin, PWM, mem32
+from rp2 import DMA
+
+PWM_BASE = 0x40050000
+PWM_EN = 0x400500a0
+PWM_STRIDE = 0x14
+PWM_CSR = 0x00
+PWM_DIV = 0x04
+PWM_CC = 0x0c
+PWM_TOP = 0x10
+
+DREQ_PWM_WRAP0 = 24
+
+DMA_BASE = 0x50000000
+DMA_STRIDE = 0x40
+DMA_AL3_READ_ADDR_TRIG = 0x3c
+
+RING_BITS = 10                  # ring of 256 addresses (1KB)
+RING_SIZE = (1 << RING_BITS) // 4
+
+SYMBOL_DATA0 = 0
+SYMBOL_DATA1 = 1
+SYMBOL_MARKER = 2
+
+
+class PWMCarrier:
+    def __init__(self, pin, carrier=1000, samples=32, ratio=3.3, \
+                 cpu_freq=120000000):
+        self.pin = pin
+        self.slice = (pin >> 1) & 7
+        self.channel = pin & 1
+        self.regs = PWM_BASE + (self.slice * PWM_STRIDE)
+
+        self.top = (cpu_freq // (carrier * samples)) - 1
+        if (self.top + 1) * carrier * samples != cpu_freq:
+            raise ValueError("carrier * samples must divide SysClk")
+        self.samples = samples
+
+        # pre-compute the symbol tables
+        self.symbols = []
+        for highs in (2, 5, 8):
+            self.symbols.append(self._table(highs, ratio))
+
+        # the control channel reads through a ring of table addresses,
+        # which must be aligned to its size
+        self._ring_mem = bytearray(2 << RING_BITS)
+        base = uctypes.addressof(self._ring_mem)
+        aligned = (base + (1 << RING_BITS) - 1) & ~((1 << RING_BITS) - 1)
+        self.ring_addr = aligned
+        self.ring_words = uctypes.struct(aligned, \
+                {"w": (uctypes.ARRAY | 0, uctypes.UINT32 | RING_SIZE)}).w
+
+        self.head = 0           # next ring entry to write
+
+        # by bit-pair; 3 is never packed, but plays as data-0 rather than
+        # faulting the queue on a corrupt word
+        self.addr = [uctypes.addressof(t) for t in self.symbols]
+        self.addr.append(self.addr[SYMBOL_DATA0])
+
+        # symbols written to/consumed from the ring, unwrapped
+        self.written = 0
+        self.consumed = 0
+        self.seen_us = None     # when 'consumed' was updated, once running
+        self.symbol_us = 10 * 1000000 // carrier
+        self.overruns = 0
+        self.lost = 0
+        self.starved = False    # overrun, and not queued since
+        self.min_free = RING_SIZE
+
+        # fill the whole ring with 'data-0', until real frames arrive
+        for i in range(RING_SIZE):
+            self.ring_words[i] = self.addr[SYMBOL_DATA0]
+
+        # statistics, for CPU load
+        self.frames = 0
+        self.fill_us = 0
+        self.fill_max_us = 0
+        self.frame_us = int(100 * 10 * 1000000 / carrier)
+
+        self._setup_pwm()
+        self._setup_dma()
+
+    def _table(self, highs, ratio):
+        # one symbol's worth of CC register values, ie. 10 carrier cycles
+        mid = (self.top + 1) / 2
+        table = array("I", [0] * (self.samples * 10))
+        for c in range(10):
+            amp = 0.95 * mid if c < highs else 0.95 * mid / ratio
+            for s in range(self.samples):
+                v = int(mid + amp * sin(2 * pi * s / self.samples))
+                table[(c * self.samples) + s] = v << (16 * self.channel)
+        return table
+
+    def _setup_pwm(self):
+        self.pwm = PWM(Pin(self.pin))
+
+        # disable, then set divider=1 and exact TOP for the sample rate
+        mem32[self.regs + PWM_CSR] = 0
+        mem32[self.regs + PWM_DIV] = 1 << 4
+        mem32[self.regs + PWM_TOP] = self.top
+        mem32[self.regs + PWM_CC] = ((self.top + 1) >> 1) << (16 * self.channel)
+
+    def _setup_dma(self):
+        self.data = DMA()
+        self.control = DMA()
+
+        self.data.config(
+            read=self.symbols[SYMBOL_DATA0],
+            write=self.regs + PWM_CC,
+            count=self.samples * 10,
+            ctrl=self.data.pack_ctrl(size=2, inc_read=True, inc_write=False,
+                        treq_sel=DREQ_PWM_WRAP0 + self.slice,
+                        chain_to=self.control.channel))
+
+        self.control.config(
+            read=self.ring_addr,
+            write=DMA_BASE + (self.data.channel * DMA_STRIDE) + \
+                        DMA_AL3_READ_ADDR_TRIG,
+            count=1,
+            ctrl=self.control.pack_ctrl(size=2, inc_read=True, inc_write=False,
+                        ring_size=RING_BITS, ring_sel=False,
+                        chain_to=self.control.channel))
+
+    def arm(self):
+        # start the DMA, it waits for the PWM to run
+        self.control.active(1)
+
+    def trigger(self):
+        # (register, value) which starts the PWM, as used for 'trigger 2'
+        # in the precision handler's table
+        return (PWM_EN, mem32[PWM_EN] | (1 << self.slice))
+
+    def start(self):
+        addr, value = self.trigger()
+        mem32[addr] = value
+
+    def stop(self):
+        mem32[PWM_EN] = mem32[PWM_EN] & ~(1 << self.slice)
+        self.data.active(0)
+        self.control.active(0)
+
+    def _update(self):
+        # count the entries read by the control channel since the last look,
+        # plus any whole laps of the ring by the time elapsed
+        tail = (self.control.read - self.ring_addr) >> 2
+        delta = (tail - self.consumed) % RING_SIZE
+        now = utime.ticks_us()
+        if self.seen_us is not None:
+            elapsed = utime.ticks_diff(now, self.seen_us) // self.symbol_us
+            if elapsed > delta + (RING_SIZE >> 1):
+                delta += ((elapsed - delta + (RING_SIZE >> 1)) // RING_SIZE) \
+                        * RING_SIZE
+        if mem32[PWM_EN] & (1 << self.slice):
+            self.seen_us = now
+        self.consumed += delta
+
+        if self.consumed > self.written:
+            # the DMA has played entries from the previous pass, carry on
+            # writing just after where it is
+            if not self.starved:
+                self.overruns += 1
+                self.starved = True
+            self.lost += self.consumed - self.written
+            self.written = self.consumed
+            self.head = tail
+
+    def free(self):
+        # ring entries that have been consumed and can be re-written
+        self._update()
+        free = RING_SIZE - 1 - (self.written - self.consumed)
+        if free < self.min_free:
+            self.min_free = free
+        return free
+
+    def queue_frame(self, words):
+        # Queue a frame, from the same bit-pairs as pushed into the FIFO.
+        # Returns False (without blocking) if there is not enough room.
+        start = utime.ticks_us()
+        if self.free() < 100:
+            return False
+
+        addr = self.addr
+        ring = self.ring_words
+        head = self.head
+        n = 0
+        for w in words:
+            for j in range(16):
+                ring[head] = addr[(w >> (j * 2)) & 0x3]
+                head = (head + 1) % RING_SIZE
+                n += 1
+                if n == 100:
+                    break
+            if n == 100:
+                break
+        self.head = head
+        self.written += 100
+        self.starved = False
+
+        took = utime.ticks_diff(utime.ticks_us(), start)
+        self.frames += 1
+        self.fill_us += took
+        if took > self.fill_max_us:
+            self.fill_max_us = took
+        return True
+
+    def load(self):
+        # average and worst-case CPU load, as fraction of frame period
+        if not self.frames:
+            return (0.0, 0.0)
+        return (self.fill_us / self.frames / self.frame_us, \
+                self.fill_max_us / self.frame_us)
+
+    def report(self):
+        load = self.load()
+        print("PWM: %d frames, %d overruns (%d symbols lost), %d min free, CPU %.3f%% avg, %.3f%% max" % \
+                (self.frames, self.overruns, self.lost, self.min_free, \
+                100 * load[0], 100 * load[1]))
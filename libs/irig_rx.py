@@ -0,0 +1,229 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# IRIG-B/A receiver, for a DCLS input. The 'irig_rx' StateMachine waits for
+# the leading edge of each symbol, then times the high period against three
+# thresholds and pushes a 2 bit code (16 per word):
+#     0b00 - Data '0'       (0.2 bit)
+#     0b01 - Data '1'       (0.5 bit)
+#     0b10 - Pr, P1..P9, P0 (0.8 bit)
+#     0b11 - error, still high after 0.95 bit
+#
+# The frame decoder syncs on two markers in a row (P0 then Pr), checks the
+# position of P1..P9 and decodes the time, control functions and SBS.
+#
+# On-time output: for every leading edge the SM also takes 1 bit from its TX
+# FIFO (autopull), and drives the 'set' pin high for that symbol if it is a
+# 1. Codes and mask bits are consumed one per edge, so the edge index of a
+# code is exact - once a Pr has been found, the mask words pushed ahead have
+# every 100th bit set, and the pin rises 'RX_LATENCY' SM clocks after the
+# leading edge of each Pr, ie. on-time, for re-triggering a generator.
+#
+# The SM runs at 'RX_CLOCKS' per bit (an integer divider from 120MHz), so
+# the width loops have 1/40 bit resolution and the on-time edge jitter is 1
+# SM clock (8.3us for IRIG-B, 0.83us for IRIG-A).
+
+import rp2
+import utime
+from machine import mem32
+
+RX_CLOCKS = 1200                # SM clocks per bit, 30 per loop
+RX_LATENCY = 3.5                # edge to on-time output, SM clocks +/-0.5
+
+CODE_DATA0 = 0
+CODE_DATA1 = 1
+CODE_MARKER = 2
+CODE_ERROR = 3
+
+
+@rp2.asm_pio(set_init=rp2.PIO.OUT_LOW,
+             in_shiftdir=rp2.PIO.SHIFT_LEFT, autopush=True, push_thresh=32,
+             out_shiftdir=rp2.PIO.SHIFT_RIGHT, autopull=True, pull_thresh=32)
+
+def irig_rx():
+    wrap_target()
+    wait(0, pin, 0)
+    wait(1, pin, 0)                 # leading edge of symbol
+    out(y, 1)                       # on-time mask bit for this edge
+    jmp(not_y, "measure")
+    set(pins, 1)                    # on-time output
+
+    label("measure")
+    set(x, 13)                      # 14 x 1/40 bit = 0.35 bit
+    label("w0")
+    jmp(pin, "h0")
+    jmp("data0")
+    label("h0")
+    jmp(x_dec, "w0") [28]
+
+    set(x, 11)                      # 12 x 1/40 bit = 0.65 bit
+    label("w1")
+    jmp(pin, "h1")
+    jmp("data1")
+    label("h1")
+    jmp(x_dec, "w1") [28]
+
+    set(x, 11)                      # 12 x 1/40 bit = 0.95 bit
+    label("w2")
+    jmp(pin, "h2")
+    jmp("marker")
+    label("h2")
+    jmp(x_dec, "w2") [28]
+
+    set(y, 3)                       # still high, error
+    jmp("push")
+    label("marker")
+    set(y, 2)
+    jmp("push")
+    label("data1")
+    set(y, 1)
+    jmp("push")
+    label("data0")
+    set(y, 0)
+    label("push")
+    in_(y, 2)
+    set(pins, 0)
+    wrap()
+
+
+def bits(symbols, start, count):
+    # little endian value from the data bits at 'start'
+    v = 0
+    for i in range(count):
+        v |= (symbols[start + i] & 1) << i
+    return v
+
+
+def decode(symbols):
+    # (UTC seconds, tenths, control functions, SBS, consistent) from the 100
+    # codes of a frame. CF is the 18 bits from position 60 to 78, skipping
+    # P7 (so bit 0 is position 60), and 'consistent' when the SBS agrees with
+    # the BCD time of day.
+    sec = bits(symbols, 1, 4) + 10 * bits(symbols, 6, 3)
+    minute = bits(symbols, 10, 4) + 10 * bits(symbols, 15, 3)
+    hour = bits(symbols, 20, 4) + 10 * bits(symbols, 25, 2)
+    doy = bits(symbols, 30, 4) + 10 * bits(symbols, 35, 4) + \
+            100 * bits(symbols, 40, 2)
+    tenths = bits(symbols, 45, 4)
+    year = bits(symbols, 50, 4) + 10 * bits(symbols, 55, 4)
+    cf = bits(symbols, 60, 9) | (bits(symbols, 70, 9) << 9)
+    sbs = bits(symbols, 80, 9) | (bits(symbols, 90, 8) << 9)
+
+    utc = utime.mktime((2000 + year, 1, 1, hour, minute, sec, 0, 0)) + \
+            (max(doy, 1) - 1) * 86400
+    return (utc, tenths, cf, sbs, sbs == (hour * 3600) + (minute * 60) + sec)
+
+
+class FrameDecoder:
+    def __init__(self):
+        self.symbols = bytearray(100)
+        self.pos = -1                   # position in frame, -1 is no sync
+        self.last = -1
+        self.index = 0                  # edge index of the next code
+        self.pr = None                  # edge index of the last Pr
+        self.frames = 0
+        self.errors = 0                 # bad codes, or markers out of place
+
+    def feed(self, code):
+        # returns the decoded frame when 'code' completes one
+        index = self.index
+        self.index += 1
+
+        if code == CODE_ERROR:
+            self.errors += 1
+            self.pos = -1
+            self.last = code
+            return None
+
+        if self.pos < 0:
+            # sync on two markers, ie. P0 then Pr
+            if code == CODE_MARKER and self.last == CODE_MARKER:
+                self.pos = 0
+        elif (code == CODE_MARKER) != (self.pos == 0 or self.pos % 10 == 9):
+            self.errors += 1
+            self.pos = -1
+        self.last = code
+        if self.pos < 0:
+            return None
+
+        if self.pos == 0:
+            self.pr = index
+        self.symbols[self.pos] = code
+        self.pos += 1
+        if self.pos < 100:
+            return None
+
+        self.pos = 0
+        self.frames += 1
+        return decode(self.symbols)
+
+
+class IrigReceiver:
+    def __init__(self, sm, fdebug=None, flag=0):
+        # 'fdebug' register and the SM's 'flag' (ie. 1 << sm), for the
+        # RX/TX stall bits
+        self.sm = sm
+        self.fdebug = fdebug
+        self.flag = flag
+        self.decoder = FrameDecoder()
+        self.mask_index = 0             # edge index of the next mask word
+        self.stalls = 0
+        self.backlog = 0                # most RX words waiting, of 4
+        self.last = None
+        self.on_time = 0                # on-time edges scheduled
+
+    def start(self):
+        # prime the on-time mask, as the first edge autopulls
+        if self.fdebug:
+            mem32[self.fdebug] = (self.flag << 24) | self.flag
+        self._refill()
+        self.sm.active(1)
+
+    def stop(self):
+        self.sm.active(0)
+
+    def _refill(self):
+        pr = self.decoder.pr
+        synced = self.decoder.pos >= 0 and pr is not None
+        while self.sm.tx_fifo() < 4:
+            word = 0
+            if synced:
+                # bits for the edges 100n after the last Pr
+                first = (pr - self.mask_index) % 100
+                while first < 32:
+                    word |= 1 << first
+                    first += 100
+                    self.on_time += 1
+            self.sm.put(word)
+            self.mask_index += 32
+
+    def poll(self):
+        # returns a new frame, (UTC seconds, tenths, CF, SBS, consistent),
+        # or None
+        if self.fdebug and mem32[self.fdebug] & ((self.flag << 24) | self.flag):
+            # RX full or TX mask empty, edges were missed
+            mem32[self.fdebug] = (self.flag << 24) | self.flag
+            self.stalls += 1
+            self.decoder.pos = -1
+
+        frame = None
+        self.backlog = max(self.backlog, self.sm.rx_fifo())
+        while self.sm.rx_fifo():
+            w = self.sm.get()
+            for i in range(30, -2, -2):
+                f = self.decoder.feed((w >> i) & 3)
+                if f:
+                    frame = f
+        self._refill()
+        if frame:
+            self.last = frame
+        return frame
+
+    def report(self):
+        d = self.decoder
+        print("IRIG RX: %d frames, %d errors, %d stalls, backlog %d/4, %d on-time edges" % \
+                (d.frames, d.errors, self.stalls, self.backlog, self.on_time))
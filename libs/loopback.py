@@ -0,0 +1,192 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# Loopback check of the transmitted timecode. A spare StateMachine samples
+# the DCLS pin, 10 samples per bit, pushing 32 samples per word. These are
+# run-length decoded (viper) into the high-time and period of each symbol,
+# which are classified as Data 0/1 or marker and assembled into frames - and
+# compared with the frames which were pushed to the FIFO.
+#
+# Reported are frames verified, mismatches (ie. bits differ), slips (ie. a
+# pushed frame never seen), timing anomalies (symbol width/period out of
+# tolerance) and capture overruns. The SM is 1 instruction (with delay, so
+# that its divider is in range), and the CPU time spent in 'poll()' is
+# measured.
+
+import rp2
+import utime
+import micropython
+from array import array
+from machine import mem32
+from micropython import const
+
+RUNS = const(64)                        # power of 2
+DEPTH = 4                               # pushed frames waiting to be seen
+SAMPLES = 10                            # per bit
+SAMPLE_CLOCKS = 4                       # SM clocks per sample, so the SM runs
+                                        # at 'irig_freq * SAMPLE_CLOCKS' - at
+                                        # 'irig_freq' IRIG-B needs a divider
+                                        # over the maximum (65536)
+
+# 2/5/8 samples high for Data 0/1 and marker, +/-1 for sampling phase
+WIDTHS = (-1, 0, 0, 0, 1, 1, 1, 2, 2, 2)
+
+
+@rp2.asm_pio(in_shiftdir=rp2.PIO.SHIFT_LEFT, autopush=True, push_thresh=32,
+             fifo_join=rp2.PIO.JOIN_RX)
+
+def dcls_capture():
+    in_(pins, 1)                [3]     # sample DCLS, MSB is oldest
+
+
+@micropython.viper
+def dcls_runs(word: uint, state: ptr32, runs: ptr32) -> int:
+    # Run-length decode 32 samples. 'state' is level, high count, period
+    # count and 'runs' head - a run '(high << 16) | period' is stored at
+    # each rising edge, for the symbol which ended there
+    level = state[0]
+    high = state[1]
+    period = state[2]
+    head = state[3]
+    edges = 0
+    i = 31
+    while i >= 0:
+        s = int((word >> uint(i)) & uint(1))
+        if s and not level:
+            runs[head & (RUNS - 1)] = (high << 16) | period
+            head += 1
+            edges += 1
+            high = 0
+            period = 0
+        level = s
+        if period < 0xffff:
+            period += 1
+            high += s
+        i -= 1
+    state[0] = level
+    state[1] = high
+    state[2] = period
+    state[3] = head
+    return edges
+
+
+class Loopback:
+    def __init__(self, sm, fdebug, flag):
+        # 'fdebug' register and the SM's RXSTALL 'flag' in it
+        self.sm = sm
+        self.fdebug = fdebug
+        self.flag = flag
+
+        self.state = array("i", [0] * 4)
+        self.runs = array("i", [0] * RUNS)
+        self.tail = 0
+        self.frame = array("I", [0] * 7)
+        self.pos = -1                   # position in frame, -1 is no sync
+        self.last = -1                  # previous symbol
+
+        self.pushed = array("I", [0] * (7 * DEPTH))
+        self.pending = 0
+
+        self.verified = 0
+        self.mismatches = 0
+        self.slips = 0
+        self.anomalies = 0
+        self.overruns = 0
+        self.busy_us = 0
+        self.start_us = None
+
+    def start(self):
+        mem32[self.fdebug] = self.flag
+        self.start_us = utime.ticks_us()
+        self.sm.active(1)
+
+    def stop(self):
+        self.sm.active(0)
+
+    def expect(self, frame):
+        # a frame was pushed to the FIFO, it should be seen after those
+        # already pending
+        if self.pending == DEPTH:
+            self._drop(1)
+            self.slips += 1
+        base = self.pending * 7
+        for i in range(7):
+            self.pushed[base + i] = frame[i]
+        self.pending += 1
+
+    def _drop(self, count):
+        for i in range((self.pending - count) * 7):
+            self.pushed[i] = self.pushed[i + count * 7]
+        self.pending -= count
+
+    def poll(self):
+        start = utime.ticks_us()
+        if mem32[self.fdebug] & self.flag:
+            # SM stalled on a full RX FIFO, samples lost
+            mem32[self.fdebug] = self.flag
+            self.overruns += 1
+            self.pos = -1
+
+        while self.sm.rx_fifo():
+            dcls_runs(self.sm.get(), self.state, self.runs)
+        while self.tail != self.state[3]:
+            run = self.runs[self.tail & (RUNS - 1)]
+            self.tail += 1
+            if self.tail > 1:           # first run is from part way in
+                self._symbol(run >> 16, run & 0xffff)
+        self.busy_us += utime.ticks_diff(utime.ticks_us(), start)
+
+    def _symbol(self, high, period):
+        sym = WIDTHS[high] if high < SAMPLES else -1
+        if sym < 0 or abs(period - SAMPLES) > 1:
+            self.anomalies += 1
+            self.pos = -1
+            self.last = -1
+            return
+
+        if self.pos < 0:
+            # sync on two markers, ie. P0 then Pr
+            if sym == 2 and self.last == 2:
+                self.pos = 0
+        elif (sym == 2) != (self.pos == 0 or self.pos % 10 == 9):
+            # marker where there should not be, or missing
+            self.anomalies += 1
+            self.pos = -1
+        self.last = sym
+        if self.pos < 0:
+            return
+
+        if self.pos & 0x0f == 0:
+            self.frame[self.pos >> 4] = 0
+        self.frame[self.pos >> 4] |= sym << ((self.pos & 0x0f) << 1)
+        self.pos += 1
+        if self.pos == 100:
+            self._compare()
+            self.pos = 0
+
+    def _compare(self):
+        for k in range(self.pending):
+            for i in range(7):
+                if self.pushed[k * 7 + i] != self.frame[i]:
+                    break
+            else:
+                self.verified += 1
+                self.slips += k
+                self._drop(k + 1)
+                return
+
+        if self.pending:
+            self.mismatches += 1
+            print("Loopback: frame mismatch, pairs", [n for n in range(100) \
+                    if (self.pushed[n >> 4] ^ self.frame[n >> 4]) >> ((n & 0x0f) << 1) & 3])
+            self._drop(1)
+
+    def report(self):
+        elapsed = utime.ticks_diff(utime.ticks_us(), self.start_us)
+        print("Loopback: %d verified, %d mismatches, %d slips, %d anomalies, %d overruns, CPU %.3f%%" % \
+                (self.verified, self.mismatches, self.slips, self.anomalies, \
+                self.overruns, 100 * self.busy_us / max(elapsed, 1)))
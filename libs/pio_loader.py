@@ -0,0 +1,283 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# PIO program-space manager. Programs are added in 'groups', where a group
+# must share a PIO block (ie. they share IRQ flags, or are started by the
+# same CTRL register write). The loader packs the groups into the two
+# blocks, de-duplicates identical programs, allocates the StateMachines and
+# reports the free instruction slots.
+#
+# Programs are relocated by MicroPython as they are loaded, and the
+# precision handler computes the SM addresses from EXECCTRL at run time -
+# but the handler's table of register addresses and CTRL masks depends on
+# which block/StateMachine each program lands in. 'handler_table()'
+# generates those, so they can be checked against (or pasted into) the
+# 'data()' words in 'precision_handler'.
+#
+# The handler also forces an IRQ flag when it is done, which MicroPython
+# handles - 'reserve_irq()' keeps the programs in that block off the flag,
+# including 'rel()' flags which move with the StateMachine a program lands
+# on. A placement which would use it is refused.
+
+import rp2
+import utime
+from machine import mem32
+
+PIO_BASE = (0x50200000, 0x50300000)
+PIO_INSTR = 32
+PIO_SMS = 4
+
+PIO_CTRL = 0x000
+PIO_FDEBUG = 0x008
+PIO_FDEBUG_TXSTALL = 0x0f000000
+PIO_IRQ = 0x030
+PIO_IRQ_FORCE = 0x034
+PIO_INSTR_MEM = 0x048
+SM_BASE = 0x0c8
+SM_STRIDE = 0x18
+SM_CLKDIV = 0x00
+SM_EXECCTRL = 0x04
+SM_SHIFTCTRL = 0x08
+SM_ADDR = 0x0c
+SM_INSTR = 0x10
+SM_PINCTRL = 0x14
+
+PIO_IRQ_DONE = 3                # forced by 'precision_handler' when done
+
+
+def wait_for(cond, timeout_ms):
+    # poll 'cond()' until True, returns False if it timed out
+    start = utime.ticks_ms()
+    while not cond():
+        if utime.ticks_diff(utime.ticks_ms(), start) > timeout_ms:
+            return False
+        utime.sleep_us(100)
+    return True
+
+
+def irq_flags(prog, sm):
+    # mask of the IRQ flags which 'prog' sets, clears or waits on, when run
+    # on local StateMachine 'sm' - 'rel()' adds it, modulo 4
+    flags = 0
+    for instr in prog[0]:
+        op = instr & 0xe000
+        if op == 0xc000 or (op == 0x2000 and (instr >> 5) & 0x3 == 0x2):
+            index = instr & 0x7
+            if instr & 0x10:
+                index = (index & 0x4) | ((index + sm) & 0x3)
+            flags |= 1 << index
+    return flags
+
+
+class PIOLoader:
+    def __init__(self):
+        self.members = []       # [name, group, prog, freq, kwargs, pio]
+        self.placed = {}        # name -> (pio, local sm)
+        self.sms = {}           # name -> rp2.StateMachine
+        self.used = None
+        self.reserved = []      # (name, flag), flag kept in the block of 'name'
+
+    def add(self, group, name, prog, freq, pio=None, **kwargs):
+        # 'pio' forces the group into a block
+        self.members.append([name, group, prog, freq, kwargs, pio])
+        self.placed = {}
+
+    def reserve_irq(self, name, flag):
+        # no program in the block holding 'name' may use IRQ 'flag'
+        self.reserved.append((name, flag))
+        self.placed = {}
+
+    def _clash(self, placed, b, members):
+        # would 'members' on block 'b', from its next free StateMachine,
+        # make a program there use a reserved IRQ flag
+        on_b = [(m, placed[m[0]][1]) for m in self.members \
+                    if m[0] in placed and placed[m[0]][0] == b]
+        first = len(on_b)
+        on_b += [(m, first + i) for i, m in enumerate(members)]
+
+        names = [m[0] for m, sm in on_b]
+        reserved = 0
+        for name, flag in self.reserved:
+            if name in names:
+                reserved |= 1 << flag
+        for m, sm in on_b:
+            if irq_flags(m[2], sm) & reserved:
+                return True
+        return False
+
+    def _key(self, prog):
+        return (bytes(prog[0]), prog[3], prog[4], str(prog[5:8]))
+
+    def _groups(self):
+        groups = []
+        for m in self.members:
+            for g in groups:
+                if g[0] == m[1]:
+                    g[1].append(m)
+                    break
+            else:
+                groups.append([m[1], [m]])
+        return groups
+
+    def _pack(self, groups):
+        keys = [{}, {}]         # per block, program key -> program
+        sms = [0, 0]
+        placed = {}
+
+        for name, members in groups:
+            pio = None
+            for m in members:
+                if m[5] is not None:
+                    pio = m[5]
+
+            # cost on each block, programs already loaded there are shared
+            fits = []
+            for b in ((pio,) if pio is not None else (0, 1)):
+                new = {}
+                for m in members:
+                    k = self._key(m[2])
+                    if k not in keys[b] and k not in new:
+                        new[k] = m[2]
+                size = sum(len(p[0]) for p in new.values())
+                used = sum(len(p[0]) for p in keys[b].values())
+
+                if used + size <= PIO_INSTR and sms[b] + len(members) <= PIO_SMS \
+                        and not self._clash(placed, b, members):
+                    fits.append((size, b, new))
+            if not fits:
+                return None
+
+            fits.sort(key=lambda f: (f[0], f[1]))
+            size, b, new = fits[0]
+            keys[b].update(new)
+            for m in members:
+                placed[m[0]] = (b, sms[b])
+                sms[b] += 1
+
+        return (placed, keys)
+
+    def plan(self):
+        # Place in the order given (so the layout is predictable), into
+        # the block where it adds the fewest instructions - then try
+        # largest-first if that does not fit
+        groups = self._groups()
+        result = self._pack(groups)
+        if result is None:
+            size = lambda g: sum(len(m[2][0]) for m in g[1])
+            result = self._pack(sorted(groups, key=size, reverse=True))
+        if result is None:
+            raise OSError("programs do not fit in PIO blocks, or use a reserved IRQ flag")
+
+        self.placed, keys = result
+        self.canonical = {}
+        for b in (0, 1):
+            for k, p in keys[b].items():
+                self.canonical[k] = p
+        self.used = [sum(len(p[0]) for p in keys[b].values()) for b in (0, 1)]
+        return self.placed
+
+    def purge(self, prog, freq, settle=0.5, timeout_ms=100):
+        # Run 'prog' on every StateMachine, then remove all programs. With
+        # 'settle=None' this waits until every SM has stalled on its empty
+        # TX-FIFO, rather than for a fixed time.
+        sms = []
+        for i in range(PIO_SMS * 2):
+            sms.append(rp2.StateMachine(i, prog, freq=freq))
+        for b in PIO_BASE:
+            mem32[b + PIO_FDEBUG] = PIO_FDEBUG_TXSTALL
+        for s in sms:
+            s.active(1)
+
+        if settle is None:
+            stalled = lambda: all([(mem32[b + PIO_FDEBUG] & PIO_FDEBUG_TXSTALL) \
+                        == PIO_FDEBUG_TXSTALL for b in PIO_BASE])
+            if not wait_for(stalled, timeout_ms):
+                raise OSError("PIO purge did not complete")
+        else:
+            utime.sleep(settle)
+        rp2.PIO(0).remove_program()
+        rp2.PIO(1).remove_program()
+
+    def load(self, names=None):
+        # Create the StateMachines (not started), in the order added
+        if not self.placed:
+            self.plan()
+
+        for m in self.members:
+            if m[0] in self.sms or (names and m[0] not in names):
+                continue
+            prog = self.canonical[self._key(m[2])]
+            self.sms[m[0]] = rp2.StateMachine(self.index(m[0]), prog, \
+                        freq=m[3], **m[4])
+        return self.sms
+
+    def sm(self, name):
+        return self.sms[name]
+
+    def index(self, name):
+        pio, sm = self.placed[name]
+        return (pio * PIO_SMS) + sm
+
+    def block(self, name):
+        return self.placed[name][0]
+
+    def pio_reg(self, name, offset):
+        # address of a register in the block holding 'name'
+        return PIO_BASE[self.placed[name][0]] + offset
+
+    def irq_flag(self, name):
+        # the 'irq(rel(0))' flag of 'name'
+        return 1 << self.placed[name][1]
+
+    def reg(self, name, offset):
+        # address of a per-SM register, ie. reg('counter', SM_EXECCTRL)
+        pio, sm = self.placed[name]
+        return PIO_BASE[pio] + SM_BASE + (sm * SM_STRIDE) + offset
+
+    def ctrl(self, run, restart=()):
+        # (address, value) for the CTRL register, leaving 'run' enabled
+        # and re-aligning the clock dividers of 'restart'
+        blocks = set([self.block(n) for n in run] + \
+                    [self.block(n) for n in restart])
+        if len(blocks) != 1:
+            raise ValueError("CTRL write spans PIO blocks")
+
+        value = 0
+        for n in run:
+            value |= 1 << self.placed[n][1]
+        for n in restart:
+            value |= 1 << (self.placed[n][1] + 8)
+        return (PIO_BASE[blocks.pop()] + PIO_CTRL, value)
+
+    def handler_table(self, counter, phase, trigger1, trigger2, done):
+        # words for 'precision_handler', where triggers are (address, value)
+        # and 'done' is the IRQ_FORCE register it signals completion with
+        return [self.reg(counter, SM_EXECCTRL), self.reg(phase, SM_EXECCTRL),
+                trigger1[0], trigger1[1], trigger2[0], trigger2[1], done]
+
+    def handler_source(self, table):
+        # as 'data()' lines, for pasting into 'precision_handler'
+        lines = []
+        for i, w in enumerate(table):
+            lines.append("    data    (4, 0x%8.8x)     #  0x%2.2X" % (w, i * 4))
+        return "\n".join(lines)
+
+    def free(self):
+        if self.used is None:
+            self.plan()
+        return [PIO_INSTR - u for u in self.used]
+
+    def report(self):
+        free = self.free()
+        for b in (0, 1):
+            names = [n for n in self.placed if self.placed[n][0] == b]
+            names.sort(key=lambda n: self.placed[n][1])
+            print("PIO%d: %d/%d instructions, %d free" % \
+                    (b, PIO_INSTR - free[b], PIO_INSTR, free[b]))
+            for n in names:
+                m = [m for m in self.members if m[0] == n][0]
+                print("  SM%d %-12s %2d instr" % (self.index(n), n, len(m[2][0])))
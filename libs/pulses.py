@@ -0,0 +1,90 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# Reference pulse output (1PPS, 10PPS, 1PPM or one per frame) from a spare
+# StateMachine, so that lab gear can be referenced from the IRIG generator.
+#
+# 'pulse_gen' is in the 'output' group, so it is started (and its clock
+# divider restarted) by trigger 1 along with the IRIG output - from the same
+# clock, there is no drift between them. It runs at 'cpu_freq / 10', so edges
+# are placed to 10 CPU cycles (83ns at 120MHz), and a period of a minute still
+# fits in X.
+#
+# Trigger 1 happens a fixed time after the PPS edge, ~83us whilst SM-0 counts
+# out its loop (see 'docs/precision_trigger.md'), which is why 'regen_1hz'
+# was late. So the first pulse is held off by a period less than the latency,
+# after which every edge lands on the on-time mark. The latency is that
+# measured by 'test_scripts/sync/calibrate.py' if there is a calibration
+# file, otherwise the nominal PULSE_LATENCY.
+#
+#   low:  X+1 clocks, X from OSR
+#   high: Y+3 clocks, Y from ISR
+# The first low is X preset by the CPU, the delay until the first edge.
+
+import rp2
+
+# periods, in ms (PULSE_FRAME is set from the IRIG frame rate)
+PULSE_PPS = 1000
+PULSE_10PPS = 100
+PULSE_PPM = 60000
+PULSE_FRAME = 0
+
+PULSE_DIV = 10                  # SM clock is 'cpu_freq / PULSE_DIV'
+PULSE_LATENCY = 10000           # nominal PPS edge to trigger 1, CPU cycles
+
+
+@rp2.asm_pio(sideset_init=rp2.PIO.OUT_LOW)
+
+def pulse_gen():
+    wrap_target()
+    label("low")
+    jmp(x_dec, "low")       .side(0)
+    mov(x, osr)             .side(1)    # on-time edge
+    mov(y, isr)             .side(1)
+    label("high")
+    jmp(y_dec, "high")      .side(1)
+    wrap()
+
+
+class Pulses:
+    def __init__(self, sm, cpu_freq, period_ms, width_ms, latency=None):
+        self.sm = sm
+        self.freq = cpu_freq // PULSE_DIV
+        self.period = self.freq * period_ms // 1000
+        self.width = self.freq * width_ms // 1000
+        if latency is None:
+            latency = PULSE_LATENCY
+        self.latency = (latency + (PULSE_DIV // 2)) // PULSE_DIV
+        if self.width < 3 or self.width >= self.period:
+            raise ValueError("pulse width %dms for period %dms" % \
+                    (width_ms, period_ms))
+
+    def prime(self, seconds, sub=0, rate=1):
+        # Before trigger 1, for the first frame being frame 'sub' (of 'rate'
+        # per second) of UTC 'seconds'. Returns the clocks until the first
+        # pulse, which is the first whole period after the trigger.
+        now = ((seconds % 3600) * self.freq) + (sub * self.freq // rate)
+        lead = -now % self.period
+        if lead < self.latency:
+            lead += self.period
+        delay = lead - self.latency
+
+        sm = self.sm
+        sm.put(delay - 1)
+        sm.exec("pull()")
+        sm.exec("mov(x, osr)")
+        sm.put(self.width - 3)
+        sm.exec("pull()")
+        sm.exec("mov(isr, osr)")
+        sm.put(self.period - self.width - 1)
+        sm.exec("pull()")
+        return delay
+
+    def report(self, delay):
+        print("Pulses: every %d us, %d us wide, first in %d us (latency %d ns)" % \
+                (self.period * 1000000 // self.freq, self.width * 1000000 // self.freq, \
+                delay * 1000000 // self.freq, self.latency * 1000000000 // self.freq))
@@ -0,0 +1,112 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# Binary telemetry, one fixed-size record per frame, written to the USB
+# serial in batches. Writing to USB CDC can block when the host is slow, so
+# the batch is only written if the port is ready - otherwise it is dropped
+# (and counted), the refill loop is never held up.
+#
+# Batch:
+#   u8 0xa5, u8 0x5a, u8 kind, u8 count
+#   u16 dropped batches, u16 checksum (sum of the record bytes)
+#   u32 time spent writing the previous batch (us)
+#   count x record
+#
+# Record, kind 1 (frames):
+#   u32 frame index
+#   u16 refill slack (us, capped), ie. how long before the FIFO would starve
+#   u16 underflows (total)
+#   u32 phase (us), refill time after the start of the frame
+#   i32 PPS offset (us), last PPS edge after the start of the frame
+#
+# Other kinds of record (ie. 'libs/events.py') use the same batches.
+#
+# The sync bytes are not ASCII, so the host reader ('test_scripts/telemetry')
+# can skip any text printed in between.
+
+import struct
+import sys
+import utime
+
+KIND_FRAMES = 1
+SYNC = b"\xa5\x5a"
+HEADER = "<2sBBHHI"
+HEADER_SIZE = struct.calcsize(HEADER)
+RECORD = "<IHHIi"
+PPS_NONE = -0x80000000
+
+
+class Telemetry:
+    def __init__(self, batch=16, stream=None, record=RECORD, kind=KIND_FRAMES):
+        self.batch = batch
+        self.stream = stream or getattr(sys.stdout, "buffer", sys.stdout)
+        self.record_format = record
+        self.record_size = struct.calcsize(record)
+        self.kind = kind
+        self.buf = bytearray(HEADER_SIZE + self.record_size * batch)
+        self.view = memoryview(self.buf)
+        self.count = 0
+        self.dropped = 0
+        self.write_us = 0
+        self.total_us = 0
+
+        try:
+            import select
+            self.poller = select.poll()
+            self.poller.register(self.stream, select.POLLOUT)
+        except (ImportError, AttributeError, TypeError, OSError):
+            self.poller = None
+        # MicroPython's 'ipoll()' reuses its result, 'poll()' makes a list
+        self.ipoll = getattr(self.poller, "ipoll", None)
+
+    def ready(self):
+        if self.ipoll is None:
+            return bool(self.poller.poll(0))
+        for event in self.ipoll(0):
+            return True
+        return False
+
+    def record(self, frame, slack, underflows, phase, pps=PPS_NONE):
+        struct.pack_into(self.record_format, self.buf, self.slot(), frame, \
+                min(max(slack, 0), 0xffff), underflows & 0xffff, phase, pps)
+        self.commit()
+
+    def add(self, *values):
+        # a record of any kind, as its 'record' format
+        struct.pack_into(self.record_format, self.buf, self.slot(), *values)
+        self.commit()
+
+    # 'add()' in two halves, for packing a record without the '*values'
+    # tuple, which is allocated (see 'libs/heap.py')
+    def slot(self):
+        return HEADER_SIZE + self.count * self.record_size
+
+    def commit(self):
+        self.count += 1
+        if self.count == self.batch:
+            self.flush()
+
+    def flush(self):
+        if not self.count:
+            return
+        size = HEADER_SIZE + self.count * self.record_size
+        # by index, as a slice would allocate (see 'libs/heap.py')
+        check = 0
+        for i in range(HEADER_SIZE, size):
+            check += self.buf[i]
+        struct.pack_into(HEADER, self.buf, 0, SYNC, self.kind, self.count, \
+                self.dropped & 0xffff, check & 0xffff, self.write_us)
+        self.count = 0
+
+        if self.poller and not self.ready():
+            self.dropped += 1
+            return
+
+        start = utime.ticks_us()
+        self.stream.write(self.buf if size == len(self.buf) else self.view[:size])
+        self.write_us = utime.ticks_diff(utime.ticks_us(), start)
+        self.total_us += self.write_us
@@ -0,0 +1,142 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# Time service on the USB serial, so that a host next to the generator can
+# have the time the IRIG output carries without decoding the audio. Like NTP,
+# the host sends a query with its own timestamp (the 'originate'), and the
+# reply has the IRIG time the query was received and the reply sent - so the
+# host can estimate its offset and the round trip, less the time the query
+# was waiting/handled here (see 'test_scripts/telemetry/time_client.py').
+#
+# Query, an ASCII line:
+#   '?' + 16 hex digits (the originate, echoed as 8 bytes) + '\n'
+#
+# Reply, a binary telemetry batch (kind 4, see 'libs/telemetry.py') so that
+# the host can pick it out from the '.'s or other telemetry:
+#   8 bytes originate
+#   u16 UTC day, u32 seconds since midnight, u32 ns - query received
+#   u16 UTC day, u32 seconds since midnight, u32 ns - reply sent
+#
+# The receive time is taken from 'irig_clock' (see 'libs/irig_clock.py') as
+# soon as the '?' is read, and the transmit time just before the write - right
+# however long between queries, as the frame loop updates the clock. The
+# serial is only polled from the frame loop, after any refill, and neither
+# the read or the write ever blocks - a reply is dropped if the port is not
+# ready. Nothing is allocated per query. Other bytes (ie. user data hex lines)
+# are passed on to 'other()'.
+
+import struct
+import sys
+from array import array
+
+from libs.telemetry import Telemetry
+
+QUERY = 0x3f                    # '?'
+QUERY_DIGITS = 16
+POLL_BYTES = 64                 # at most, per poll
+KIND_TIME = 4
+TIME_RECORD = "<8sHIIHII"
+
+
+class TimeService:
+    def __init__(self, clock, stream=None, out=None, other=None):
+        self.clock = clock
+        self.stream = stream or getattr(sys.stdin, "buffer", sys.stdin)
+        self.other = other
+        self.reply = Telemetry(batch=1, stream=out, record=TIME_RECORD, \
+                kind=KIND_TIME)
+        self.byte = bytearray(1)
+        self.originate = bytearray(8)
+        self.rx = array("i", [0, 0, 0])
+        self.tx = array("i", [0, 0, 0])
+        self.digits = -1                # not in a query, -2 skipping a bad one
+        self.queries = 0
+        self.replies = 0
+        self.bad = 0
+
+        try:
+            import select
+            self.poller = select.poll()
+            self.poller.register(self.stream, select.POLLIN)
+        except (ImportError, AttributeError, TypeError, OSError):
+            self.poller = None
+        self.ipoll = getattr(self.poller, "ipoll", None)
+
+    def ready(self):
+        if self.poller is None:
+            return True                 # ie. a file, read returns 0 at the end
+        if self.ipoll is None:
+            return bool(self.poller.poll(0))
+        for event in self.ipoll(0):
+            return True
+        return False
+
+    def poll(self):
+        # from the frame loop, returns the count of replies
+        count = 0
+        for n in range(POLL_BYTES):
+            if not self.ready() or not self.stream.readinto(self.byte):
+                break
+            c = self.byte[0]
+
+            if self.digits == -1:
+                if c == QUERY:
+                    # as close to receipt as possible
+                    self.clock.now(self.rx)
+                    self.digits = 0
+                    self.queries += 1
+                elif self.other:
+                    self.other(c)
+                continue
+
+            if c in (0x0a, 0x0d):
+                if self.digits == QUERY_DIGITS:
+                    self.send()
+                    count += 1
+                elif self.digits >= 0:
+                    self.bad += 1
+                self.digits = -1
+                continue
+
+            v = hex_value(c)
+            if self.digits == -2 or v < 0 or self.digits >= QUERY_DIGITS:
+                # skip the rest of the line, rather than pass it on
+                if self.digits != -2:
+                    self.bad += 1
+                self.digits = -2
+                continue
+            i = self.digits >> 1
+            if self.digits & 1:
+                self.originate[i] |= v
+            else:
+                self.originate[i] = v << 4
+            self.digits += 1
+        return count
+
+    def send(self):
+        t = self.reply
+        rx = self.rx
+        tx = self.clock.now(self.tx)
+        struct.pack_into(TIME_RECORD, t.buf, t.slot(), self.originate, \
+                rx[0], rx[1], rx[2], tx[0], tx[1], tx[2])
+        dropped = t.dropped
+        t.commit()
+        if t.dropped == dropped:
+            self.replies += 1
+
+    def report(self):
+        print("Time service: %d queries, %d replies, %d dropped, %d bad" % \
+                (self.queries, self.replies, self.reply.dropped, self.bad))
+
+
+def hex_value(c):
+    if 0x30 <= c <= 0x39:
+        return c - 0x30
+    c |= 0x20                           # lower case
+    if 0x61 <= c <= 0x66:
+        return c - 0x61 + 10
+    return -1
@@ -0,0 +1,77 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# Integer timebase for the frames being packed. Previously the time was kept
+# as float seconds, adding '1000 / irig_freq' each frame - which on the Pico
+# (single precision floats) can not even hold today's UTC seconds, and in
+# IRIG-A the repeated 0.1's drift so that a tenth is repeated/skipped.
+#
+# Instead the time is an epoch (the UTC day) and a count of frames since its
+# midnight. Both stay as small ints (days < 2^30, frames < 8640000 at 100
+# frames/s) so advancing and reading the fields allocates nothing, and the
+# date is only recomputed at midnight.
+#
+# Seconds, tenths and hundredths are exact for any frame rate dividing 100,
+# ie. IRIG-B (1 frame/s), IRIG-A (10) and IRIG-G (100).
+
+import utime
+
+DAY = 86400
+
+
+class Timebase:
+    def __init__(self, seconds=0, rate=1):
+        # 'seconds' (UTC, int) of the first frame, 'rate' frames per second
+        if rate < 1 or 100 % rate:
+            raise ValueError("frame rate %d does not divide 100" % rate)
+        self.rate = rate
+        self.per_day = DAY * rate
+        self.set(seconds)
+
+    def set(self, seconds, sub=0):
+        # to frame 'sub' of UTC 'seconds'
+        self.day = seconds // DAY
+        self.frame = (seconds - (self.day * DAY)) * self.rate + sub
+        self._date()
+
+    def _date(self):
+        # year and day of year, once per day
+        gm = utime.gmtime(self.day * DAY)
+        self.year = gm[0]
+        self.doy = gm[7]
+
+    def advance(self, frames=1):
+        self.frame += frames
+        if self.frame >= self.per_day:
+            self.day += self.frame // self.per_day
+            self.frame %= self.per_day
+            self._date()
+
+    def shift(self, seconds):
+        # by whole seconds (+/-), ie. when re-seeded from GPS
+        self.set(self.seconds() + seconds, self.sub())
+
+    def tod(self):
+        # seconds since midnight
+        return self.frame // self.rate
+
+    def sub(self):
+        # frame within the second
+        return self.frame % self.rate
+
+    def tenths(self):
+        return (self.frame % self.rate) * 10 // self.rate
+
+    def hundredths(self):
+        return (self.frame % self.rate) * 100 // self.rate
+
+    def seconds(self):
+        # UTC seconds, may allocate (not for the frame loop)
+        return (self.day * DAY) + (self.frame // self.rate)
+
+    def __str__(self):
+        return "%d.%2.2d" % (self.seconds(), self.hundredths())
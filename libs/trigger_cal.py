@@ -0,0 +1,187 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# Per-flow corrections for 'precision_handler'. The handler finds where in
+# SM-0's 10 cycle clock it is by sampling SM0_ADDR, and takes one of 5 paths
+# ('flows') to 'aligned' - each path padded by hand so that the triggers land
+# on the same cycle. It then jumps into a sled of nops by the SM-1 phase.
+#
+# Each path now loads a correction from the handler's table, which moves
+# the jump into the sled by +/-3 cycles (8.3ns each). Flow-1,2 and Flow-3,4
+# share a path (and so a correction), splitting only on the last sample.
+#
+# After the triggers the handler leaves which path it took, the last
+# SM0_ADDR read and the phase in the table, so that a calibration sweep
+# ('test_scripts/sync/calibrate.py') can measure the trigger delay per flow
+# and fit the corrections. These are saved as a small text file:
+#   cpu_freq 120000000
+#   correction 0 1 -1
+#   latency 9951
+# and loaded at start up, only if the CPU clock matches. The latency is the
+# corrected delay from the PPS edge to the start of the trigger 1 SMs, in
+# CPU cycles, used to place the reference pulses (see 'libs/pulses.py').
+
+from machine import mem32
+
+from libs.stats import Stats
+
+CAL_PAD = 3                     # nops either side of the phase sled
+
+# table offsets of the corrections, and the flows using each
+CAL_SLOTS = ((0x1C, (1, 2)), (0x20, (5,)), (0x24, (3, 4)))
+
+DIAG_SLOT = 0x28
+DIAG_SM0 = 0x2C
+DIAG_PHASE = 0x30
+
+
+def table(handler):
+    # address of the handler's table, it returns it when called with 1
+    return handler(1)
+
+
+def set_corrections(addr, cycles):
+    # cycles earlier, for each of CAL_SLOTS
+    for (offset, flows), c in zip(CAL_SLOTS, cycles):
+        if not -CAL_PAD <= c <= CAL_PAD:
+            raise ValueError("correction %d out of range, Flow-%s" % \
+                    (c, ",".join([str(f) for f in flows])))
+        mem32[addr + offset] = 2 * (CAL_PAD + c)
+
+
+def corrections(addr):
+    return [(mem32[addr + offset] // 2) - CAL_PAD for offset, flows in CAL_SLOTS]
+
+
+def last_flow(addr):
+    # (flow, phase) of the last trigger, or None - and clears it
+    slot = mem32[addr + DIAG_SLOT]
+    if not slot:
+        return None
+    mem32[addr + DIAG_SLOT] = 0
+
+    # Flow-1,3 saw SM-0 reach 'base+2' on the last sample
+    bottom = (mem32[mem32[addr]] >> 7) & 0x1f
+    late = mem32[addr + DIAG_SM0] != bottom + 2
+    if slot == 0x20:
+        flow = 5
+    elif slot == 0x1C:
+        flow = 2 if late else 1
+    else:
+        flow = 4 if late else 3
+    phase = (mem32[addr + DIAG_PHASE] - mem32[addr + slot]) // 2
+    return (flow, phase)
+
+
+def _read(name, cpu_freq):
+    # {key: [ints]} from a calibration file, or None if missing/other clock
+    values = {}
+    try:
+        with open(name) as f:
+            for line in f:
+                line = line.split("#")[0].split()
+                if line:
+                    values[line[0]] = [int(v) for v in line[1:]]
+    except (OSError, ValueError):
+        return None
+    if values.get("cpu_freq") != [cpu_freq]:
+        return None
+    return values
+
+
+def load(name, cpu_freq):
+    # corrections from a calibration file, or None if missing/other clock
+    values = _read(name, cpu_freq)
+    if values is None:
+        return None
+    cycles = values.get("correction")
+    if cycles is None or len(cycles) != len(CAL_SLOTS):
+        return None
+    return cycles
+
+
+def load_latency(name, cpu_freq):
+    # PPS edge to trigger 1 (CPU cycles), or None if not calibrated
+    values = _read(name, cpu_freq)
+    if values is None or not values.get("latency"):
+        return None
+    return values["latency"][0]
+
+
+def save(name, cpu_freq, cycles, latency=None):
+    with open(name, "w") as f:
+        f.write("# precision trigger calibration, cycles earlier for Flow-1,2 Flow-5 Flow-3,4\n")
+        f.write("cpu_freq %d\n" % cpu_freq)
+        f.write("correction %s\n" % " ".join([str(c) for c in cycles]))
+        if latency is not None:
+            f.write("latency %d\n" % latency)
+
+
+class TriggerCal:
+    # trigger delays (cycles) per flow and phase, and the fit
+    def __init__(self, cpu_freq, applied=(0, 0, 0)):
+        self.cpu_freq = cpu_freq
+        self.applied = list(applied)
+        self.flows = [Stats() for f in range(6)]
+        self.phases = [Stats() for p in range(11)]
+        self.lost = 0
+        self.target = None
+
+    def add(self, delay, flow, phase):
+        # without the correction that was applied, ie. as if uncorrected
+        for (offset, flows), c in zip(CAL_SLOTS, self.applied):
+            if flow in flows:
+                delay += c
+        self.flows[flow].add(delay)
+        if 0 <= phase <= 10:
+            self.phases[phase].add(delay)
+
+    def fit(self):
+        # corrections which bring each path to the mean of the paths, and
+        # the spread (ns) left within the paths
+        means = []
+        for offset, flows in CAL_SLOTS:
+            count = sum([self.flows[f].count for f in flows])
+            if count:
+                means.append(sum([self.flows[f].mean * self.flows[f].count \
+                        for f in flows]) / count)
+            else:
+                means.append(None)
+        known = [m for m in means if m is not None]
+        if not known:
+            return None
+        target = sum(known) / len(known)
+        self.target = target
+        return [0 if m is None else \
+                max(-CAL_PAD, min(CAL_PAD, int(round(m - target)))) \
+                for m in means]
+
+    def report(self, fitted=None):
+        ns = 1e9 / self.cpu_freq
+        for f in range(1, 6):
+            s = self.flows[f]
+            if s.count:
+                print("Flow-%d: %4d trials, %9.2f cycles mean, %5.2f sigma, %d..%d" % \
+                        (f, s.count, s.mean, s.sigma(), s.min, s.max))
+        for p in range(11):
+            s = self.phases[p]
+            if s.count:
+                print("Phase %2d: %4d trials, %9.2f cycles mean" % (p, s.count, s.mean))
+        if self.lost:
+            print("%d trials without a measurement" % self.lost)
+        if fitted:
+            spread = []
+            for (offset, flows), c in zip(CAL_SLOTS, fitted):
+                for f in flows:
+                    s = self.flows[f]
+                    if s.count:
+                        spread += [s.min - c, s.max - c]
+            print("Correction: %s cycles earlier (Flow-1,2 Flow-5 Flow-3,4)" % \
+                    " ".join(["%+d" % c for c in fitted]))
+            if spread:
+                print("Corrected delays %.1f ns spread (%.1f ns per cycle)" % \
+                        ((max(spread) - min(spread)) * ns, ns))
@@ -0,0 +1,154 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# Pre-trigger window for 'precision_12k'. After the PPS, SM-0 counts out
+# its 'before' loop, raises the CPU IRQ, and counts out its 'after' loop -
+# the handler must be running before that ends, or it aborts ("you are too
+# slow") and the trigger is tried again on the next PPS. The 'after' loop is
+# the window; longer is more tolerant of ISR latency, but spins longer with
+# the interrupts disabled.
+#
+# 'test_scripts/sync/precision.py' has 3 variants, which split the same loop
+# length differently. Rather than loading a different program, the window is
+# patched into SM-0's instructions before it is started (the total, and so
+# the trigger time, is unchanged):
+#   0 set(x, X)
+#   1 set(y, Y)
+#   4 set(pins, 1) [d]
+#   5 jmp(x_dec, "before") [b]      (X+1) * (b+1)
+#   7 jmp(y_dec, "after") [a]       (Y+1) * (a+1), the window
+#
+# The ISR latency is measured at start up by 'dry firing' the handler, which
+# records SysTick at entry (table word 0x38), against SysTick just before
+# forcing the IRQ. The window with the best expected first-try success is
+# used, the shortest if they tie.
+#
+# The dry fires run with SM-0 idle and only the start up code on the CPU, so
+# the latency is that of a quiet system - not of whatever else is running at
+# the real trigger - and where it is low every window is expected to succeed,
+# so the shortest (12k) is chosen. The real triggers are counted, and the
+# success rate over all of them reported against the expected one.
+
+import utime
+from machine import mem32
+
+from libs.pio_loader import PIO_INSTR_MEM, SM_EXECCTRL, SM_INSTR, wait_for
+
+SYST_CSR = 0xe000e010
+SYST_RVR = 0xe000e014
+SYST_CVR = 0xe000e018
+
+DIAG_ENTRY = 0x38
+
+# SM-0 clocks per loop of 'precision_12k', with the 'wait' satisfied at once,
+# ie. 5 + (set delay + 1) + (X+1) * (b+1) + (Y+1) * (a+1)
+LOOP_CLOCKS = 997
+
+# name, set delay, X, before delay, Y, after delay - all 'LOOP_CLOCKS'
+WINDOWS = (("12k", 4, 29, 22, 26, 10),
+           ("12ka", 7, 26, 21, 29, 12),
+           ("12kb", 0, 30, 12, 27, 20))
+
+# CPU cycles from ISR entry to the handler's SM-0 check, with margin
+WINDOW_GUARD = 100
+
+
+def window_clocks(w):
+    return (w[4] + 1) * (w[5] + 1)
+
+
+def systick():
+    # SysTick reload, starting it (without its interrupt) if not running
+    if not mem32[SYST_CSR] & 1:
+        mem32[SYST_RVR] = 0xffffff
+        mem32[SYST_CVR] = 0
+        mem32[SYST_CSR] = 0x05          # processor clock, enabled
+    return mem32[SYST_RVR] & 0xffffff
+
+
+class TriggerWindow:
+    def __init__(self, prog, cpu_freq, div=10):
+        self.prog = prog
+        self.cpu_freq = cpu_freq
+        self.div = div                  # CPU cycles per SM-0 clock
+        self.latency = []
+        self.window = WINDOWS[0]
+        self.attempts = 0
+        self.successes = 0
+
+    def sample(self, count, sm_reg, table, done):
+        # 'count' ISR latencies (CPU cycles), dry firing the handler on SM-0
+        # - 'done()' returns the handler's completion count
+        reload = systick()
+        instr = sm_reg + SM_INSTR
+        cvr = SYST_CVR
+        for i in range(count + 1):
+            seen = done()
+            a = mem32[cvr]
+            b = mem32[cvr]
+            t = mem32[cvr]
+            mem32[instr] = 0xc010       # 'irq(rel(0))'
+            if not wait_for(lambda: done() != seen, 100):
+                continue
+            entry = mem32[table + DIAG_ENTRY]
+            # less the Python between reading SysTick and forcing the IRQ
+            lat = ((t - entry) % (reload + 1)) - ((a - b) % (reload + 1))
+            if i:
+                self.latency.append(max(lat, 0))   # first is a cold start
+            utime.sleep_ms(1)
+        return self.latency
+
+    def success(self, w):
+        # expected first-try success, from the latencies sampled
+        if not self.latency:
+            return 0.0
+        limit = window_clocks(w) * self.div - WINDOW_GUARD
+        return sum([1 for l in self.latency if l < limit]) / len(self.latency)
+
+    def choose(self):
+        best = None
+        for w in sorted(WINDOWS, key=window_clocks):
+            if best is None or self.success(w) > self.success(best):
+                best = w
+        self.window = best
+        return best
+
+    def attempt(self, ok):
+        # the outcome of each real trigger
+        self.attempts += 1
+        if ok:
+            self.successes += 1
+
+    def patch(self, pio_base, sm_reg):
+        # into SM-0's instructions, which must be stopped
+        origin = (mem32[sm_reg + SM_EXECCTRL] >> 7) & 0x1f
+        name, d, x, b, y, a = self.window
+        words = list(self.prog[0])
+        words[0] = (words[0] & ~0x1f) | x
+        words[1] = (words[1] & ~0x1f) | y
+        words[4] = (words[4] & ~0x1f00) | (d << 8)
+        words[5] = (words[5] & ~0x1f00) | (b << 8)
+        words[7] = (words[7] & ~0x1f00) | (a << 8)
+        for i in (0, 1, 4, 5, 7):
+            w = words[i]
+            if w & 0xe000 == 0:         # 'jmp', relocated
+                w = (w & ~0x1f) | ((w + origin) & 0x1f)
+            mem32[pio_base + PIO_INSTR_MEM + (4 * ((origin + i) & 0x1f))] = w
+
+    def report(self):
+        us = 1000000 / self.cpu_freq
+        w = self.window
+        line = "Trigger window: %s, %.1f us" % (w[0], window_clocks(w) * self.div * us)
+        if self.latency:
+            line += ", ISR latency %.1f..%.1f us (%d samples), %.0f%% expected" % \
+                    (min(self.latency) * us, max(self.latency) * us, \
+                    len(self.latency), 100 * self.success(w))
+        print(line)
+        if self.attempts:
+            print("Trigger: %d of %d attempts succeeded, %.0f%%" % \
+                    (self.successes, self.attempts, \
+                    100 * self.successes / self.attempts))
@@ -0,0 +1,169 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# User data in the spare control-function bits. Words are queued by the
+# application (or read as hex lines from the USB serial) and one is merged
+# into each frame as it is packed.
+#
+# The frame packers take a 16 bit 'user' word, which lands in:
+#   word bits  0..8  -> frame bits 60..68 (after P6, IEEE-1344 leap/DST/TZ)
+#   word bit   9     -> frame bit  70     (after P7, IEEE-1344 0.5h TZ)
+#   word bits 10..12 -> frame bits 42..44 (after Day of Year, undefined)
+#   word bits 13..15 -> frame bits 76..78 (after parity, undefined)
+#
+# By default only the undefined bits are used - word bit 10 flags that the
+# frame carries data, leaving 5 bits payload - so the IEEE-1344 fields stay
+# as 'UTC, no leap seconds'. With 'ieee1344=True' the leap/DST/TZ bits are
+# taken too (word bit 0 is the flag, 15 bits payload), and a receiver which
+# decodes IEEE-1344 will apply them as leap second/DST/TZ offsets.
+#
+# With no data queued the word is 0, and the frame is exactly as before.
+#
+# Reading the hex lines allocates nothing: bytes are read into a fixed buffer
+# and the word is built up a digit at a time.
+
+import sys
+from array import array
+
+USER_BITS = 16
+PAYLOAD_BITS = 5                # undefined bits only
+PAYLOAD_BITS_1344 = USER_BITS - 1
+USER_VALID = 0x0400
+USER_VALID_1344 = 0x0001
+
+# IRIG formats, name -> frames per second
+FORMATS = (("IRIG-B", 1), ("IRIG-A", 10))
+
+
+def bandwidth(irig_freq=None, bits=PAYLOAD_BITS):
+    # payload bits/s, for each format (or the one with 'irig_freq')
+    result = {}
+    for name, rate in FORMATS:
+        if irig_freq is None or irig_freq == rate * 1000:
+            result[name] = bits * rate
+    return result
+
+
+def payload(word, ieee1344=False):
+    # the payload of a 'user' word, or None if it carries none
+    valid = USER_VALID_1344 if ieee1344 else USER_VALID
+    if not word & valid:
+        return None
+    return (word & 0xffff) // (valid << 1)
+
+
+class UserData:
+    def __init__(self, depth=64, ieee1344=False):
+        # 'ieee1344' also takes the leap/DST/TZ bits, see above
+        self.bits = PAYLOAD_BITS_1344 if ieee1344 else PAYLOAD_BITS
+        self.valid = USER_VALID_1344 if ieee1344 else USER_VALID
+        self.mask = (1 << self.bits) - 1
+
+        # bounded ring, pre-allocated so 'next()' does not allocate
+        self.ring = array("H", [0] * depth)
+        self.depth = depth
+        self.head = 0
+        self.tail = 0
+        self.sent = 0
+        self.dropped = 0
+        self.idle = 0
+        self.poller = None
+        self.byte = bytearray(1)
+        self.value = 0
+        self.digits = 0                 # in the line, -1 skipping a bad one
+
+    def pending(self):
+        return (self.head - self.tail) % (self.depth * 2)
+
+    def put(self, value):
+        # queue a word of 'bits', returns False (and counts it) if full
+        if self.pending() >= self.depth:
+            self.dropped += 1
+            return False
+        self.ring[self.head % self.depth] = value & self.mask
+        self.head = (self.head + 1) % (self.depth * 2)
+        return True
+
+    def next(self):
+        # 'user' word for the next frame
+        if self.head == self.tail:
+            self.idle += 1
+            return 0
+        value = self.ring[self.tail % self.depth]
+        self.tail = (self.tail + 1) % (self.depth * 2)
+        self.sent += 1
+        return (value * (self.valid << 1)) | self.valid
+
+    def poll_serial(self, stream=None):
+        # Queue words sent as hex lines (ie. '1a2b\n') on the USB serial,
+        # without blocking. Returns the count queued.
+        import select
+
+        if self.poller is None:
+            self.stream = stream or getattr(sys.stdin, "buffer", sys.stdin)
+            self.poller = select.poll()
+            self.poller.register(self.stream, select.POLLIN)
+            self.ipoll = getattr(self.poller, "ipoll", None)
+
+        count = 0
+        while self.ready():
+            if not self.stream.readinto(self.byte):
+                break
+            if self.feed(self.byte[0]):
+                count += 1
+        return count
+
+    def ready(self):
+        # 'ipoll()' where there is one, as 'poll()' returns a new list
+        if self.ipoll is None:
+            return bool(self.poller.poll(0))
+        for event in self.ipoll(0):
+            return True
+        return False
+
+    def feed(self, c):
+        # a byte of a hex line, ie. passed on by 'libs/time_service.py'.
+        # Returns True when a word is queued
+        queued = False
+        if c in (0x0a, 0x0d):
+            if self.digits > 0:
+                queued = self.put(self.value)
+            self.value = 0
+            self.digits = 0
+            return queued
+        if c in (0x20, 0x09) or self.digits < 0:
+            return False
+
+        c |= 0x20                       # lower case, digits are unchanged
+        if 0x30 <= c <= 0x39:
+            v = c - 0x30
+        elif 0x61 <= c <= 0x66:
+            v = c - 0x61 + 10
+        else:
+            self.digits = -1            # not hex, the line is dropped
+            return False
+        if self.digits < 8:
+            # only the low 16 bits are kept, 'put()' masks to the payload
+            self.value = ((self.value << 4) | v) & 0xffff
+            self.digits += 1
+        return queued
+
+    def report(self, irig_freq):
+        print("User data: %d sent, %d pending, %d dropped, %d idle frames, %d bits/s" % \
+                (self.sent, self.pending(), self.dropped, self.idle, \
+                sum(bandwidth(irig_freq, self.bits).values())))
+
+
+def unpack(frame):
+    # The 'user' word from a packed frame (as FIFO words, 2 bits per
+    # position), ie. for checking a capture
+    bit = lambda n: (frame[n >> 4] >> ((n & 0x0f) << 1)) & 1
+    word = 0
+    for i, n in enumerate(list(range(60, 69)) + [70] + \
+                    list(range(42, 45)) + list(range(76, 79))):
+        word |= bit(n) << i
+    return word
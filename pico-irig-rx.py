@@ -0,0 +1,68 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# MIT license - go make something cool....
+#
+# IRIG-B/A receiver, decoding a DCLS input (GPIO10) and driving an on-time
+# output (GPIO11) at the leading edge of each frame's Pr. The output can be
+# connected to the 1PPS input (GPIO18) of a board running 'pico-irig.py',
+# to re-trigger the generator.
+#
+# See 'libs/irig_rx.py' for the StateMachine and decoder, and
+# 'test_scripts/rx/rx_check.py' for checking against rendered waveforms.
+
+import rp2
+import utime
+from machine import Pin, freq
+
+from libs.irig_rx import irig_rx, IrigReceiver, RX_CLOCKS, RX_LATENCY
+from libs.pio_loader import PIOLoader, PIO_FDEBUG
+
+# Clock speeds
+irig_freq = 1000		# 1KHz modulation for IRIG-B
+#irig_freq = 10000		# 10KHz modulation for IRIG-A
+cpu_freq = 120000000
+
+rx_pin = 10                     # DCLS input
+on_time_pin = 11                # on-time output, Pr leading edge
+
+#---------------------------------------------
+
+def main():
+    if freq() != cpu_freq:
+        freq(cpu_freq)
+
+    bit_rate = irig_freq // 10
+    loader = PIOLoader()
+    loader.add("rx", "rx", irig_rx, bit_rate * RX_CLOCKS, \
+                        in_base=Pin(rx_pin, Pin.IN), jmp_pin=Pin(rx_pin), \
+                        set_base=Pin(on_time_pin))
+    loader.plan()
+    loader.load()
+
+    rx = IrigReceiver(loader.sm("rx"), loader.pio_reg("rx", PIO_FDEBUG), \
+                        loader.irq_flag("rx"))
+    rx.start()
+    print("Receiving IRIG-%s on GPIO%d, on-time output on GPIO%d (+%.2f us)" % \
+            ("B" if bit_rate == 100 else "A", rx_pin, on_time_pin, \
+            RX_LATENCY * 1000000 / (bit_rate * RX_CLOCKS)))
+
+    while True:
+        frame = rx.poll()
+        if frame:
+            utc, tenths, cf, sbs, ok = frame
+            if tenths == 0 or bit_rate == 100:
+                t = utime.gmtime(utc)
+                print("%4.4d-%2.2d-%2.2d %2.2d:%2.2d:%2.2d.%d CF=0x%5.5x SBS=%d%s" % \
+                        (t[0], t[1], t[2], t[3], t[4], t[5], tenths, cf, sbs, \
+                        "" if ok else " (SBS mismatch)"))
+            if rx.decoder.frames % (60 * bit_rate // 100) == 0:
+                rx.report()
+        utime.sleep(0.001)
+
+
+# when compiled/frozen, call main() from 'main.py'
+if __name__ == "__main__":
+    main()
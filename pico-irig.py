@@ -32,14 +32,20 @@
 
 import rp2
 import utime
+from array import array
 from random import random
-from machine import Pin, disable_irq, enable_irq, mem32, freq, I2C
+from machine import Pin, disable_irq, enable_irq, mem32, freq, I2C, UART
 
 from micropython import alloc_emergency_exception_buf
 alloc_emergency_exception_buf(100)
 
 # https://github.com/pangopi/micropython-DS3231-AT24C32
 from libs.ds3231 import DS3231
+from libs.timebase import Timebase
+from libs.irig_clock import IrigClock, DIAG_TRIGGER
+from libs.pulses import PULSE_PPS, PULSE_10PPS, PULSE_PPM, PULSE_FRAME
+from libs.pio_loader import PIOLoader, SM_INSTR, SM_EXECCTRL, PIO_IRQ_FORCE, \
+                PIO_FDEBUG, PIO_BASE, PIO_IRQ_DONE, wait_for
 
 # Clock speeds
 irig_freq = 1000		# 1KHz modulation for IRIG-B
@@ -53,15 +59,78 @@ IRIG_RTC = 1
 IRIG_GPS = 2
 irig_trigger = IRIG_FAKE
 
+# GPS(DO), NMEA (RMC/ZDA) on UART-1 RX, 1PPS on GPIO18
+gps_uart = 1
+gps_rx = 21
+gps_baud = 9600
+gps_describes = 0               # 1 if NMEA gives the time of the *next* PPS
+
 IRIG_PPS_RISING = 0
 IRIG_PPS_FALLING = 1
 irig_polarity = IRIG_PPS_RISING
 
+# Modulator
+IRIG_ASK_PIO = 0        # 'irig_ask' StateMachine, with resistors on GPIO0/1
+IRIG_ASK_PWM = 1        # sine table via PWM/DMA on GPIO0, needs RC filter
+irig_modulator = IRIG_ASK_PIO
+
+# Start up, poll the hardware state rather than use fixed (debug) delays
+irig_fast_start = False
+
+# Stream user data in the spare control bits, from 'irig_user.put()' or as
+# hex lines on the USB serial (see 'libs/user_data.py')
+irig_user_data = False
+# Also use the IEEE-1344 leap second/DST/TZ bits (15 bits per frame, rather
+# than 5) - only for receivers which ignore IEEE-1344, see the README
+irig_user_ieee1344 = False
+
+# Binary telemetry records on the USB serial, rather than a '.' per frame
+# (see 'libs/telemetry.py' and 'test_scripts/telemetry/read_telemetry.py')
+irig_telemetry = False
+
+# Per-flow corrections for the precision trigger, from the calibration sweep
+# ('test_scripts/sync/calibrate.py'), used if the file is there and matches
+# the CPU clock (see 'libs/trigger_cal.py')
+irig_trigger_cal = "trigger_cal.txt"
+
+# Pick SM-0's pre-trigger window from the ISR latency, measured over this
+# many 'dry fires' at start up (see 'libs/trigger_window.py'), 0 to leave it
+irig_trigger_window = 32
+
+# Check the DCLS output (GPIO6) with a spare StateMachine, decoding the
+# frames and comparing them with those pushed (see 'libs/loopback.py')
+irig_loopback = False
+
+# Timestamp rising edges on a spare GPIO against the IRIG timebase, streamed
+# as telemetry records (see 'libs/events.py'). Uses the last StateMachine
+# and instructions of PIO1, so not with 'irig_loopback' or IRIG_ASK_PWM
+irig_events = False
+event_pin = 22
+
+# Reference pulses (PULSE_PPS, PULSE_10PPS, PULSE_PPM or PULSE_FRAME), started
+# with the IRIG output and on the on-time mark (see 'libs/pulses.py'). Uses
+# the last StateMachine of PIO1, so not with 'irig_loopback' or 'irig_events'
+irig_pulses = None
+pulse_pin = 9
+pulse_width_ms = 10
+
+# Disable the automatic GC once running, and collect right after each frame
+# is pushed instead, alarming if the frame loop allocates (see 'libs/heap.py')
+irig_gc_frame = False
+
+# Answer time queries on the USB serial, NTP-like, with the IRIG time of the
+# output (see 'libs/time_service.py' and 'test_scripts/telemetry/time_client.py')
+irig_time_service = False
+
 # globals
-irig_sm = []
 irig_fifo = []
-irig_seconds = 0.0
+irig_time = None                # Timebase of the next frame to pack
 irig_fail = 0
+irig_lock_ms = None             # boot to first trigger, in ms
+irig_done = 0                   # count of precision handler completions
+irig_user = None                # user data queue
+irig_done_us = 0                # ticks_us() of the last completion
+irig_clock = None               # IRIG time of the output now, once running
 
 ret = 0
 
@@ -69,8 +138,8 @@ ret = 0
 @rp2.asm_pio(set_init=[rp2.PIO.OUT_LOW])
 
 def precision_12k():
-    wrap_target()                   # loop length = '1000-1' SM-clks @ 12MHz
-
+    wrap_target()                   # loop length = 997 SM-clks @ 12MHz, as
+                                    # 'LOOP_CLOCKS' in 'libs/trigger_window.py'
     set(x, 29)                      # some thing 'weird' about detecting 1st address
     set(y, 26)                      # probably with the way '[]' or 'wrap()' works...
 
@@ -83,14 +152,15 @@ def precision_12k():
     '''
     set(pins, 1) [4]                # make 10 CPU cycles earlier
     label("before")
-    jmp(x_dec, "before") [22]       # 30 * 23 = 690, + 6 = 696
+    jmp(x_dec, "before") [22]       # 30 * 23 = 690, + 5 = 695
                                     # ~= 58 us
                                     # --
     irq(rel(0)) 				    # set IRQ to trigger handler
                                     # IRQ response time ~10-20us
                                     # note: address = 'base+7'
     label("after")
-    jmp(y_dec, "after") [10]        # 27 * 11 = 297, + (1 * 6) = 303
+    jmp(y_dec, "after") [10]        # 27 * 11 = 297, + 5 = 302 (with the
+                                    # 'irq', 3 'set's and the 'wait')
                                     # ~= 25 us
     wrap()
 
@@ -342,6 +412,9 @@ def irig_ask():
 
 # ---
 
+# The 'data()' table is checked against where the PIOLoader places the
+# programs, by reading it back. For IRIG_ASK_PWM the 'trigger 2' words are
+# patched at run time, to start the PWM slice.
 @micropython.asm_thumb
 
 def precision_handler(r0):
@@ -359,29 +432,58 @@ def precision_handler(r0):
     data    (4, 0x50300000)     #  0x08 - Bank 2 - CTRL Register
     data    (4, 0x00000707)     #  0x0C - Align Dividers for SM4/5/6 and Enable SM4/5/6
 
-    # trigger 2 - optional, requires code changes...
+    # trigger 2 - for IRIG_ASK_PWM, patched to the PWM EN Register and
+    # the slice's bit (the FIFO is then SM6, started by trigger 1)
     data    (4, 0x50200000)     #  0x10 - Bank 0 - CTRL Register
     data    (4, 0x00000407)     #  0x14 - Align Dividers for SM2 and Enable SM2
 
+    # handler done (triggered or aborted), IRQ-3 is a soft IRQ for uPython
+    data    (4, 0x50200034)     #  0x18 - Bank 1 - IRQ_FORCE Register
+
+    # per-flow corrections, written by 'libs/trigger_cal.py'
+    data    (4, 0x00000006)     #  0x1C - Flow-1,2: 2 x (3 + cycles earlier)
+    data    (4, 0x00000006)     #  0x20 - Flow-5
+    data    (4, 0x00000006)     #  0x24 - Flow-3,4
+
+    # diagnostics, written after the triggers
+    data    (4, 0x00000000)     #  0x28 - offset of the flow's correction
+    data    (4, 0x00000000)     #  0x2C - last SM0_ADDR read
+    data    (4, 0x00000000)     #  0x30 - phase, plus correction
+
+    # ISR entry time, for 'libs/trigger_window.py'
+    data    (4, 0xe000e018)     #  0x34 - SysTick SYST_CVR
+    data    (4, 0x00000000)     #  0x38 - SYST_CVR at entry
+
+    # trigger time, for 'libs/irig_clock.py'
+    data    (4, 0x00000000)     #  0x3C - SYST_CVR just after the triggers
+
     align   (2)
     # --
     label   (check_a)
     cmp     (r2, r5)
     beq     (check_b)           # ie taken for Flow-5
 
-    nop     ()
+    mov     (r4, 0x1C)          # Flow-1,2 correction
     nop     ()
     b       (check_c)
 
     # --
     label   (check_b)
-    nop     ()
+    mov     (r4, 0x20)          # Flow-5 correction
     nop     ()
     b       (aligned)
 
     # --
     label   (func_entry)
+    cmp     (r0, 1)             # called with 1 returns the table address,
+    bne     (irq_entry)         # for 'libs/trigger_cal.py'
+    b       (table)
+
+    label   (irq_entry)
     cpsid   (r8)
+    ldr     (r1, [r7, 0x34])    # SysTick, counting down at the CPU clock
+    ldr     (r1, [r1, 0])
+    str     (r1, [r7, 0x38])
 
     # checking SM-1 Address (ie Phase)
     ldr     (r1, [r7, 0x04])    # loads 0x502000e4 into r1
@@ -446,7 +548,7 @@ def precision_handler(r0):
     cmp     (r3, r4)
     beq     (check_a)           # taken for Flow-1,2,5
 
-    nop     ()
+    mov     (r4, 0x24)          # Flow-3,4 correction
     nop     ()
     nop     ()
     nop     ()
@@ -458,12 +560,12 @@ def precision_handler(r0):
 
     # --
     label   (aligned)
+    data    (2, 0x593E)         # ldr(r6, [r7, r4]), the flow's correction
 
     # pre-load trigger 1 values
     ldr     (r3, [r7, 0x08])    # loads 0x50300000 into r3
-    ldr     (r4, [r7, 0x0C])    # loads 0x00000101 into r4
-    nop     ()                  # spare/delay
-    nop     ()                  # spare/delay
+    ldr     (r1, [r7, 0x0C])    # loads 0x00000101 into r1
+    add     (r0, r0, r6)        # correct the phase, for the flow
 
     # pre-load trigger 2 values, requires additional 10 cycles
     # note: also need to change loop length in SM-0
@@ -471,20 +573,20 @@ def precision_handler(r0):
     ldr     (r6, [r7, 0x14])    # loads 0x00000F0F into r6
     nop     ()                  # spare/delay
     nop     ()                  # spare/delay
-    nop     ()                  # spare/delay
-    nop     ()                  # spare/delay
-    nop     ()                  # spare/delay
-    nop     ()                  # spare/delay
 
     # --
     # write correcting SM-0 vs SM-1 'phase' with r0 value
-    # every increament of 2 adds 8.3ns
+    # every increament of 2 adds 8.3ns, the 3 nops either side are
+    # for the correction (+/- 3 cycles)
 
     label   (write)
 
     data    (2, 0x4487)         # add(r15, r15, r0)
     nop     ()                  # never hit
 
+    nop     ()                  # correction
+    nop     ()
+    nop     ()
     nop     ()                  # phase-0
     nop     ()
     nop     ()
@@ -495,13 +597,32 @@ def precision_handler(r0):
     nop     ()
     nop     ()
     nop     ()                  # phase-9
+    nop     ()                  # correction
+    nop     ()
+    nop     ()
 
-    str     (r4, [r3, 0])       # Trig-1: Reset SM4's DivClock and start it
+    str     (r1, [r3, 0])       # Trig-1: Reset SM4's DivClock and start it
     str     (r6, [r5, 0])       # Trig-2: Reset SM11/10/9/8 and start them
 
+    str     (r4, [r7, 0x28])    # diagnostics, for calibration
+    str     (r2, [r7, 0x2C])
+    str     (r0, [r7, 0x30])
+
+    ldr     (r3, [r7, 0x34])    # loads 0xe000e018 into r3
+    ldr     (r3, [r3, 0])       # SysTick, 12 cycles after trigger 1
+    str     (r3, [r7, 0x3C])
+
     # --
     label   (abort)
+    ldr     (r3, [r7, 0x18])    # loads 0x50200034 into r3
+    mov     (r4, 0x08)          # IRQ-3
+    str     (r4, [r3, 0])       # Done: signal uPython, after the triggers
     cpsie   (r8)
+    b       (exit)
+
+    label   (table)
+    mov     (r0, r7)
+    label   (exit)
 
 
 @micropython.asm_thumb
@@ -513,6 +634,14 @@ def sync_sm(r0, r1):
     str(r2, [r1, 0])
 
 
+def handler_done(pio):
+    # soft IRQ, from the end of 'precision_handler'
+    global irig_done, irig_done_us
+
+    irig_done_us = utime.ticks_us()
+    irig_done += 1
+
+
 def mp_irq_handler(m):
     global core_dis, ret
 
@@ -568,9 +697,12 @@ def pack_test(value=0xAA):
     pack(0, 1, True)				# Pr0
 
 
-def pack_from_seconds(abs_sec = 0.0):
-    # Pack a frame using float 'seconds'
-    gm = utime.gmtime(int(abs_sec))
+def pack_from_seconds(sec = 0, user = 0, tenths = 0):
+    # Pack a frame for integer UTC 'sec' and 'tenths', with 'user' data in
+    # the spare control bits (see 'libs/user_data.py'). The tenths are not
+    # taken from float seconds, which can be a fraction under (ie. 5.3 as
+    # 5.29999) - a Timebase has them exact, see 'pack_from_timebase()'
+    gm = utime.gmtime(sec)
  
     midnight = utime.mktime([gm[0], gm[1], gm[2], \
                 0, 0, 0, gm[6], gm[7]])
@@ -594,14 +726,14 @@ def pack_from_seconds(abs_sec = 0.0):
     pack(int(gm[3] / 10), 4)
 
     pack(0, 1, True)				# P3
-    pack(gm[7], 4)				    # Day of Year
+    pack(gm[7] % 10, 4)			    # Day of Year
     pack(0, 1)
-    pack(gm[7] >> 4, 4)
+    pack(int(gm[7] / 10) % 10, 4)
 
     pack(0, 1, True)				# P4
-    pack(gm[7] >> 8, 2)			    # Day of Year, continued
-    pack(0, 3)
-    pack(int((abs_sec-int(abs_sec))*10), 4) # Tenths of second
+    pack(int(gm[7] / 100), 2)		# Day of Year, continued
+    pack(user >> 10, 3)
+    pack(tenths, 4)                 # Tenths of second
 
     pack(0, 1, True)				# P5
     pack(gm[0] % 10, 4)			    # Year (00-99)
@@ -611,9 +743,9 @@ def pack_from_seconds(abs_sec = 0.0):
     # Definitions from:
     # https://en.wikipedia.org/wiki/IEEE_1344
     pack(0, 1, True)				# P6
-    pack(0, 9)                      # forcing 'UTC' with no leap seconds
+    pack(user, 9)                   # 'UTC' with no leap seconds, or user data
     pack(0, 1, True)				# P7
-    pack(0, 1)                      # no 0.5 TZ
+    pack(user >> 9, 1)              # no 0.5 TZ
     if irig_trigger == IRIG_FAKE:
         pack(0xF, 4)                # quality is 'not-reliable'
     else:
@@ -627,26 +759,146 @@ def pack_from_seconds(abs_sec = 0.0):
             else:
                 p += (irig_fifo[i] >> (j*2)) & 1
     pack((p & 1), 1)
-    pack(0, 3)
+    pack(user >> 13, 3)
 
     pack(0, 1, True)				# P8
-    pack(int(abs_sec-midnight), 9)
+    pack(sec-midnight, 9)
     pack(0, 1, True)				# P9
-    pack(int(abs_sec-midnight) >> 9, 9)
+    pack((sec-midnight) >> 9, 9)
     pack(0, 1, True)				# P0
 
 
+# Compiled versions of the above, integer only and packing into a fixed
+# buffer rather than a list. These must produce the same words as the
+# bytecode versions, see 'test_scripts/pack/pack_check.py'.
+
+irig_frame = array("I", [0] * 7)
+
+@micropython.viper
+def pack_bits(frame: ptr32, phase: int, value: int, count: int, pr: int) -> int:
+    # As 'pack()', with 'phase' counting pairs from the start of frame
+    while count:
+        i = phase >> 4
+        shift = (phase & 0x0f) << 1
+        if shift == 0:
+            frame[i] = 0
+        if pr:
+            frame[i] = frame[i] | (0x02 << shift)
+        else:
+            frame[i] = frame[i] | ((value & 0x01) << shift)
+        value = value >> 1
+        phase += 1
+        count -= 1
+    return phase
+
+
+@micropython.viper
+def pack_parity(frame: ptr32, words: int) -> int:
+    # As the parity loop in 'pack_from_seconds()'
+    p = 0
+    for i in range(words):
+        w = uint(frame[i])
+        for j in range(16):
+            if j < 15 and (w >> ((j + 1) << 1)) & 1:
+                p += 1
+            else:
+                p += int((w >> (j << 1)) & 1)
+    return p
+
+
+@micropython.native
+def pack_fields(frame, year, doy, tod, tenths, user=0):
+    # As 'pack_from_seconds()', but into 'frame' and from integer fields:
+    # 'tod' seconds since midnight, 'doy' day of year (1..366)
+    sec = tod % 60
+    minute = (tod // 60) % 60
+    hour = tod // 3600
+
+    p = pack_bits(frame, 0, 0, 1, 1)            # Pr
+    p = pack_bits(frame, p, sec % 10, 4, 0)     # Seconds
+    p = pack_bits(frame, p, 0, 1, 0)
+    p = pack_bits(frame, p, sec // 10, 3, 0)
+
+    p = pack_bits(frame, p, 0, 1, 1)            # P1
+    p = pack_bits(frame, p, minute % 10, 4, 0)  # Minutes
+    p = pack_bits(frame, p, 0, 1, 0)
+    p = pack_bits(frame, p, minute // 10, 4, 0)
+
+    p = pack_bits(frame, p, 0, 1, 1)            # P2
+    p = pack_bits(frame, p, hour % 10, 4, 0)    # Hours
+    p = pack_bits(frame, p, 0, 1, 0)
+    p = pack_bits(frame, p, hour // 10, 4, 0)
+
+    p = pack_bits(frame, p, 0, 1, 1)            # P3
+    p = pack_bits(frame, p, doy % 10, 4, 0)     # Day of Year
+    p = pack_bits(frame, p, 0, 1, 0)
+    p = pack_bits(frame, p, (doy // 10) % 10, 4, 0)
+
+    p = pack_bits(frame, p, 0, 1, 1)            # P4
+    p = pack_bits(frame, p, doy // 100, 2, 0)   # Day of Year, continued
+    p = pack_bits(frame, p, user >> 10, 3, 0)
+    p = pack_bits(frame, p, tenths, 4, 0)       # Tenths
+
+    p = pack_bits(frame, p, 0, 1, 1)            # P5
+    p = pack_bits(frame, p, year % 10, 4, 0)    # Year (00-99)
+    p = pack_bits(frame, p, 0, 1, 0)
+    p = pack_bits(frame, p, (year // 10) % 10, 4, 0)
+
+    p = pack_bits(frame, p, 0, 1, 1)            # P6
+    p = pack_bits(frame, p, user, 9, 0)         # IEEE-1344, or user data
+    p = pack_bits(frame, p, 0, 1, 1)            # P7
+    p = pack_bits(frame, p, user >> 9, 1, 0)
+    p = pack_bits(frame, p, 0xF if irig_trigger == IRIG_FAKE else 0, 4, 0)
+
+    p = pack_bits(frame, p, pack_parity(frame, (p + 15) >> 4) & 1, 1, 0)
+    p = pack_bits(frame, p, user >> 13, 3, 0)
+
+    p = pack_bits(frame, p, 0, 1, 1)            # P8
+    p = pack_bits(frame, p, tod, 9, 0)
+    p = pack_bits(frame, p, 0, 1, 1)            # P9
+    p = pack_bits(frame, p, tod >> 9, 9, 0)
+    p = pack_bits(frame, p, 0, 1, 1)            # P0
+    return frame
+
+
+def pack_from_seconds_fast(sec, frame, user=0, tenths=0):
+    # As 'pack_from_seconds()', but into 'frame'
+    gm = utime.gmtime(sec)
+    return pack_fields(frame, gm[0], gm[7], \
+                (gm[3] * 3600) + (gm[4] * 60) + gm[5], tenths, user)
+
+
+def pack_from_timebase(tb, frame, user=0):
+    # The next frame of Timebase 'tb' (see 'libs/timebase.py') into 'frame',
+    # integer only so nothing is allocated
+    return pack_fields(frame, tb.year, tb.doy, tb.frame // tb.rate, \
+                tb.tenths(), user)
+
+
 #---------------------------------------------
 
-if __name__ == "__main__":
+def main():
+    global irig_time, irig_lock_ms, irig_user, irig_clock
+
     # Ensure the CPU frequency is optimal
     # ie. does not cause fraction div on StateMachine clocks
     if freq() != cpu_freq:
         freq(cpu_freq)
  
-    # preset ASK pins as inputs, with pull resitors set up/down
-    Pin(0, Pin.IN, Pin.PULL_UP)
-    Pin(1, Pin.IN, Pin.PULL_DOWN)
+    if irig_modulator == IRIG_ASK_PIO:
+        # preset ASK pins as inputs, with pull resitors set up/down
+        Pin(0, Pin.IN, Pin.PULL_UP)
+        Pin(1, Pin.IN, Pin.PULL_DOWN)
+    else:
+        from libs.irig_pwm import PWMCarrier
+        carrier = PWMCarrier(0, carrier=irig_freq, cpu_freq=cpu_freq)
+
+    if irig_user_data:
+        from libs.user_data import UserData, bandwidth
+        irig_user = UserData(ieee1344=irig_user_ieee1344)
+        print("User data: %d bits/frame," % irig_user.bits, \
+                ", ".join(["%s %d bits/s" % f for f in \
+                bandwidth(bits=irig_user.bits).items()]))
 
     # configure the PPS pin
     pps = machine.Pin(18, machine.Pin.IN, machine.Pin.PULL_UP)
@@ -657,113 +909,278 @@ if __name__ == "__main__":
         ds = DS3231(I2C(0, sda=Pin(16), scl=Pin(17)))
         ds.square_wave(freq=ds.FREQ_1)
 
+    if irig_trigger == IRIG_GPS:
+        # label the 1PPS edges with the time from NMEA
+        from libs.gps_time import GPSTime
+        gps = GPSTime(UART(gps_uart, gps_baud, rx=Pin(gps_rx), rxbuf=1024), \
+                pps=18, rising=(irig_polarity == IRIG_PPS_RISING), \
+                describes=gps_describes)
+
     # setup the StateMachines, ensuring FIFO is empty and IRQ set
-    irig_sm = []
-    irig_sm.append(rp2.StateMachine(0, irig_fifo_purge, freq=ext_freq))
-    irig_sm.append(rp2.StateMachine(1, irig_fifo_purge, freq=ext_freq))
-    irig_sm.append(rp2.StateMachine(2, irig_fifo_purge, freq=ext_freq))
-    irig_sm.append(rp2.StateMachine(3, irig_fifo_purge, freq=ext_freq))
-    irig_sm.append(rp2.StateMachine(4, irig_fifo_purge, freq=ext_freq))
-    irig_sm.append(rp2.StateMachine(5, irig_fifo_purge, freq=ext_freq))
-    irig_sm.append(rp2.StateMachine(6, irig_fifo_purge, freq=ext_freq))
-    irig_sm.append(rp2.StateMachine(7, irig_fifo_purge, freq=ext_freq))
-    for m in range(len(irig_sm)):
-        irig_sm[m].active(1)
-    utime.sleep(0.5)
-    rp2.PIO(0).remove_program()
-    rp2.PIO(1).remove_program()
-
-    # On PIO Block-1
-    irig_sm = []
-    irig_sm.append(rp2.StateMachine(0, precision_12k, freq=int(cpu_freq / 10), \
-                            set_base=Pin(8)))
+    loader = PIOLoader()
+    loader.purge(irig_fifo_purge, ext_freq, \
+                settle=None if irig_fast_start else 0.5)
 
-    # DEBUG - deliberately cause SM-1 and SM-0 wildly different sync's
-    utime.sleep(random())
+    # 'sync' group shares IRQ-4, and trigger 2 (FIFO) keeps SM-0/1 enabled
+    loader.add("sync", "counter", precision_12k, int(cpu_freq / 10), \
+                            set_base=Pin(8))
 
     if irig_polarity == IRIG_PPS_RISING:
-        irig_sm.append(rp2.StateMachine(1, start_from_pin_rising, freq=cpu_freq, \
+        loader.add("sync", "phase", start_from_pin_rising, cpu_freq, \
                             set_base=Pin(7), sideset_base=Pin(7),\
-                            in_base=Pin(18), jmp_pin=Pin(8)))
+                            in_base=Pin(18), jmp_pin=Pin(8))
     else:
-        irig_sm.append(rp2.StateMachine(1, start_from_pin_falling, freq=cpu_freq, \
+        loader.add("sync", "phase", start_from_pin_falling, cpu_freq, \
                             set_base=Pin(7), sideset_base=Pin(7),\
-                            in_base=Pin(18), jmp_pin=Pin(8)))
-
-    fifo_sm = len(irig_sm)
-    '''
-    irig_sm.append(rp2.StateMachine(2, irig_fifo, freq=irig_freq * 2, \
-                        out_base=Pin(3), jmp_pin=Pin(4)))
-    '''
-    irig_sm.append(rp2.StateMachine(2, irig_fifo_minimal, freq=irig_freq * 2, \
-                        out_base=Pin(3), jmp_pin=Pin(4)))
-
-    # On PIO Block-2
-    irig_sm.append(rp2.StateMachine(4, irig_dcls, freq=irig_freq * 12, \
-                        in_base=Pin(5), out_base=Pin(6)))
-    irig_sm.append(rp2.StateMachine(5, irig_enc, freq=irig_freq * 12, \
+                            in_base=Pin(18), jmp_pin=Pin(8))
+
+    if irig_modulator == IRIG_ASK_PIO:
+        '''
+        loader.add("sync", "fifo", irig_fifo, irig_freq * 2, \
+                            out_base=Pin(3), jmp_pin=Pin(4))
+        '''
+        loader.add("sync", "fifo", irig_fifo_minimal, irig_freq * 2, \
+                            out_base=Pin(3), jmp_pin=Pin(4))
+
+    # 'output' group is started together by trigger 1
+    loader.add("output", "dcls", irig_dcls, irig_freq * 12, \
+                        in_base=Pin(5), out_base=Pin(6))
+    loader.add("output", "enc", irig_enc, irig_freq * 12, \
                         set_base=Pin(5), in_base=Pin(3), \
-                        jmp_pin=Pin(4)))
-    irig_sm.append(rp2.StateMachine(6, irig_ask, freq=irig_freq * 12, \
-                        sideset_base=Pin(0), set_base=Pin(0), \
-                        jmp_pin=Pin(5)))
+                        jmp_pin=Pin(4))
+    if irig_modulator == IRIG_ASK_PIO:
+        loader.add("output", "ask", irig_ask, irig_freq * 12, \
+                            sideset_base=Pin(0), set_base=Pin(0), \
+                            jmp_pin=Pin(5))
+        output = ["dcls", "enc", "ask"]
+    else:
+        # FIFO takes the freed slot, so it is started with the encoder
+        loader.add("output", "fifo", irig_fifo_minimal, irig_freq * 2, \
+                            out_base=Pin(3), jmp_pin=Pin(4))
+        output = ["dcls", "enc", "fifo"]
+    if irig_pulses is not None:
+        # in step with the IRIG output, as it is started by trigger 1 too
+        from libs.pulses import Pulses, pulse_gen, PULSE_DIV
+        loader.add("output", "pulses", pulse_gen, cpu_freq // PULSE_DIV, \
+                            sideset_base=Pin(pulse_pin))
+        output.append("pulses")
+    if irig_loopback:
+        # 10 samples per bit
+        from libs.loopback import Loopback, dcls_capture, SAMPLE_CLOCKS
+        loader.add("check", "loopback", dcls_capture, irig_freq * SAMPLE_CLOCKS, \
+                            in_base=Pin(6))
+    if irig_events:
+        # at the CPU clock, referenced from the DCLS output
+        from libs.events import EventStamper, event_stamp, KIND_EVENTS, \
+                EVENT_RECORD
+        Pin(event_pin, Pin.IN)
+        loader.add("check", "events", event_stamp, cpu_freq, \
+                            jmp_pin=Pin(6))
     '''
     # DEBUG
-    irig_sm.append(rp2.StateMachine(4, toggle_pin, freq=irig_freq * 12, \
-                            set_base=Pin(6), in_base=Pin(6), out_base=Pin(6)))
+    loader.add("output", "toggle", toggle_pin, irig_freq * 12, \
+                            set_base=Pin(6), in_base=Pin(6), out_base=Pin(6))
     '''
+    # the handler signals it is done with this flag, see 'handler_done()'
+    loader.reserve_irq("counter", PIO_IRQ_DONE)
+    loader.plan()
+    loader.report()
+
+    # check the handler's table matches where the programs were placed
+    trigger1 = loader.ctrl(output, restart=output)
+    if irig_modulator == IRIG_ASK_PIO:
+        trigger2 = loader.ctrl(["counter", "phase", "fifo"], restart=["fifo"])
+    else:
+        trigger2 = carrier.trigger()
+    table = loader.handler_table("counter", "phase", trigger1, trigger2, \
+                loader.pio_reg("counter", PIO_IRQ_FORCE))
+    if precision_handler(1) < 0x20000000:
+        # table is written below, frozen '@asm_thumb' code is in flash
+        raise RuntimeError("precision_handler is not in RAM, do not freeze 'pico_irig'")
+    expected = [mem32[precision_handler(1) + (4 * i)] for i in range(len(table))]
+    if irig_pulses is not None:
+        # trigger 1 also starts the pulses, patched into the table below
+        expected[3] = table[3]
+    if irig_modulator == IRIG_ASK_PWM:
+        # trigger 2 starts the PWM slice, also patched
+        expected[4:6] = table[4:6]
+    if table != expected:
+        print("precision_handler table does not match, should be:")
+        print(loader.handler_source(table))
+        raise RuntimeError("precision_handler table")
+
+    loader.load(["counter"])
+
+    # DEBUG - deliberately cause SM-1 and SM-0 wildly different sync's
+    if not irig_fast_start:
+        utime.sleep(random())
+
+    loader.load()
+    counter_sm = loader.sm("counter")
+    fifo_sm = loader.sm("fifo")
+
+    if irig_pulses is not None:
+        mem32[precision_handler(1) + 0x0C] = trigger1[1]     # CTRL value
+    if irig_modulator == IRIG_ASK_PWM:
+        mem32[precision_handler(1) + 0x10] = trigger2[0]     # PWM EN
+        mem32[precision_handler(1) + 0x14] = trigger2[1]
+
+    cal_table = None
+    if irig_trigger_cal:
+        from libs.trigger_cal import table, load, set_corrections, last_flow
+        cal_table = table(precision_handler)
+        cal = load(irig_trigger_cal, cpu_freq)
+        if cal:
+            set_corrections(cal_table, cal)
+            print("Trigger calibration: %s cycles (Flow-1,2 Flow-5 Flow-3,4)" % \
+                    " ".join(["%+d" % c for c in cal]))
 
     # enable the IRQ handler, which will start SM-2/4/5/6
-    irig_sm[0].irq(handler=precision_handler, hard=True)
-    #irig_sm[0].irq(handler=mp_irq_handler, hard=True)
-    utime.sleep(0.1)
+    counter_sm.irq(handler=precision_handler, hard=True)
+    #counter_sm.irq(handler=mp_irq_handler, hard=True)
+    rp2.PIO(loader.block("counter")).irq(handler=handler_done, \
+                trigger=rp2.PIO.IRQ_SM3)
+    if not irig_fast_start:
+        utime.sleep(0.1)
 
     # 'dry fire' the interrupt, so that the ISR is compiled/loaded by uPython
     # ISR will abort as SM-0 address is too low - ie loop condition not met
-    mem32[0x502000d8] = 0xc010          # 'irq(rel(0))'
-    utime.sleep(0.1)
+    mem32[loader.reg("counter", SM_INSTR)] = 0xc010     # 'irq(rel(0))'
+    if not wait_for(lambda: irig_done, 100):
+        print("ISR did not run")
+
+    window = None
+    if irig_trigger_window:
+        # the window with the best first-try success, for this ISR latency
+        from libs.trigger_window import TriggerWindow
+        window = TriggerWindow(precision_12k, cpu_freq)
+        window.sample(irig_trigger_window, loader.reg("counter", 0), \
+                precision_handler(1), lambda: irig_done)
+        window.choose()
+        window.patch(PIO_BASE[loader.block("counter")], loader.reg("counter", 0))
+        window.report()
 
     # re-align the clock-phases with CLKDIV_RESTART
     #sync_sm(0x50300000, 0x50200000)          # Block-2 first as more timing critical
 
-    # Pre-fill the entry in FIFO
-    if irig_sm[fifo_sm].tx_fifo() < 1:
-        #pack_test()
-        pack_from_seconds(irig_seconds)
-
-        for p in irig_fifo:
-            irig_sm[fifo_sm].put(p)
-        irig_seconds += (1000 / irig_freq)
-
     print("State Machines armed, start scope now :-)")
-    utime.sleep(5)
+    if not irig_fast_start:
+        utime.sleep(5)
  
     # ---
     # Test section: 
+    sync_ctrl, sync_run = loader.ctrl(["counter", "phase"])
+    output_ctrl, output_run = loader.ctrl(output)
+    running = lambda: mem32[output_ctrl] & output_run
+
+    if irig_fast_start and irig_trigger != IRIG_FAKE:
+        # arm whilst PPS is deasserted, so the next edge is a clean start
+        idle = 0 if irig_polarity == IRIG_PPS_RISING else 1
+        wait_for(lambda: pps.value() == idle, 1100)
+
+    if irig_trigger == IRIG_GPS:
+        # seed with the label of the next PPS edge, arming well clear of
+        # the edges so that it is the one which triggers
+        print("Waiting for GPS time...")
+        while not (gps.locked() and gps.safe_to_arm(200)):
+            gps.poll()
+            utime.sleep_ms(1)
+        irig_time = Timebase(gps.next_edge()[0], irig_freq // 1000)
+    else:
+        irig_time = Timebase(0, irig_freq // 1000)
+    irig_first = irig_time.seconds()
+
+    # SysTick is stamped by the handler, as the start of frame 0
+    irig_clock = IrigClock(cpu_freq, irig_freq, irig_first, irig_time.sub())
+
+    if irig_pulses is not None:
+        # phase from the seeded time, so a GPS re-seed leaves 1PPM off
+        latency = None
+        if irig_trigger_cal:
+            from libs.trigger_cal import load_latency
+            latency = load_latency(irig_trigger_cal, cpu_freq)
+        pulses = Pulses(loader.sm("pulses"), cpu_freq, \
+                irig_pulses or (1000000 // irig_freq), pulse_width_ms, latency)
+        pulses.report(pulses.prime(irig_first, irig_time.sub(), \
+                irig_time.rate))
+
+    # Pre-fill the entry in FIFO, just before arming
+    if fifo_sm.tx_fifo() < 1:
+        #pack_test()
+        pack_from_timebase(irig_time, irig_frame, \
+                irig_user.next() if irig_user else 0)
+
+        fifo_sm.put(irig_frame)
+        if irig_modulator == IRIG_ASK_PWM:
+            carrier.queue_frame(irig_frame)
+        irig_time.advance()
+
+    if irig_modulator == IRIG_ASK_PWM:
+        carrier.arm()
+
+    if irig_trigger == IRIG_GPS:
+        # the handler stamps the edge, rather than competing with the IRQ
+        gps.pause()
+
     # Enable SM1/0 which will detect 1PPS
-    mem32[0x50200000] = 0x00000003
+    arm_us = utime.ticks_us()
+    mem32[sync_ctrl] = sync_run
     print("Go...")
-    utime.sleep(0.1)
 
-    # loop, waiting for a successful trigger
+    # loop, waiting for the handler to signal a trigger (or abort)
+    attempts = 0
     while True:
+        seen = irig_done
         if irig_trigger == IRIG_FAKE:
             # Start the StateMachines asserting (fake) 1PPS low
-            utime.sleep(0.1)
+            if not irig_fast_start:
+                utime.sleep(0.1)
             pps = machine.Pin(18, machine.Pin.OUT, value=0)
-            utime.sleep(0.1)
+            utime.sleep(0.001 if irig_fast_start else 0.1)
             pps = machine.Pin(18, machine.Pin.IN, machine.Pin.PULL_UP)
 
-        utime.sleep(0.1)
-        if (mem32[0x50300000] & (1 << 0)):
+        # SM1/0 re-arm themselves, so just wait for the next PPS edge
+        if not wait_for(lambda: irig_done != seen, 1100):
+            continue
+        attempts += 1
+        if window:
+            window.attempt(running())
+
+        if running():
+            irig_lock_ms = utime.ticks_ms()
             print("IRIG running...")
+            print("Boot to lock: %d ms, arm to lock: %d us, %d attempt(s)" % \
+                    (irig_lock_ms, utime.ticks_diff(irig_done_us, arm_us), attempts))
+            flow = last_flow(cal_table) if cal_table else None
+            if flow:
+                print("Trigger: Flow-%d, phase %d" % flow)
+            if window:
+                window.report()
 
             # Stop SM-0 & SM-1, but leave SM-2 running
-            mem32[0x50200000] = 0x00000004
+            mem32[sync_ctrl] = mem32[sync_ctrl] & ~sync_run
+            irig_clock.start(mem32[precision_handler(1) + DIAG_TRIGGER], \
+                    irig_done_us)
+
+            if irig_trigger == IRIG_GPS:
+                # check the first frame against GPS, the following frames
+                # can still be corrected
+                gps.resume(irig_done_us)
+                first = gps.seed(irig_first, irig_done_us)
+                if first != irig_first:
+                    # not the edge armed for, ie. a retry - the frame in
+                    # the FIFO has already gone out with the wrong time
+                    print("GPS: locked %+d s from the edge armed for, first frame sent as %d" % \
+                            (first - irig_first, irig_first))
+                    print("Re-seeding from GPS, %d -> %d" % (irig_first, first))
+                    irig_time.shift(first - irig_first)
+                    irig_clock.shift(first - irig_first)
+                    irig_first = first
             break
 
         #print("try, try again...")#0x%8.8x" % ret)
-        utime.sleep(0.5)
+        if not irig_fast_start:
+            utime.sleep(0.5)
 
         # stop SM-4 and loop to trigger again
         #mem32[0x50300000] = 0x00000000
@@ -771,19 +1188,150 @@ if __name__ == "__main__":
 
     # Loop, filling the FIFO as needed
     count = 0
+    frames = 0
+
+    if irig_telemetry:
+        from libs.telemetry import Telemetry, PPS_NONE
+        telemetry = Telemetry()
+
+    # the FIFO SM stalls on autopull when we are late, ie. an underflow
+    fdebug = loader.pio_reg("fifo", PIO_FDEBUG)
+    stall = loader.irq_flag("fifo") << 24
+    mem32[fdebug] = stall
+    underflows = 0
+
+    # start of the frame being sent, the first from the trigger
+    frame_us = 1000000000 // irig_freq
+    frame_start = irig_done_us
+
+    if irig_loopback:
+        # the first complete frame seen is the first pushed below
+        loopback = Loopback(loader.sm("loopback"), \
+                loader.pio_reg("loopback", PIO_FDEBUG), loader.irq_flag("loopback"))
+        loopback.start()
+
+    if irig_events:
+        events = EventStamper(loader.sm("events"), \
+                loader.reg("events", SM_EXECCTRL), \
+                loader.pio_reg("events", PIO_FDEBUG), loader.irq_flag("events"), \
+                event_pin, cpu_freq, irig_freq)
+        events.start(irig_done_us)
+        event_telemetry = Telemetry(batch=32, record=EVENT_RECORD, \
+                kind=KIND_EVENTS) if irig_telemetry else None
+        print("Events on GPIO%d, frame 0 is %d.0" % (event_pin, irig_first))
+
+    if irig_time_service:
+        # also reads the user data lines, as they share the USB serial
+        from libs.time_service import TimeService
+        service = TimeService(irig_clock, other=irig_user.feed if irig_user else None)
+
+    if irig_gc_frame:
+        from libs.heap import HeapMonitor, KIND_HEAP, HEAP_RECORD
+        heap = HeapMonitor(telemetry=Telemetry(record=HEAP_RECORD, \
+                kind=KIND_HEAP) if irig_telemetry else None)
+        heap.start()
+
     while not irig_fail:
-        if irig_sm[fifo_sm].tx_fifo() < 1:
-            pack_from_seconds(irig_seconds)
-            irig_seconds += (1000 / irig_freq)
+        if fifo_sm.tx_fifo() < 1:
+            now = utime.ticks_us()
+            if mem32[fdebug] & stall:
+                mem32[fdebug] = stall
+                underflows += 1
+                if not irig_telemetry:
+                    print("FIFO underflow")
+
+            pack_from_timebase(irig_time, irig_frame, \
+                    irig_user.next() if irig_user else 0)
+            irig_time.advance()
             '''
             pack_test(count)
             count = (count + 1) & 0xFF
+            irig_frame = irig_fifo
             '''
 
-            for p in irig_fifo:
-                irig_sm[fifo_sm].put(p)
-            print(".", end="")
+            fifo_sm.put(irig_frame)
+            if irig_loopback:
+                loopback.expect(irig_frame)
+            if irig_telemetry:
+                pps_offset = PPS_NONE
+                if irig_trigger == IRIG_GPS and gps.last_edge() is not None:
+                    pps_offset = utime.ticks_diff(gps.last_edge(), frame_start)
+                telemetry.record(frames, \
+                        utime.ticks_diff(utime.ticks_add(frame_start, frame_us), now), \
+                        underflows, utime.ticks_diff(now, frame_start), pps_offset)
+            else:
+                print(".", end="")
+            frame_start = utime.ticks_add(frame_start, frame_us)
+
+            if irig_modulator == IRIG_ASK_PWM:
+                if not carrier.queue_frame(irig_frame):
+                    print("PWM ring full")
+
+            frames += 1
+            if irig_clock.running():
+                # keep its anchor within the reach of 'ticks_diff()'
+                irig_clock.update()
+            report = frames % 60 == 0
+            if report:
+                if irig_modulator == IRIG_ASK_PWM:
+                    print()
+                    carrier.report()
+                if irig_trigger == IRIG_GPS:
+                    print()
+                    gps.report()
+                if irig_user:
+                    print()
+                    irig_user.report(irig_freq)
+                if irig_loopback:
+                    print()
+                    loopback.report()
+                if irig_events:
+                    print()
+                    events.report()
+                if irig_time_service:
+                    print()
+                    service.report()
+                if irig_gc_frame:
+                    print()
+                    heap.report()
+
+            # after the reports, so their garbage goes too
+            if irig_gc_frame and heap.frame(frames - 1, report):
+                print("\nHeap: %d bytes allocated in frame %d" % \
+                        (heap.alloc, frames - 1))
+                heap.rebase()
+
+        if irig_trigger == IRIG_GPS:
+            # labels each PPS edge, and checks the encoder's time against it -
+            # a sentence allocates, so is exempt (see 'libs/gps_time.py')
+            if irig_gc_frame:
+                mark = heap.mark()
+                gps.poll()
+                heap.exempt(mark)
+            else:
+                gps.poll()
+        if irig_time_service:
+            service.poll()
+        elif irig_user:
+            irig_user.poll_serial()
+        if irig_loopback:
+            loopback.poll()
+        if irig_events and events.poll():
+            if event_telemetry:
+                events.stream(event_telemetry)
+            else:
+                e = events.get()
+                while e:
+                    print("\nEvent %d: frame %d +%d ns%s" % (e[2], e[0], e[1], \
+                            " (lost)" if e[4] else ""))
+                    e = events.get()
         utime.sleep(0.001)
 
+    if irig_gc_frame:
+        heap.stop()
     print("IRIG complete/aborted")
 
+
+# when compiled/frozen as 'pico_irig', the generated 'main.py' calls main()
+if __name__ == "__main__":
+    main()
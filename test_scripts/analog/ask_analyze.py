@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+#
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Measure the 'irig_ask' output from WAV captures (as those in 'sample/'),
+# one unit per channel, against the model in 'ask_harmonics.py':
+#
+#   crossings - rising zero crossings of the carrier's fundamental (band-pass
+#               by FFT, as the modified square's steps ring), interpolated
+#               between samples. Fitted with a line through each unbroken
+#               run, the residuals are the carrier's phase jitter, and the
+#               mean for the high cycles less the low the AM-to-PM shift
+#   fold      - the samples of the cycles well inside a high (or low) run,
+#               averaged by their phase from the crossing before, into one
+#               cycle of each. With a vectorized FFT, its harmonics (dBc, up
+#               to the capture's bandwidth) and fundamental, so the high/low
+#               modulation ratio
+#   pulls     - the low cycle's step heights, against the high's, give the
+#               pull-down and pull-up as a multiple of the series resistors
+#               (needs 2 or more samples per SM clock, ie. IRIG-B at 44.1KHz)
+#
+# A unit is out of spec if the ratio is outside '--ratio' (IRIG 200, 3:1 to
+# 6:1, as 'ask_network.py') or a harmonic is over its limit. Separately, it
+# is noted if the ratio is outside what pulls within '--pull' can give with
+# the '--r' series resistors, or the estimated pulls are outside the range -
+# ie. the unit isn't built as the model, which is not a failure. If the
+# capture is inverted, the pull-up and pull-down swap.
+#
+# MIT license - go make something cool....
+#
+# $ python3 ask_analyze.py ../../sample/IRIG-B_fake_trigger.wav
+# $ python3 ask_analyze.py captures/ --jobs 4 --csv units.csv
+
+import argparse
+import concurrent.futures
+import csv
+import os
+import sys
+
+import numpy as np
+
+import ask_harmonics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "rx"))
+import wav_decode
+import wav_batch
+
+CLOCKS = 12                     # SM clocks per carrier cycle
+BINS = 20 * CLOCKS              # phase bins of a folded cycle
+
+
+def fundamental(x, fs, fc):
+    # only the carrier's fundamental (and the modulation sidebands)
+    x = x.astype(np.float64)
+    X = np.fft.rfft(x - x.mean())
+    f = np.fft.rfftfreq(len(x), 1 / fs)
+    X[(f < fc * 0.5) | (f > fc * 1.5)] = 0
+    return np.fft.irfft(X, len(x))
+
+
+def rising(f):
+    # sub-sample times (in samples) of the rising zero crossings
+    i = np.flatnonzero((f[:-1] < 0) & (f[1:] >= 0))
+    return i + f[i] / (f[i] - f[i + 1])
+
+
+def refine(x, z, period, cycles):
+    # crossing times from the fundamental's phase over two (Hann windowed)
+    # periods of the raw samples about each cycle, rather than the band-pass
+    # which the modulation's steps smear
+    c = z[cycles] + period / 2
+    n = np.floor(c - period).astype(np.int64)[:, None] + \
+            np.arange(int(np.ceil(period * 2)) + 1)
+    n = np.clip(n, 0, len(x) - 1)
+    u = (n - (c[:, None] - period)) / (period * 2)
+    w = np.where((u >= 0) & (u < 1), 0.5 - 0.5 * np.cos(2 * np.pi * u), 0)
+    v = x[n] - np.sum(w * x[n], axis=1, keepdims=True) / np.sum(w, axis=1, keepdims=True)
+    X = np.sum(w * v * np.exp(-2j * np.pi * (n - z[cycles][:, None]) / period), axis=1)
+    e = np.angle(X * 1j)
+    return z[cycles] - e * period / (2 * np.pi)
+
+
+def runs(t, period, longest=100):
+    # cycle count of each time, and the start of each unbroken run - a gap
+    # not close to whole cycles, or too long to count across
+    gaps = np.diff(t) / period
+    steps = np.rint(gaps).astype(np.int64)
+    broken = (steps < 1) | (steps > longest) | (np.abs(gaps - steps) > 0.25)
+    index = np.concatenate(([0], np.cumsum(steps)))
+    return index, np.flatnonzero(broken) + 1
+
+
+def fold(x, t, period):
+    # one cycle, the samples of the cycles starting at 't' averaged by phase
+    n = np.floor(t).astype(np.int64)[:, None] + \
+            np.arange(int(np.ceil(period)) + 1)
+    phase = (n - t[:, None]) / period
+    keep = (phase >= 0) & (phase < 1) & (n < len(x))
+    b = (phase[keep] * BINS).astype(np.int64)
+    total = np.bincount(b, weights=x[n[keep]], minlength=BINS)
+    count = np.bincount(b, minlength=BINS)
+    filled = count > 0
+    wave = np.zeros(BINS)
+    wave[filled] = total[filled] / count[filled]
+    if not filled.all():
+        k = np.arange(BINS)
+        wave = np.interp(k, k[filled], wave[filled], period=BINS)
+    return wave
+
+
+def spectrum(wave, count):
+    # fundamental amplitude, and harmonics 2..count in dBc
+    X = np.abs(np.fft.rfft(wave)) * 2 / len(wave)
+    h = X[2:count + 1] / X[1]
+    return X[1], 20 * np.log10(np.maximum(h, 1e-6))
+
+
+def level(wave, clock, clocks):
+    # mean over the middle half of the 'clocks' from 'clock' (of the SM's
+    # cycle); phase 0 is the fundamental's rising crossing, at clock 1
+    per = BINS // CLOCKS
+    start = (clock - 1) * per + (clocks * per) // 4
+    k = np.arange(start, start + (clocks * per) // 2) % BINS
+    return wave[k].mean()
+
+
+def steps(wave):
+    # step heights above and below the mid level (clocks 0-1 and 6-7)
+    mid = (level(wave, 0, 2) + level(wave, 6, 2)) / 2
+    return level(wave, 2, 4) - mid, mid - level(wave, 8, 4)
+
+
+def pull(fraction, r):
+    # a low step is 'pull / (2r + pull)' of the high one, see
+    # 'ask_harmonics.node_voltage()'
+    if not 0 < fraction < 1:
+        return None
+    return 2 * r * fraction / (1 - fraction)
+
+
+def analyze_channel(x, fs, fmt=None, r=33000, count=9):
+    fmt = fmt or wav_decode.detect_format(x, fs)
+    result = {"format": fmt}
+    if fmt is None:
+        return result
+    fc = wav_decode.FORMATS[fmt]
+    period = fs / fc            # nominal, until measured
+
+    z = rising(fundamental(x, fs, fc))
+    if len(z) < 16:
+        return result
+
+    # each cycle high or low, and steady if the two cycles either side are
+    # the same and a cycle apart (the envelope is smoothed over a cycle, so
+    # the one next to a step may be either)
+    env = wav_decode.envelope(x, fs, fc)
+    thr = wav_decode.threshold(env)
+    if thr is None:
+        return result
+    mid = ((z[:-1] + z[1:]) / 2).astype(np.int64)
+    high = env[mid] > thr[0]            # the middle threshold
+    whole = np.abs((np.diff(z) / period) - 1) < 0.25
+    steady = np.zeros(len(high), dtype=bool)
+    steady[2:-2] = whole[2:-2]
+    for k in (1, 2):
+        steady[2:-2] &= (high[2:-2] == high[2 - k:-2 - k]) & \
+                (high[2:-2] == high[2 + k:len(high) - 2 + k]) & \
+                whole[2 - k:-2 - k] & whole[2 + k:len(high) - 2 + k]
+    cycles = np.flatnonzero(steady)
+    high = high[cycles]
+    result["cycles"] = [int(np.count_nonzero(high)), \
+            int(np.count_nonzero(~high))]
+    if not all(result["cycles"]):
+        return result
+
+    # carrier phase, against a line through the longest unbroken run (ie.
+    # not before a trigger) with an offset for the high cycles, the AM-to-PM
+    # shift
+    x = x.astype(np.float64)
+    t = refine(x, z, period, cycles)
+    index, breaks = runs(t, period)
+    result["runs"] = int(len(breaks) + 1)
+    seg = max(np.split(np.arange(len(t)), breaks), key=len)
+    high = high[seg]
+    if len(seg) < 16 or high.all() or not high.any():
+        return result
+    t = t[seg]
+    a = np.stack((np.ones(len(seg)), index[seg] - index[seg[0]], \
+            high.astype(np.float64)), axis=1)
+    fit = np.linalg.lstsq(a, t, rcond=None)[0]
+    period = fit[1]
+    result["ppm"] = float(((fc * period / fs) - 1) * 1e6)
+    result["jitter_us"] = wav_decode.stats((t - (a @ fit)) / fs * 1e6)
+    result["am_pm_us"] = float(fit[2] / fs * 1e6)
+
+    # harmonics of a folded cycle of each, to the capture's bandwidth
+    usable = min(count, int(0.45 * fs / fc))
+    for name, cls in (("high", True), ("low", False)):
+        wave = fold(x, t[high == cls], period)
+        amp, dbc = spectrum(wave, usable)
+        result[name] = {"amplitude": float(amp), \
+                "dbc": [float(v) for v in dbc], \
+                "thd": float(np.sqrt(np.sum(10 ** (dbc / 10))))}
+        result[name + "_wave"] = wave
+    result["ratio"] = result["high"]["amplitude"] / result["low"]["amplitude"]
+
+    if period >= CLOCKS * 2:
+        hp, hn = steps(result["high_wave"])
+        lp, ln = steps(result["low_wave"])
+        result["rpd"] = pull(lp / hp, r)
+        result["rpu"] = pull(ln / hn, r)
+    del result["high_wave"], result["low_wave"]
+    return result
+
+
+def limits(r, pulls, margin=0.05):
+    # the modulation ratio that pulls within the range can give, +/- margin
+    ratios = []
+    for rpu in pulls:
+        for rpd in pulls:
+            h = ask_harmonics.harmonics(ask_harmonics.ask_steps( \
+                    ask_harmonics.ASK_HIGH, r, rpu, rpd), 1)
+            l = ask_harmonics.harmonics(ask_harmonics.ask_steps( \
+                    ask_harmonics.ASK_LOW, r, rpu, rpd), 1)
+            ratios.append(h[0] / l[0])
+    return min(ratios) * (1 - margin), max(ratios) * (1 + margin)
+
+
+def check(result, ratio, h2, h3):
+    # reasons a unit is out of spec, empty if it isn't
+    flags = []
+    if "ratio" not in result:
+        return ["no carrier"]
+    if not ratio[0] <= result["ratio"] <= ratio[1]:
+        flags.append("ratio %.2f" % result["ratio"])
+    for name in ("high", "low"):
+        dbc = result[name]["dbc"]
+        if len(dbc) > 0 and dbc[0] > h2:
+            flags.append("%s H2 %.1fdBc" % (name, dbc[0]))
+        if len(dbc) > 1 and dbc[1] > h3:
+            flags.append("%s H3 %.1fdBc" % (name, dbc[1]))
+    return flags
+
+
+def diagnose(result, model, pulls, margin=0.1):
+    # where the unit differs from the model of '--r' with pulls in range
+    notes = []
+    if "ratio" not in result:
+        return notes
+    if not model[0] <= result["ratio"] <= model[1]:
+        notes.append("ratio %.2f" % result["ratio"])
+    for name in ("rpu", "rpd"):
+        if name not in result:
+            continue
+        v = result[name]
+        if v is None or not pulls[0] * (1 - margin) <= v <= pulls[1] * (1 + margin):
+            notes.append("%s %s" % (name, "?" if v is None else "%.0fK" % (v / 1000)))
+    return notes
+
+
+def job(name, channel, fmt, r, count):
+    fs, data = wav_decode.read_wav(name)
+    result = analyze_channel(data[:, channel], fs, fmt, r, count)
+    result["channel"] = channel
+    return name, result
+
+
+def line(r):
+    text = "ch%d IRIG-%s" % (r["channel"], r["format"] or "?")
+    if "ratio" not in r:
+        return text + " no carrier"
+    h = lambda dbc: "/".join("%.1f" % v for v in dbc[:2]) or "-"
+    text += " ratio %.2f:1, H2/H3 high %s low %s, jitter %.2f us rms, AM-PM %+.2f us" % \
+            (r["ratio"], h(r["high"]["dbc"]), h(r["low"]["dbc"]), \
+            r["jitter_us"]["rms"], r["am_pm_us"])
+    if r.get("rpu") and r.get("rpd"):
+        text += ", pulls %.0fK/%.0fK" % (r["rpu"] / 1000, r["rpd"] / 1000)
+    return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure irig_ask output from WAV captures")
+    parser.add_argument("path", nargs="+", help="WAV file(s) or directories")
+    parser.add_argument("--format", "-f", choices=sorted(wav_decode.FORMATS), help="IRIG format. Default detected")
+    parser.add_argument("--ratio", type=float, nargs=2, default=[3.0, 6.0], help="Modulation ratio spec. Default 3 6 (IRIG 200)")
+    parser.add_argument("--r", type=float, default=33000, help="Series resistors, Ohms. Default 33K")
+    parser.add_argument("--pull", type=float, nargs=2, default=[50000, 80000], help="GPIO pull range, Ohms. Default 50K 80K")
+    parser.add_argument("--h2", type=float, default=-20, help="H2 limit, dBc. Default -20")
+    parser.add_argument("--h3", type=float, default=-30, help="H3 limit, dBc. Default -30")
+    parser.add_argument("--count", type=int, default=9, help="Harmonics to measure. Default 9")
+    parser.add_argument("--jobs", "-j", type=int, help="Processes. Default one per core")
+    parser.add_argument("--recursive", "-r", action="store_true", help="Also search sub-directories")
+    parser.add_argument("--csv", help="Write the results, one line per channel")
+    args = parser.parse_args()
+
+    names = wav_batch.find(args.path, args.recursive)
+    if not names:
+        print("No WAV files found", file=sys.stderr)
+        sys.exit(1)
+    model = limits(args.r, args.pull)
+    print("Spec: ratio %.1f..%.1f:1, H2 < %.0fdBc, H3 < %.0fdBc" % \
+            (args.ratio[0], args.ratio[1], args.h2, args.h3))
+    print("Model: ratio %.2f..%.2f:1 for %.0fK with pulls %.0fK..%.0fK" % \
+            (model[0], model[1], args.r / 1000, args.pull[0] / 1000, \
+            args.pull[1] / 1000))
+
+    todo = [(n, c) for n in names for c in range(wav_decode.channels(n))]
+    results = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(job, n, c, args.format, args.r, args.count) \
+                for n, c in todo]
+        for future in concurrent.futures.as_completed(futures):
+            name, r = future.result()
+            results[(name, r["channel"])] = r
+
+    failed = 0
+    rows = []
+    for name in names:
+        print(name)
+        for key in sorted(k for k in results if k[0] == name):
+            r = results[key]
+            flags = check(r, args.ratio, args.h2, args.h3)
+            notes = diagnose(r, model, args.pull)
+            failed += bool(flags)
+            print("  " + line(r))
+            if flags:
+                print("  ch%d OUT OF SPEC: %s" % (r["channel"], ", ".join(flags)))
+            if notes:
+                print("  ch%d pulls inconsistent with --r %.0fK: %s" % \
+                        (r["channel"], args.r / 1000, ", ".join(notes)))
+            row = {"file": name, "channel": r["channel"], "format": r["format"], \
+                    "ratio": r.get("ratio"), "jitter_us": r.get("jitter_us", {}).get("rms"), \
+                    "am_pm_us": r.get("am_pm_us"), "ppm": r.get("ppm"), \
+                    "rpu": r.get("rpu"), "rpd": r.get("rpd"), "flags": "; ".join(flags), \
+                    "notes": "; ".join(notes)}
+            for cls in ("high", "low"):
+                for k, v in enumerate(r.get(cls, {}).get("dbc", [])):
+                    row["%s_h%d" % (cls, k + 2)] = v
+            rows.append(row)
+    print("%d of %d channels out of spec" % (failed, len(rows)))
+
+    if args.csv:
+        fields = []
+        for row in rows:
+            fields += [k for k in row if k not in fields]
+        with open(args.csv, "w", newline="") as f:
+            w = csv.DictWriter(f, fields)
+            w.writeheader()
+            w.writerows(rows)
+    sys.exit(1 if failed else 0)
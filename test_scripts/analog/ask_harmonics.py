@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+#
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Compare the harmonic content of the 'irig_ask' modified square (two GPIOs,
+# series resistors and the internal pull-up/-downs) against the sine table
+# played by PWM/DMA in 'libs/irig_pwm.py'.
+#
+# Both are step waveforms, ie. 12 steps per cycle for 'irig_ask' and
+# 'samples' steps for the PWM (the duty averaged over each PWM period), so
+# the Fourier series is computed exactly from the steps. The PWM carrier
+# itself (at 'samples' x carrier and above) is assumed to be removed by the
+# output filter, which can optionally be modelled as a single-pole RC.
+#
+# MIT license - go make something cool....
+#
+# $ python3 ask_harmonics.py --rpu 50000 --rpd 80000 --rc 3000
+
+import argparse
+import cmath
+import math
+
+VDD = 3.3
+
+# Pin states for each of the 12 SM clocks in a cycle, as (pin0, pin1):
+#   0/1 - driven low/high, 'p' - input with the pin's pull resistor
+ASK_HIGH = [(1, 0)] * 2 + [(1, 1)] * 4 + [(1, 0)] * 2 + [(0, 0)] * 4
+ASK_LOW = [(1, 0)] * 2 + [(1, "p")] * 4 + [(1, 0)] * 2 + [("p", 0)] * 4
+
+
+def node_voltage(state, r, rpu, rpd):
+    # Centre point of the two series resistors, into a high-Z buffer
+    g = v = 0.0
+    for pin, pull, rail in ((state[0], rpu, VDD), (state[1], rpd, 0.0)):
+        if pin == "p":
+            rs, vs = r + pull, rail
+        else:
+            rs, vs = r, VDD * pin
+        g += 1 / rs
+        v += vs / rs
+    return v / g
+
+
+def ask_steps(states, r, rpu, rpd):
+    return [node_voltage(s, r, rpu, rpd) for s in states]
+
+
+def pwm_steps(samples, amp, top):
+    # As 'PWMCarrier._table()', duty quantised to the PWM's TOP
+    mid = (top + 1) / 2
+    return [int(mid + amp * mid * math.sin(2 * math.pi * s / samples)) \
+            * VDD / (top + 1) for s in range(samples)]
+
+
+def square_steps():
+    return [VDD] * 6 + [0.0] * 6
+
+
+def harmonics(steps, count, fc=None):
+    # Exact Fourier series magnitude of a periodic step waveform, with
+    # each step lasting 1/len(steps) of the period
+    n = len(steps)
+    result = []
+    for k in range(1, count + 1):
+        c = 0j
+        for i, v in enumerate(steps):
+            c += v * (cmath.exp(-2j * math.pi * k * i / n) - \
+                    cmath.exp(-2j * math.pi * k * (i + 1) / n))
+        c /= 2j * math.pi * k
+        mag = 2 * abs(c)
+        if fc:
+            mag /= math.sqrt(1 + (k / fc) ** 2)
+        result.append(mag)
+    return result
+
+
+def dbc(h):
+    # floor at -120dBc, ie. where the step maths cancels exactly
+    return [20 * math.log10(max(x / h[0], 1e-6)) for x in h]
+
+
+def thd(h):
+    return math.sqrt(sum(x * x for x in h[1:])) / h[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Harmonics of irig_ask vs PWM sine table")
+    parser.add_argument("--r", type=float, default=33000, help="Series resistors, Ohms. Default 33K")
+    parser.add_argument("--rpu", type=float, default=50000, help="GPIO pull-up, Ohms. Default 50K")
+    parser.add_argument("--rpd", type=float, default=50000, help="GPIO pull-down, Ohms. Default 50K")
+    parser.add_argument("--carrier", type=float, default=1000, help="Carrier, Hz. Default 1000 (IRIG-B)")
+    parser.add_argument("--cpu", type=float, default=120000000, help="SysClk, Hz. Default 120MHz")
+    parser.add_argument("--samples", type=int, default=32, help="PWM samples per cycle. Default 32")
+    parser.add_argument("--ratio", type=float, default=3.3, help="PWM high/low ratio. Default 3.3")
+    parser.add_argument("--rc", type=float, help="Model a RC low-pass at this frequency, Hz")
+    parser.add_argument("--count", type=int, default=9, help="Harmonics to list. Default 9")
+    parser.add_argument("--thd", type=int, default=63, help="Harmonics included in THD. Default 63")
+    args = parser.parse_args()
+
+    top = int(args.cpu // (args.carrier * args.samples)) - 1
+    fc = args.rc / args.carrier if args.rc else None
+
+    waves = [
+        ("square", square_steps()),
+        ("ask high", ask_steps(ASK_HIGH, args.r, args.rpu, args.rpd)),
+        ("ask low", ask_steps(ASK_LOW, args.r, args.rpu, args.rpd)),
+        ("pwm high", pwm_steps(args.samples, 0.95, top)),
+        ("pwm low", pwm_steps(args.samples, 0.95 / args.ratio, top)),
+        ]
+
+    count = max(args.count, args.thd)
+    table = [(name, harmonics(steps, count, fc)) for name, steps in waves]
+
+    print("PWM: TOP=%d (%.1f bits), %d samples/cycle at %.0f Hz" % \
+            (top, math.log2(top + 1), args.samples, args.carrier * args.samples))
+    if fc:
+        print("Output filter: RC at %.0f Hz" % args.rc)
+    print()
+
+    print("%-10s %8s" % ("", "fund V") + \
+            "".join("%8s" % ("H%d" % k) for k in range(2, args.count + 1)) + \
+            "%8s" % "THD")
+    for name, h in table:
+        print("%-10s %8.3f" % (name, h[0]) + \
+                "".join("%8.1f" % x for x in dbc(h)[1:args.count]) + \
+                "%7.2f%%" % (100 * thd(h)))
+    print()
+
+    ask = table[1][1][0] / table[2][1][0]
+    pwm = table[3][1][0] / table[4][1][0]
+    print("Modulation ratio: ask %.2f:1, pwm %.2f:1" % (ask, pwm))
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+#
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Monte Carlo model of the 'irig_ask' output network, for choosing the series
+# resistors before building boards. Each GPIO drives its series resistor to
+# the centre point (into a high-Z buffer) or, as an input, leaves its pull
+# resistor in series - GPIO0 pulled up and GPIO1 down, as 'pico-irig.py'.
+#
+# The drive state (pindirs and side-set) of each of the 12 SM clocks of a
+# high and a low cycle is taken from the assembled 'irig_ask' program, with
+# the stepper in '../build/pio_budget.py', so the model follows the firmware.
+#
+# Variants draw the two series resistors (tolerance, uniform) and the pulls
+# (uniform over '--pull', independent or matched on a chip) and are computed
+# together as arrays: the centre point's level in each state, the steps of
+# each cycle and their exact Fourier series (as 'ask_harmonics.py'), so the
+# modulation ratio and harmonics - a few hundred thousand variants a second.
+#
+# The plateaus are 4 clocks (a third of a cycle) whatever their levels, so H3
+# cancels in this model - on a board it comes from the edges. The resistors
+# show as the ratio, and an uneven pull-up/-down as H2 in the low cycles.
+# Yield is against the modulation ratio (IRIG 200 allows 3:1 to 6:1, 10:3
+# nominal) and a H2 limit. With '--render' a few frames from one board (the
+# first '--r', '--rpu' and '--rpd') are written as a WAV, bandlimited to the
+# sample rate, which 'ask_analyze.py' and '../rx/wav_decode.py' read back.
+#
+# MIT license - go make something cool....
+#
+# $ python3 ask_network.py --r 33000 47000 68000 100000
+# $ python3 ask_network.py --r 68000 --tol 5 --count 1000000
+# $ python3 ask_network.py --r 68000 --rpu 80000 --rpd 50000 --render unit.wav
+
+import argparse
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+import ask_harmonics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "build"))
+import pio_budget
+
+VDD = ask_harmonics.VDD
+CLOCKS = 12
+HIGH_CYCLES = pio_budget.HIGH           # per symbol, by bit-pair
+PULL_UP = (True, False)                 # GPIO0 up, GPIO1 down
+
+
+def drive_states(irig):
+    # (pindirs, side) of each SM clock, for the high and low cycles
+    ask = pio_budget.Budget(irig.irig_ask)
+    start = ask.label("start-of-cycle")
+    cycles = []
+    for level in (1, 0):
+        dirs, side = 0b11, 0b01
+        ev = ask.run(start, jmp_pin=lambda t: level, \
+                until=lambda pc, t: pc == start)
+        states = []
+        for clock in range(CLOCKS):
+            for t, kind, v in ev:
+                if t == clock and kind == "pindirs":
+                    dirs = v
+                elif t == clock and kind == "side":
+                    side = v
+            states.append((dirs, side))
+        cycles.append(states)
+    return cycles
+
+
+def as_pins(states):
+    # in the form of 'ask_harmonics.py', (pin0, pin1) 0/1 driven or 'p' pulled
+    return [tuple(((side >> pin) & 1) if (dirs >> pin) & 1 else "p" \
+            for pin in (0, 1)) for dirs, side in states]
+
+
+def levels(states, r0, r1, rpu, rpd):
+    # centre point voltage in each state, (variants, len(states))
+    out = []
+    for dirs, side in states:
+        g = v = 0
+        for pin, r, pull in ((0, r0, rpu), (1, r1, rpd)):
+            if (dirs >> pin) & 1:
+                rs, vs = r, VDD * ((side >> pin) & 1)
+            else:
+                rs, vs = r + pull, VDD if PULL_UP[pin] else 0.0
+            g = g + 1 / rs
+            v = v + vs / rs
+        out.append(v / g)
+    return np.stack(np.broadcast_arrays(*out), axis=-1)
+
+
+def series(steps, count):
+    # complex Fourier coefficients 0..count of step waveforms, (..., count+1)
+    n = steps.shape[-1]
+    k = np.arange(1, count + 1)
+    i = np.arange(n)[:, None]
+    m = (np.exp(-2j * np.pi * k * i / n) - np.exp(-2j * np.pi * k * (i + 1) / n)) \
+            / (2j * np.pi * k)
+    return np.concatenate((steps.mean(axis=-1, keepdims=True), steps @ m), axis=-1)
+
+
+def thd(dbc):
+    return np.sqrt(np.sum(10 ** (dbc / 10), axis=-1))
+
+
+def measure(high, low, count, fc=None):
+    # ratio, and harmonics 2..count in dBc for the high and low cycles
+    k = np.arange(1, count + 1)
+    gain = 1 / np.sqrt(1 + (k / fc) ** 2) if fc else 1
+    h = np.abs(series(high, count)[..., 1:]) * gain
+    l = np.abs(series(low, count)[..., 1:]) * gain
+    dbc = lambda c: 20 * np.log10(np.maximum(c[..., 1:] / c[..., :1], 1e-6))
+    return h[..., 0] / l[..., 0], dbc(h), dbc(l)
+
+
+def variants(rng, n, r, tol, pull, match=None):
+    # component values of 'n' boards
+    r0 = r * (1 + rng.uniform(-tol, tol, n))
+    r1 = r * (1 + rng.uniform(-tol, tol, n))
+    if match is None:
+        rpu = rng.uniform(pull[0], pull[1], n)
+        rpd = rng.uniform(pull[0], pull[1], n)
+    else:
+        chip = rng.uniform(pull[0], pull[1], n)
+        rpu = chip * (1 + rng.uniform(-match, match, n))
+        rpd = chip * (1 + rng.uniform(-match, match, n))
+    return r0, r1, rpu, rpd
+
+
+def sweep(cycles, rng, n, r, args):
+    r0, r1, rpu, rpd = variants(rng, n, r, args.tol / 100, args.pull, \
+            None if args.match is None else args.match / 100)
+    high = levels(cycles[0], r0, r1, rpu, rpd)
+    low = levels(cycles[1], r0, r1, rpu, rpd)
+    ratio, hd, ld = measure(high, low, args.thd, \
+            args.rc and args.rc / args.carrier)
+    h2 = np.maximum(hd[:, 0], ld[:, 0])
+    h5 = np.maximum(hd[:, 3], ld[:, 3])
+    distortion = np.maximum(thd(hd), thd(ld))
+    ok = (ratio >= args.ratio[0]) & (ratio <= args.ratio[1]) & (h2 <= args.h2)
+    return ratio, h2, h5, distortion, ok
+
+
+def render(name, irig, cycles, r, rpu, rpd, start, frames, fs, fc):
+    # a WAV of 'frames' frames from 'start' (UTC seconds), bandlimited
+    carrier = []
+    for n in range(frames):
+        words = irig.pack_from_seconds_fast(start + n, irig.irig_frame, 0)
+        for s in range(100):
+            high = HIGH_CYCLES[(words[s >> 4] >> ((s & 0xf) << 1)) & 3]
+            carrier += [1] * high + [0] * (10 - high)
+    carrier = np.array(carrier)
+
+    count = int((fs / 2) // fc)
+    coef = np.stack([series(levels(c, r, r, rpu, rpd)[None], count)[0] \
+            for c in (cycles[1], cycles[0])])
+    t = np.arange(int(len(carrier) * fs / fc)) * fc / fs
+    cycle = np.minimum(t.astype(np.int64), len(carrier) - 1)
+    k = np.arange(1, count + 1)
+    c = coef[carrier[cycle]]
+    x = c[:, 0].real + 2 * np.sum((c[:, 1:] * \
+            np.exp(2j * np.pi * k * (t % 1)[:, None])).real, axis=1)
+    pcm = np.rint((x - VDD / 2) / (VDD / 2) * 0.9 * 32767).astype("<i2")
+    with wave.open(name, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(fs)
+        w.writeframes(pcm.tobytes())
+    return len(pcm) / fs
+
+
+def pct(v, p):
+    return np.percentile(v, p)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo model of the irig_ask output network")
+    parser.add_argument("--r", type=float, nargs="+", default=[33000], help="Series resistors to compare, Ohms. Default 33K")
+    parser.add_argument("--tol", type=float, default=1, help="Series resistor tolerance, %%. Default 1")
+    parser.add_argument("--pull", type=float, nargs=2, default=[50000, 80000], help="GPIO pull range, Ohms. Default 50K 80K")
+    parser.add_argument("--match", type=float, help="Pull-up/-down within this %% of a per-chip value. Default independent")
+    parser.add_argument("--count", type=int, default=100000, help="Variants per resistor value. Default 100000")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed. Default 1")
+    parser.add_argument("--ratio", type=float, nargs=2, default=[3.0, 6.0], help="Modulation ratio spec. Default 3 6 (IRIG 200)")
+    parser.add_argument("--h2", type=float, default=-20, help="H2 limit, dBc. Default -20")
+    parser.add_argument("--thd", type=int, default=15, help="Harmonics included in THD. Default 15")
+    parser.add_argument("--carrier", type=float, default=1000, help="Carrier, Hz. Default 1000 (IRIG-B)")
+    parser.add_argument("--rc", type=float, help="Model a RC low-pass at this frequency, Hz")
+    parser.add_argument("--render", help="Write a WAV of the network at --r (first), --rpu, --rpd")
+    parser.add_argument("--rpu", type=float, default=50000, help="Pull-up to render, Ohms. Default 50K")
+    parser.add_argument("--rpd", type=float, default=50000, help="Pull-down to render, Ohms. Default 50K")
+    parser.add_argument("--frames", type=int, default=5, help="Frames to render. Default 5")
+    parser.add_argument("--rate", type=int, default=48000, help="WAV sample rate. Default 48000")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Print the drive states")
+    args = parser.parse_args()
+
+    irig = pio_budget.load()
+    cycles = drive_states(irig)
+    pins = [as_pins(c) for c in cycles]
+    same = pins == [ask_harmonics.ASK_HIGH, ask_harmonics.ASK_LOW]
+    print("Drive states from 'irig_ask'%s" % \
+            ("" if same else ", DIFFER from 'ask_harmonics.py'"))
+    if args.verbose or not same:
+        for name, p in zip(("high", "low"), pins):
+            print("  %-4s %s" % (name, " ".join("%s%s" % s for s in p)))
+
+    rng = np.random.default_rng(args.seed)
+    print("Spec: ratio %.1f..%.1f:1, H2 < %.0fdBc; pulls %.0fK..%.0fK%s, %g%% resistors" % \
+            (args.ratio[0], args.ratio[1], args.h2, args.pull[0] / 1000, \
+            args.pull[1] / 1000, "" if args.match is None else \
+            " (matched %g%%)" % args.match, args.tol))
+    print()
+    print("%8s %22s %14s %14s %8s %7s" % ("R", "ratio 0.1/50/99.9%", \
+            "H2 50/99.9%", "H5 50/99.9%", "THD max", "yield"))
+    total = 0
+    start = time.perf_counter()
+    for r in args.r:
+        ratio, h2, h5, distortion, ok = sweep(cycles, rng, args.count, r, args)
+        total += args.count
+        print("%7.0fK %6.2f %6.2f %6.2f:1 %6.1f %6.1f %6.1f %6.1f %7.1f%% %6.1f%%" % \
+                (r / 1000, pct(ratio, 0.1), pct(ratio, 50), pct(ratio, 99.9), \
+                pct(h2, 50), pct(h2, 99.9), pct(h5, 50), pct(h5, 99.9), \
+                100 * distortion.max(), 100 * np.count_nonzero(ok) / args.count))
+    elapsed = time.perf_counter() - start
+    print()
+    print("%d variants in %.2fs, %.0f per second" % (total, elapsed, total / elapsed))
+
+    if args.render:
+        seconds = render(args.render, irig, cycles, args.r[0], args.rpu, \
+                args.rpd, 1735689600, args.frames, args.rate, args.carrier)
+        high = levels(cycles[0], args.r[0], args.r[0], args.rpu, args.rpd)
+        low = levels(cycles[1], args.r[0], args.r[0], args.rpu, args.rpd)
+        ratio, hd, ld = measure(high, low, 2)
+        print("Rendered %.1fs to '%s': ratio %.2f:1, low H2 %.1fdBc" % \
+                (seconds, args.render, ratio, ld[0]))
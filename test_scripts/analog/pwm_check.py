@@ -0,0 +1,144 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Check the PWM/DMA modulator's ring ('libs/irig_pwm.py'). Frames of bit-pairs
+# (with a pair value of 3 in each, which should play as data-0) are queued as
+# the frame loop does, then queueing stops for 1.5s while still looking at the
+# ring (an overrun), and for 4s without looking (the 256 entry ring is lapped).
+# Each time the symbols lost should be counted, and the next frame should play
+# straight after.
+#
+# On the host the DMA model records every block it plays, so the symbols and
+# their timing are compared too; on the Pico only the counts are checked, to
+# within a symbol. Then the CPU load of queueing is reported - which is only
+# meaningful on the Pico, the host's virtual clock does not move for Python.
+#
+# MIT license - go make something cool....
+#
+# On the Pico, with 'libs/' copied over (uses GPIO0, and two DMA channels):
+# $ mpremote run pwm_check.py
+#
+# or on the host, with the shim:
+# $ python3 ../shim/run_virtual.py pwm_check.py -p ../.. -s 40
+
+import utime
+from machine import freq
+
+from libs.irig_pwm import PWMCarrier, SYMBOL_DATA0
+
+try:
+    import vpico
+    virtual = vpico.board
+except ImportError:
+    virtual = None
+
+CPU_FREQ = 120000000
+CARRIER = 1000                  # IRIG-B
+FRAMES = 6                      # queued before, and after, each gap
+GAPS = ((1500, True), (4000, False))    # (ms without queueing, looking)
+ODD = 37                        # symbol with pair value 3
+
+fails = 0
+freq(CPU_FREQ)
+carrier = PWMCarrier(0, carrier=CARRIER, cpu_freq=CPU_FREQ)
+symbol_ms = carrier.symbol_us // 1000
+
+
+def frame_words(n):
+    # 7 words of bit-pairs, 100 symbols; cycles data-0/data-1/marker
+    words = []
+    pairs = [(n + k) % 3 for k in range(100)]
+    pairs[ODD] = 3
+    for i in range(7):
+        w = 0
+        for j in range(16):
+            if (i * 16) + j < 100:
+                w |= pairs[(i * 16) + j] << (j * 2)
+        words.append(w)
+    return words, pairs
+
+
+def expect(pairs):
+    # table addresses the DMA should play
+    return [carrier.addr[SYMBOL_DATA0] if p == 3 else carrier.addr[p] \
+            for p in pairs]
+
+
+def queue(n, expected):
+    # queue frame 'n' when there is room, as the frame loop does
+    words, pairs = frame_words(n)
+    while not carrier.queue_frame(words):
+        utime.sleep_ms(symbol_ms)
+    expected.append((carrier.written - 100, expect(pairs)))
+
+
+def blocks():
+    return virtual.dma[carrier.data.channel].blocks if virtual else None
+
+
+expected = []
+queue(0, expected)
+carrier.arm()
+carrier.start()
+n = 1
+for f in range(FRAMES):
+    queue(n, expected)
+    n += 1
+if carrier.overruns:
+    print("FAIL: %d overruns while queueing" % carrier.overruns)
+    fails += 1
+
+for gap, looking in GAPS:
+    # let the DMA play out what is queued, then 'gap' more
+    overruns, lost, written = carrier.overruns, carrier.lost, carrier.written
+    wait = ((written - carrier.consumed) * symbol_ms) + gap
+    while wait > 0:
+        utime.sleep_ms(min(wait, 100))
+        wait -= 100
+        if looking:
+            carrier.free()
+    if virtual:
+        # the control channel has read one entry for each block it started
+        played = len(blocks()) - written
+    else:
+        played = gap // symbol_ms
+
+    queue(n, expected)
+    n += 1
+    got = carrier.lost - lost
+    print("Gap %dms: %d overruns, %d symbols lost, %d played past the queue" % \
+            (gap, carrier.overruns - overruns, got, played))
+    if carrier.overruns - overruns != 1 or abs(got - played) > (0 if virtual else 1):
+        print("FAIL: expected 1 overrun, and %d symbols lost" % played)
+        fails += 1
+    for f in range(FRAMES):
+        queue(n, expected)
+        n += 1
+
+# play out the last frame
+carrier.free()
+utime.sleep_ms((carrier.written - carrier.consumed + 1) * symbol_ms)
+
+if virtual:
+    # each queued frame played, in order, at the symbol rate
+    played = blocks()
+    period = virtual.pwm_period(carrier.slice) * carrier.samples * 10
+    for start, addrs in expected:
+        if [a for t, a in played[start:start + 100]] != addrs:
+            print("FAIL: frame queued at %d played differently" % start)
+            fails += 1
+    for i in range(1, len(played)):
+        if played[i][0] - played[i - 1][0] != period:
+            print("FAIL: block %d started %d ticks after the last" % \
+                    (i, played[i][0] - played[i - 1][0]))
+            fails += 1
+            break
+    print("%d symbols played, %d frames queued" % (len(played), len(expected)))
+
+carrier.stop()
+carrier.report()
+if virtual:
+    print("(CPU time is virtual on the host, so 0)")
+print("%d failure(s)" % fails)
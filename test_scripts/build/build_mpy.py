@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+#
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Compile 'pico-irig.py' and 'libs/' to '.mpy', so the Pico does not have to
+# compile them from source at every boot - or write a manifest to freeze
+# 'libs/' into the firmware.
+#
+# 'pico_irig' is never frozen: the 'data()' table of 'precision_handler' is
+# written at run time (trigger 1/2 patches, calibration, diagnostics) and
+# frozen '@asm_thumb' code is placed in flash. With '--freeze' it is compiled
+# to '.mpy' instead, which is loaded into RAM.
+#
+# '-march=armv6m' is needed for the '@native', '@viper' and '@asm_thumb'
+# functions. 'pico-irig.py' becomes 'pico_irig' and a small 'main.py' is
+# generated which calls its 'main()'.
+#
+# MIT license - go make something cool....
+#
+# $ pip install mpy-cross
+# $ python3 build_mpy.py
+# $ mpremote cp -r build/* :
+#
+# or to freeze, from the MicroPython 'ports/rp2' directory:
+# $ python3 build_mpy.py --freeze
+# $ make BOARD=RPI_PICO FROZEN_MANIFEST=/path/to/build/manifest.py
+# $ mpremote cp build/pico_irig.mpy build/main.py :
+#
+# The before/after figures come from running 'import_stats.py' and
+# '../pack/pack_check.py' on the Pico, with each form installed.
+
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+
+MAIN = """# generated by 'build_mpy.py', runs the compiled 'pico-irig.py'
+import pico_irig
+pico_irig.main()
+"""
+
+MANIFEST = """# generated by 'build_mpy.py', 'pico_irig' is not frozen, as its table is written
+include("$(PORT_DIR)/boards/manifest.py")
+package("libs", base_path="%s")
+"""
+
+
+def sources(root):
+    # (source, module path) pairs
+    result = [(os.path.join(root, "pico-irig.py"), "pico_irig.py")]
+    for f in sorted(glob.glob(os.path.join(root, "libs", "*.py"))):
+        result.append((f, os.path.join("libs", os.path.basename(f))))
+    return result
+
+
+def compile_mpy(mpy_cross, src, dst, opt):
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    cmd = [mpy_cross, "-march=armv6m", "-O%d" % opt, "-o", dst, src]
+    subprocess.run(cmd, check=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build .mpy files, or a freeze manifest")
+    parser.add_argument("--out", "-o", default=os.path.join(HERE, "build"), help="Output directory. Default ./build")
+    parser.add_argument("--mpy-cross", default="mpy-cross", help="mpy-cross executable")
+    parser.add_argument("--opt", "-O", type=int, default=0, help="Optimisation level. Default 0 (keeps asserts/line numbers)")
+    parser.add_argument("--freeze", action="store_true", help="Write 'manifest.py' for a firmware build instead")
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out)
+    os.makedirs(out, exist_ok=True)
+    if not shutil.which(args.mpy_cross):
+        sys.exit("'%s' not found, try 'pip install mpy-cross'" % args.mpy_cross)
+
+    if args.freeze:
+        # 'libs' is frozen as is, 'pico_irig' stays on the filesystem
+        with open(os.path.join(out, "manifest.py"), "w") as f:
+            f.write(MANIFEST % ROOT)
+        src, mod = sources(ROOT)[0]
+        compile_mpy(args.mpy_cross, src, os.path.join(out, "pico_irig.mpy"), args.opt)
+    else:
+        for src, mod in sources(ROOT):
+            dst = os.path.join(out, os.path.splitext(mod)[0] + ".mpy")
+            compile_mpy(args.mpy_cross, src, dst, args.opt)
+            print("%-24s %6d -> %6d bytes" % (mod, os.path.getsize(src), \
+                    os.path.getsize(dst)))
+
+    with open(os.path.join(out, "main.py"), "w") as f:
+        f.write(MAIN)
+    print("Written to", out)
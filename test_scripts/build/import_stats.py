@@ -0,0 +1,38 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Time the import of pico-irig (and its libs), and the heap it leaves used.
+# Run once with the '.py' sources on the Pico and once with the '.mpy' (or
+# frozen) build from 'build_mpy.py', after a soft reset each time:
+#
+# MIT license - go make something cool....
+#
+# $ mpremote reset
+# $ mpremote run import_stats.py
+
+import gc
+import sys
+import utime
+
+gc.collect()
+free = gc.mem_free()
+start = utime.ticks_us()
+
+try:
+    irig = __import__("pico_irig")
+    name = "pico_irig"
+except ImportError:
+    irig = __import__("pico-irig")
+    name = "pico-irig"
+
+took = utime.ticks_diff(utime.ticks_us(), start)
+gc.collect()
+used = free - gc.mem_free()
+
+frozen = getattr(irig, "__file__", "frozen")
+print("%s (%s)" % (name, frozen))
+print("Import: %d ms, heap used %d bytes, %d bytes free" % \
+        (took // 1000, used, gc.mem_free()))
+print("Libs:", " ".join(sorted(k for k in sys.modules if k.startswith("libs"))))
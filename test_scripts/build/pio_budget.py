@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+#
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Static cycle budget of the PIO programs in 'pico-irig.py'. The programs are
+# assembled with the shim's 'rp2' and stepped through instruction by
+# instruction (no board, no clock), counting '1 + delay' per instruction, to
+# check the counts which are otherwise only in the comments:
+#
+#   Encoder    - each symbol type (data-0, data-1, marker) is 120 clocks, high
+#                for 20/50/80%, and the first after the trigger
+#   FIFO       - a bit-pair out every 20 clocks, 100 per frame, and back to
+#                the start of the frame
+#   Modulator  - 12 clocks per carrier cycle, on both the high and low paths
+#   Lockstep   - a frame run through FIFO -> encoder -> modulator, checking the
+#                encoder reads every symbol as pushed, the modulator makes
+#                2/5/8 high carrier cycles of each, and the margins between
+#                one SM changing a pin and another reading it
+#   Precision  - the SM-0 loop length, for each pre-trigger window
+#   Done IRQ   - the IRQ flags each program uses, and that the loader refuses
+#                a layout using the flag the precision handler signals with
+#
+# The ratios are the same for IRIG-A (all clocks x10), so one run covers both.
+# Runs in well under a second, so every timing edit can be checked.
+#
+# MIT license - go make something cool....
+#
+# $ python3 pio_budget.py
+# $ python3 pio_budget.py --verbose
+
+import argparse
+import importlib.util
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+sys.path.insert(0, os.path.join(ROOT, "test_scripts", "shim"))
+
+import run_virtual
+
+# per symbol, at the encoder's clock (irig_freq * 12)
+CARRIER = 12
+SYMBOL = CARRIER * 10
+HIGH = {0: 2, 1: 5, 2: 8}               # carrier cycles high, by bit-pair
+NAMES = {0: "data-0", 1: "data-1", 2: "marker"}
+FIFO_DIV = 6                            # encoder clocks per FIFO clock
+FIFO_SYMBOL = SYMBOL // FIFO_DIV
+
+
+def load():
+    # 'pico-irig.py' as a module, with the shim's 'rp2' to assemble the
+    # programs (nothing is run)
+    run_virtual.install(os.path.join(ROOT, "pico-irig.py"), path=[ROOT])
+    spec = importlib.util.spec_from_file_location("pico_irig", \
+            os.path.join(ROOT, "pico-irig.py"))
+    irig = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(irig)
+    return irig
+
+
+class Budget:
+    # steps a program, recording when pins are written/read
+    def __init__(self, prog, name=None):
+        self.prog = prog
+        self.name = name or prog.name
+        self.code = list(prog[0])
+        side = prog[7]
+        self.side_count = 0 if side is None else \
+                (1 if isinstance(side, int) else len(side))
+        self.side_opt = bool(prog[3] & (1 << 30))
+        shift = prog[4]
+        self.in_left = not shift & (1 << 18)
+        self.out_left = not shift & (1 << 19)
+        self.autopull = bool(shift & (1 << 17))
+        self.pull_thresh = ((shift >> 25) & 0x1f) or 32
+
+    def label(self, name):
+        return self.prog.labels[name]
+
+    def fields(self, w):
+        bits = self.side_count + self.side_opt
+        delay = (w >> 8) & ((1 << (5 - bits)) - 1)
+        side = None
+        if self.side_count:
+            top = (w >> (13 - bits)) & ((1 << bits) - 1)
+            if not self.side_opt:
+                side = top
+            elif top >> self.side_count:
+                side = top & ((1 << self.side_count) - 1)
+        return delay, side
+
+    def run(self, pc=0, regs=None, pins=lambda t: 0, jmp_pin=lambda t: 0, \
+                words=(), until=None, limit=100000, tick=1, start=0):
+        # From 'pc' until 'until(pc, t)' after at least one instruction, or
+        # 'limit' ticks. 'pins(t)' is the input pins (from in_base), 'jmp_pin'
+        # likewise, 'words' feeds the OSR. Times are in 'tick' units, so that
+        # SMs at different clocks can be compared. Returns the events.
+        r = {"x": 0, "y": 0, "isr": 0, "osr": 0, "isr_count": 0, \
+                "osr_count": 32}
+        r.update(regs or {})
+        words = iter(words)
+        events = []
+        t = start
+        end = start + (limit * tick)
+        first = True
+        while t < end:
+            if not first and until and until(pc, t):
+                break
+            first = False
+            w = self.code[pc]
+            delay, side = self.fields(w)
+            if side is not None:
+                events.append((t, "side", side))
+            op = w >> 13
+            nxt = pc + 1 if pc != self.prog.wrap else self.prog.wrap_target
+
+            if op == 0:                 # jmp
+                cond = (w >> 5) & 7
+                addr = w & 0x1f
+                take = True
+                if cond == 1:
+                    take = r["x"] == 0
+                elif cond == 2:
+                    take = r["x"] != 0
+                    r["x"] = (r["x"] - 1) & 0xffffffff
+                elif cond == 3:
+                    take = r["y"] == 0
+                elif cond == 4:
+                    take = r["y"] != 0
+                    r["y"] = (r["y"] - 1) & 0xffffffff
+                elif cond == 5:
+                    take = r["x"] != r["y"]
+                elif cond == 6:
+                    take = bool(jmp_pin(t))
+                    events.append((t, "jmp_pin", int(take)))
+                elif cond == 7:
+                    take = r["osr_count"] < self.pull_thresh
+                if take:
+                    nxt = addr
+
+            elif op == 1:               # wait, taken as already satisfied
+                events.append((t, "wait", w & 0xff))
+
+            elif op == 2:               # in
+                src = (w >> 5) & 7
+                n = (w & 0x1f) or 32
+                v = {0: pins(t), 1: r["x"], 2: r["y"], 3: 0, 6: r["isr"], \
+                        7: r["osr"]}[src] & ((1 << n) - 1)
+                if src == 0:
+                    events.append((t, "in", v))
+                if self.in_left:
+                    r["isr"] = ((r["isr"] << n) | v) & 0xffffffff
+                else:
+                    r["isr"] = (r["isr"] >> n) | (v << (32 - n)) \
+                            if n < 32 else v
+                r["isr_count"] = min(32, r["isr_count"] + n)
+
+            elif op == 3:               # out
+                dest = (w >> 5) & 7
+                n = (w & 0x1f) or 32
+                if self.autopull and r["osr_count"] >= self.pull_thresh:
+                    r["osr"] = next(words)
+                    r["osr_count"] = 0
+                if self.out_left:
+                    v = r["osr"] >> (32 - n)
+                    r["osr"] = (r["osr"] << n) & 0xffffffff
+                else:
+                    v = r["osr"] & ((1 << n) - 1)
+                    r["osr"] >>= n
+                r["osr_count"] = min(32, r["osr_count"] + n)
+                if dest == 0:
+                    events.append((t, "out", v))
+                elif dest in (1, 2):
+                    r["xy"[dest - 1]] = v
+
+            elif op == 4:               # push/pull
+                if w & 0x80:
+                    r["osr"] = next(words)
+                    r["osr_count"] = 0
+                else:
+                    r["isr"] = 0
+                    r["isr_count"] = 0
+
+            elif op == 5:               # mov
+                dest = (w >> 5) & 7
+                src = w & 7
+                v = {0: pins(t), 1: r["x"], 2: r["y"], 3: 0, 6: r["isr"], \
+                        7: r["osr"]}.get(src, 0)
+                if (w >> 3) & 3 == 1:
+                    v ^= 0xffffffff
+                if dest == 0:
+                    events.append((t, "mov", v))
+                elif dest in (1, 2):
+                    r["xy"[dest - 1]] = v
+                elif dest == 6:
+                    r["isr"], r["isr_count"] = v, 0
+                elif dest == 7:
+                    r["osr"], r["osr_count"] = v, 0
+
+            elif op == 6:               # irq
+                events.append((t, "irq", w & 0x7f))
+
+            else:                       # set
+                dest = (w >> 5) & 7
+                v = w & 0x1f
+                if dest in (1, 2):
+                    r["xy"[dest - 1]] = v
+                else:
+                    events.append((t, "set" if dest == 0 else "pindirs", v))
+
+            t += (1 + delay) * tick
+            pc = nxt
+        self.t = t
+        self.pc = pc
+        self.regs = r
+        return events
+
+
+def level_at(changes, t, default=0):
+    # value of a pin at 't', from (time, value) changes made strictly before
+    v = default
+    for when, value in changes:
+        if when >= t:
+            break
+        v = value
+    return v
+
+
+def margin(changes, reads):
+    # closest a read comes to a change (in ticks), after or before
+    m = None
+    for c in changes:
+        for r in reads:
+            d = abs(r - c)
+            m = d if m is None else min(m, d)
+    return m
+
+
+class Report:
+    def __init__(self, verbose):
+        self.fails = 0
+        self.verbose = verbose
+
+    def check(self, ok, text):
+        if not ok:
+            self.fails += 1
+        print("%s %s" % ("ok  " if ok else "FAIL", text))
+
+    def info(self, text):
+        if self.verbose:
+            print("     " + text)
+
+
+def encoder(irig, rep):
+    enc = Budget(irig.irig_enc)
+    start = enc.label("start-of-symbol")
+    for code in (0, 1, 2):
+        ev = enc.run(start, {"x": 3}, pins=lambda t: code, \
+                jmp_pin=lambda t: code >> 1, until=lambda pc, t: pc == start)
+        sets = [(t, v) for t, k, v in ev if k == "set"]
+        high = [t for t, v in sets if v == 0][0]
+        rep.check(enc.t == SYMBOL and high == HIGH[code] * CARRIER, \
+                "encoder %-7s %3d clocks (%d), high %3d (%d)" % \
+                (NAMES[code], enc.t, SYMBOL, high, HIGH[code] * CARRIER))
+
+    # the first, from the trigger, with Y preset as a marker by the purge
+    ev = enc.run(0, {"y": 2}, pins=lambda t: 2, jmp_pin=lambda t: 1, \
+            until=lambda pc, t: pc == start)
+    high = [t for t, k, v in ev if k == "set" and v == 0][0]
+    rep.info("first symbol after the trigger: %d clocks, high %d (pin already high)" % \
+            (enc.t, high))
+
+
+def fifo(irig, frame, rep):
+    prog = Budget(irig.irig_fifo_minimal)
+    words = list(frame) * 3
+    ev = prog.run(0, {"x": 8}, words=words, limit=FIFO_SYMBOL * 200 + 1)
+    outs = [t for t, k, v in ev if k == "out"]
+    # the first is preloaded, so the second follows it early
+    rep.info("first bit-pair held for %d clocks after the preload" % \
+            (outs[1] - outs[0]))
+    gaps = set(b - a for a, b in zip(outs[1:], outs[2:]))
+    rep.check(gaps == {FIFO_SYMBOL}, "fifo    bit-pair every %s clocks (%d)" % \
+            ("/".join(str(g) for g in sorted(gaps)), FIFO_SYMBOL))
+
+    pairs = [v for t, k, v in ev if k == "out"][:200]
+    want = [(frame[n >> 4] >> ((n & 0xf) << 1)) & 3 for n in range(100)] * 2
+    rep.check(pairs == want and outs[101] - outs[1] == FIFO_SYMBOL * 100, \
+            "fifo    frame of 100 bit-pairs, %d clocks (%d), in order" % \
+            (outs[101] - outs[1], FIFO_SYMBOL * 100))
+    return ev
+
+
+def modulator(irig, rep):
+    ask = Budget(irig.irig_ask)
+    start = ask.label("start-of-cycle")
+    for level in (0, 1):
+        ask.run(start, jmp_pin=lambda t: level, until=lambda pc, t: pc == start)
+        rep.check(ask.t == CARRIER, "ask     %-4s cycle %2d clocks (%d)" % \
+                ("high" if level else "low", ask.t, CARRIER))
+
+
+def lockstep(irig, frame, fifo_ev, rep):
+    # the FIFO (started by trigger 2) drives the encoder's input pins, and the
+    # encoder (trigger 1) the modulator's jmp pin - in encoder clocks
+    pairs = [(t * FIFO_DIV, v) for t, k, v in fifo_ev if k == "out"]
+    enc = Budget(irig.irig_enc)
+    ev = enc.run(0, {"y": 2}, pins=lambda t: level_at(pairs, t), \
+            jmp_pin=lambda t: level_at(pairs, t) >> 1, \
+            limit=SYMBOL * 101)
+    reads = [t for t, k, v in ev if k in ("in", "jmp_pin")]
+    seen = [v for t, k, v in ev if k == "in"]
+    want = [(frame[n >> 4] >> ((n & 0xf) << 1)) & 3 for n in range(1, 100)]
+    rep.check(seen[:99] == want, "lockstep encoder reads symbols 1..99 as pushed")
+    m = margin([t for t, v in pairs], reads)
+    rep.check(m >= 1, "lockstep fifo -> encoder, closest %d clocks (%.0f%% of a symbol)" % \
+            (m, 100.0 * m / SYMBOL))
+
+    out = [(t, v) for t, k, v in ev if k == "set"]
+    ask = Budget(irig.irig_ask)
+    aev = ask.run(0, jmp_pin=lambda t: level_at(out, t, 1), limit=SYMBOL * 100)
+    high = [t for t, k, v in aev if k == "jmp_pin" and v]
+    counts = [len([t for t in high if n * SYMBOL <= t < (n + 1) * SYMBOL]) \
+            for n in range(1, 99)]
+    rep.check(counts == [HIGH[c] for c in want[:98]], \
+            "lockstep modulator 2/5/8 high cycles per symbol, as the encoder")
+    m = margin([t for t, v in out], [t for t, k, v in aev if k == "jmp_pin"])
+    rep.check(m >= 1, "lockstep encoder -> modulator, closest %d clocks" % m)
+
+
+def precision(irig, rep):
+    sm0 = Budget(irig.precision_12k)
+    wt = sm0.prog.wrap_target
+    ev = sm0.run(wt, until=lambda pc, t: pc == wt)
+    base = sm0.t
+    irq = [t for t, k, v in ev if k == "irq"][0]
+    rep.info("precision_12k loop %d clocks, IRQ %d before the wrap" % \
+            (base, base - irq))
+
+    sys.path.insert(0, ROOT)
+    from libs.trigger_window import LOOP_CLOCKS, WINDOWS, window_clocks
+    rep.check(base == LOOP_CLOCKS, "precision_12k loop %d clocks, expected %d" % \
+            (base, LOOP_CLOCKS))
+    for w in WINDOWS:
+        name, d, x, b, y, a = w
+        code = list(sm0.code)
+        code[0] = (code[0] & ~0x1f) | x
+        code[1] = (code[1] & ~0x1f) | y
+        code[4] = (code[4] & ~0x1f00) | (d << 8)
+        code[5] = (code[5] & ~0x1f00) | (b << 8)
+        code[7] = (code[7] & ~0x1f00) | (a << 8)
+        patched = Budget(irig.precision_12k)
+        patched.code = code
+        ev = patched.run(wt, until=lambda pc, t: pc == wt)
+        irq = [t for t, k, v in ev if k == "irq"][0]
+        rep.check(patched.t == LOOP_CLOCKS and patched.t - irq - 1 == window_clocks(w), \
+                "precision %-4s loop %d clocks (expected %d), window %d" % \
+                (name, patched.t, LOOP_CLOCKS, patched.t - irq - 1))
+
+
+def done_irq(irig, rep):
+    from libs.pio_loader import PIOLoader, PIO_IRQ_DONE, irq_flags
+
+    for name in ("precision_12k", "start_from_pin_rising", "irig_fifo", \
+                "irig_fifo_minimal", "irig_enc", "irig_ask"):
+        prog = getattr(irig, name)
+        rep.info("%-22s IRQ flags %s" % (name, " ".join(["%x" % irq_flags(prog, sm) \
+                for sm in range(4)])))
+    rep.check(irq_flags(irig.irig_fifo, 3) & (1 << PIO_IRQ_DONE), \
+            "irig_fifo's underflow 'irq(rel(0))' is flag %d on SM3" % PIO_IRQ_DONE)
+
+    # the full 'irig_fifo' as the 4th of the 'sync' group, so on SM3
+    def layout(reserve):
+        loader = PIOLoader()
+        loader.add("sync", "counter", irig.precision_12k, 12_000_000)
+        loader.add("sync", "dcls", irig.irig_dcls, 12_000)
+        loader.add("sync", "dcls2", irig.irig_dcls, 12_000)
+        loader.add("sync", "fifo", irig.irig_fifo, 2_000)
+        if reserve:
+            loader.reserve_irq("counter", PIO_IRQ_DONE)
+        try:
+            loader.plan()
+            return loader.placed["fifo"]
+        except OSError:
+            return None
+    rep.check(layout(False) == (0, 3), "without the reservation, FIFO on SM3")
+    rep.check(layout(True) is None, "with it, the layout is refused")
+
+    # a group of its own can move to the other block
+    loader = PIOLoader()
+    loader.add("sync", "counter", irig.precision_12k, 12_000_000)
+    loader.add("sync", "phase", irig.start_from_pin_rising, 120_000_000)
+    loader.add("sync", "dcls", irig.irig_dcls, 12_000)
+    loader.add("fifo", "fifo", irig.irig_fifo, 2_000)
+    loader.reserve_irq("counter", PIO_IRQ_DONE)
+    loader.plan()
+    rep.check(loader.block("fifo") != loader.block("counter"), \
+            "a separate FIFO group is placed on PIO%d, away from the flag" % \
+            loader.block("fifo"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Static cycle budget of the PIO programs")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Also print the informational counts")
+    args = parser.parse_args()
+
+    irig = load()
+
+    # a frame with data-0, data-1 and markers in it
+    frame = list(irig.pack_from_seconds_fast(1735689599, irig.irig_frame, 0x5a5a))
+
+    rep = Report(args.verbose)
+    encoder(irig, rep)
+    fifo_ev = fifo(irig, frame, rep)
+    modulator(irig, rep)
+    lockstep(irig, frame, fifo_ev, rep)
+    precision(irig, rep)
+    done_irq(irig, rep)
+    print("%d failure(s)" % rep.fails)
+    sys.exit(1 if rep.fails else 0)
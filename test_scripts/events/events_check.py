@@ -0,0 +1,91 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Check the event timestamping ('libs/events.py') against a rendered DCLS
+# reference and events at known times. The StateMachine runs at a few MHz
+# rather than the CPU clock (the virtual board is too slow for 120MHz), and
+# X is pre-set so that it wraps during the run.
+#
+# MIT license - go make something cool....
+#
+# Host only, as the waveforms are scheduled on the virtual clock:
+# $ python3 ../shim/run_virtual.py events_check.py -p ../.. -s 6
+
+import random
+import rp2
+import utime
+import vpico
+from machine import Pin
+
+from libs.events import EventStamper, event_stamp
+from libs.pio_loader import PIO_BASE, PIO_FDEBUG, SM_BASE, SM_EXECCTRL
+
+SM_FREQ = 2000000               # ie. 1us resolution
+IRIG_FREQ = 1000                # IRIG-B, 10ms bits
+REF_PIN = 6
+EVENT_PIN = 22
+RATE = 200                      # events per second, on average
+WRAP_S = 1.5                    # X wraps this long after the start
+
+clock = vpico.board.clock
+gpio = vpico.board.gpio
+
+sm = rp2.StateMachine(4, event_stamp, freq=SM_FREQ, jmp_pin=Pin(REF_PIN))
+sm._hw.x = int(WRAP_S * SM_FREQ / 2)
+events = EventStamper(sm, PIO_BASE[1] + SM_BASE + SM_EXECCTRL, \
+            PIO_BASE[1] + PIO_FDEBUG, 1, EVENT_PIN, SM_FREQ, IRIG_FREQ, \
+            ref_pin=REF_PIN)
+
+# DCLS reference, CPU driven - frame 0 starts at 't0', 1 SM clock late as
+# from the encoder
+ref = Pin(REF_PIN, Pin.OUT, value=0)
+def level(pin, v):
+    gpio.cpu_out[pin] = v
+    gpio.update(pin)
+
+bit = 10.0 / IRIG_FREQ
+delay = 1.0 / (IRIG_FREQ * 12)
+t0 = clock.seconds() + 0.05
+for n in range(int(1.0 / bit)):
+    edge = t0 + n * bit + delay
+    clock.at(clock.when(edge), level, REF_PIN, 1)
+    clock.at(clock.when(edge + 0.2 * bit), level, REF_PIN, 0)
+
+# events, drawn from the pull on an input
+Pin(EVENT_PIN, Pin.IN, Pin.PULL_DOWN)
+def pull(v):
+    gpio.pull[EVENT_PIN] = "up" if v else "down"
+    gpio.update(EVENT_PIN)
+
+random.seed(1)
+sent = []
+t = t0 + 0.5
+while t < clock.limit - 0.2:
+    sent.append(t)
+    clock.at(clock.when(t), pull, 1)
+    clock.at(clock.when(t + random.uniform(0.2, 2) / RATE), pull, 0)
+    t += random.uniform(2.5, 10) / RATE
+
+utime.sleep(t0 - clock.seconds())
+events.start(utime.ticks_us())
+
+got = []
+while clock.seconds() < clock.limit - 0.1:
+    events.poll()
+    e = events.get()
+    while e:
+        got.append(e)
+        e = events.get()
+    utime.sleep(0.001)
+
+# against the events sent, in order
+frame_s = 100 * bit
+errors = [(f * frame_s + ns * 1e-9) - (s - t0) for s, (f, ns, seq, pin, flags) \
+            in zip(sent, got)]
+print("Events: %d sent, %d stamped, %d wraps" % (len(sent), len(got), events.wraps))
+if errors:
+    print("Error %.3f..%.3f us (%.3f us resolution)" % \
+            (min(errors) * 1e6, max(errors) * 1e6, 2e6 / SM_FREQ))
+events.report()
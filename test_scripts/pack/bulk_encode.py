@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+#
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Bulk frame encoder, with NumPy. Produces the same 7 FIFO words as
+# 'pack_from_seconds()' in 'pico-irig.py' for every frame in a time range at
+# once, so that a whole year can be encoded in seconds, and builds/verifies
+# a golden corpus from it - one hash per UTC day.
+#
+# The corpus is then used to check the device encoder(s) with
+# 'golden_check.py', without needing NumPy on the target.
+#
+# MIT license - go make something cool....
+#
+# $ python3 bulk_encode.py corpus 2024 -o golden/irig-b-2024.txt
+# $ python3 bulk_encode.py verify golden/irig-b-2024.txt
+# $ python3 bulk_encode.py show 1735689599 --count 2
+
+import argparse
+import hashlib
+import sys
+
+import numpy as np
+
+DAY = 86400
+
+# positions of the markers, Pr and P1..P0
+MARKERS = [0] + list(range(9, 100, 10))
+
+
+def _field(pairs, start, value, count):
+    # data bits of 'value', low bit first, into columns 'start'...
+    for i in range(count):
+        pairs[:, start + i] = (value >> i) & 1
+
+
+def _parity(pairs):
+    # As the device: for positions 0..74 (the words packed so far), each
+    # position counts 1 if the *next* data bit in the same word is set,
+    # otherwise its own data bit
+    data = (pairs[:, :75] == 1).astype(np.uint8)
+    nxt = np.zeros_like(data)
+    nxt[:, :-1] = data[:, 1:]
+    nxt[:, 15::16] = 0
+    return (np.count_nonzero(nxt | data, axis=1) & 1).astype(np.uint8)
+
+
+def encode(seconds, tenths=0, user=0, quality=0):
+    # Frames for UTC 'seconds' (int array), as an (n, 7) uint32 array.
+    # 'tenths', 'user' (see 'libs/user_data.py') are scalars or arrays,
+    # 'quality' is 0xF when packed with 'irig_trigger = IRIG_FAKE'
+    seconds = np.asarray(seconds, dtype=np.int64)
+    n = seconds.shape[0]
+    tenths = np.broadcast_to(np.asarray(tenths, dtype=np.int64), (n,))
+    user = np.broadcast_to(np.asarray(user, dtype=np.int64), (n,))
+
+    days = seconds // DAY
+    tod = seconds - (days * DAY)
+    date = days.astype("datetime64[D]")
+    year = date.astype("datetime64[Y]").astype(np.int64) + 1970
+    doy = (date - date.astype("datetime64[Y]")).astype(np.int64) + 1
+    hour, rest = np.divmod(tod, 3600)
+    minute, sec = np.divmod(rest, 60)
+
+    # 0 - data '0', 1 - data '1', 2 - marker
+    pairs = np.zeros((n, 100), dtype=np.uint8)
+    _field(pairs, 1, sec % 10, 4)
+    _field(pairs, 6, sec // 10, 3)
+    _field(pairs, 10, minute % 10, 4)
+    _field(pairs, 15, minute // 10, 4)
+    _field(pairs, 20, hour % 10, 4)
+    _field(pairs, 25, hour // 10, 4)
+    _field(pairs, 30, doy % 10, 4)
+    _field(pairs, 35, (doy // 10) % 10, 4)
+    _field(pairs, 40, doy // 100, 2)
+    _field(pairs, 42, user >> 10, 3)
+    _field(pairs, 45, tenths, 4)
+    _field(pairs, 50, year % 10, 4)
+    _field(pairs, 55, (year // 10) % 10, 4)
+    _field(pairs, 60, user, 9)
+    _field(pairs, 70, user >> 9, 1)
+    _field(pairs, 71, np.full(n, quality, dtype=np.int64), 4)
+    pairs[:, MARKERS] = 2
+    pairs[:, 75] = _parity(pairs)
+    _field(pairs, 76, user >> 13, 3)
+    _field(pairs, 80, tod, 9)
+    _field(pairs, 90, tod >> 9, 9)
+
+    # 16 pairs per word, low bits first
+    padded = np.zeros((n, 112), dtype=np.uint32)
+    padded[:, :100] = pairs
+    shifts = (np.arange(16, dtype=np.uint32) * 2)
+    return np.bitwise_or.reduce(padded.reshape(n, 7, 16) << shifts, axis=2)
+
+
+def frames(start, count, rate=1, **kwargs):
+    # 'count' frames from UTC 'start', at 'rate' frames per second (1 for
+    # IRIG-B, 10 for IRIG-A)
+    i = np.arange(count, dtype=np.int64)
+    return encode(start + (i // rate), (i % rate) if rate > 1 else 0, **kwargs)
+
+
+def frame_hash(words):
+    # of the frames as the device holds them, little-endian u32
+    return hashlib.sha256(np.ascontiguousarray(words, dtype="<u4").tobytes()).hexdigest()[:16]
+
+
+def day_hashes(year, rate=1, quality=0):
+    # (day of year, hash) for each UTC day of 'year'
+    first = int(np.datetime64("%d-01-01" % year, "D").astype(np.int64))
+    last = int(np.datetime64("%d-01-01" % (year + 1), "D").astype(np.int64))
+    for day in range(first, last):
+        yield day - first + 1, frame_hash(frames(day * DAY, DAY * rate, rate, \
+                quality=quality))
+
+
+def write_corpus(out, year, rate, quality):
+    out.write("# pico-irig golden corpus, sha256[:16] of each UTC day's frames\n")
+    out.write("year %d rate %d quality %d\n" % (year, rate, quality))
+    for doy, h in day_hashes(year, rate, quality):
+        out.write("%3.3d %s\n" % (doy, h))
+
+
+def read_corpus(name):
+    # ((year, rate, quality), {doy: hash})
+    days = {}
+    params = None
+    with open(name) as f:
+        for line in f:
+            line = line.split("#")[0].split()
+            if not line:
+                continue
+            if line[0] == "year":
+                params = (int(line[1]), int(line[3]), int(line[5]))
+            else:
+                days[int(line[0])] = line[1]
+    return params, days
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk IRIG frame encoder and golden corpus")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("corpus", help="Write the per-day hashes for a year")
+    p.add_argument("year", type=int)
+    p.add_argument("--rate", type=int, default=1, choices=(1, 10), help="Frames/s, 1 for IRIG-B (default), 10 for IRIG-A")
+    p.add_argument("--quality", type=int, default=0, help="Quality nibble, 15 when packed with IRIG_FAKE. Default 0")
+    p.add_argument("-o", "--output", help="Corpus file, default stdout")
+
+    p = sub.add_parser("verify", help="Re-encode a corpus and compare")
+    p.add_argument("corpus")
+
+    p = sub.add_parser("show", help="Print the FIFO words of frames")
+    p.add_argument("start", type=int, help="UTC seconds")
+    p.add_argument("--count", type=int, default=1)
+    p.add_argument("--rate", type=int, default=1, choices=(1, 10))
+    p.add_argument("--user", type=lambda v: int(v, 0), default=0)
+    args = parser.parse_args()
+
+    if args.cmd == "corpus":
+        out = open(args.output, "w") if args.output else sys.stdout
+        write_corpus(out, args.year, args.rate, args.quality)
+        if out is not sys.stdout:
+            out.close()
+
+    elif args.cmd == "verify":
+        (year, rate, quality), days = read_corpus(args.corpus)
+        fails = 0
+        for doy, h in day_hashes(year, rate, quality):
+            if days.get(doy) != h:
+                fails += 1
+                print("MISMATCH %d-%3.3d: %s != %s" % (year, doy, h, days.get(doy)))
+        print("%d days checked, %d mismatch(es)" % (len(days), fails))
+        sys.exit(1 if fails else 0)
+
+    else:
+        for n, w in enumerate(frames(args.start, args.count, args.rate, user=args.user)):
+            print("%d.%d" % (args.start + n // args.rate, n % args.rate), \
+                    " ".join("%8.8x" % v for v in w))
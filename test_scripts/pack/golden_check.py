@@ -0,0 +1,117 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Check the device frame packers against a golden corpus of per-day hashes
+# (from 'bulk_encode.py'), every frame of the chosen days. No NumPy needed,
+# so it runs on the Pico as well as on the host.
+#
+# Each day is 86400 IRIG-B frames, so about 35s per day and packer on the
+# host - the default is the last day of the year, from the Timebase only.
+# For a full check add the roll-over days (1, 2, 59, 60, 181, 365, 366) and
+# the other packers, which take about 8 minutes.
+#
+# MIT license - go make something cool....
+#
+# On the Pico, with 'pico-irig.py' and the corpus file copied over:
+# $ mpremote run golden_check.py
+#
+# or on the host, with the shim:
+# $ python3 ../shim/run_virtual.py golden_check.py -p ../..
+#
+# settings (edit here, as 'run_virtual.py' passes no arguments)
+
+CORPUS = "golden/irig-b-2025.txt"
+DAYS = [365]                    # ie. roll-overs, missing days are skipped
+FLOAT = False                   # also 'pack_from_seconds_fast()'
+BYTECODE = False                # also the slow 'pack_from_seconds()'
+
+import binascii
+import hashlib
+import utime
+from array import array
+
+from libs.timebase import Timebase
+
+try:
+    irig = __import__("pico_irig")
+except ImportError:
+    irig = __import__("pico-irig")
+
+# the corpus records the quality nibble, which depends on the trigger
+QUALITY = {0: irig.IRIG_RTC, 15: irig.IRIG_FAKE}
+
+try:
+    import os
+    here = __file__.rsplit("/", 1)[0] + "/" if "/" in __file__ else ""
+    os.stat(here + CORPUS)
+    CORPUS = here + CORPUS
+except (NameError, OSError):
+    pass
+
+params = None
+corpus = {}
+with open(CORPUS) as f:
+    for line in f:
+        line = line.split("#")[0].split()
+        if not line:
+            continue
+        if line[0] == "year":
+            params = (int(line[1]), int(line[3]), int(line[5]))
+        else:
+            corpus[int(line[0])] = line[1]
+
+year, rate, quality = params
+irig.irig_trigger = QUALITY[quality]
+start = utime.mktime((year, 1, 1, 0, 0, 0, 0, 0))
+
+
+def day_hash(pack, doy):
+    h = hashlib.sha256()
+    first = start + (doy - 1) * 86400
+    if pack is None:
+        # as the frame loop, from an integer Timebase
+        tb = Timebase(first, rate)
+        for n in range(86400 * rate):
+            h.update(bytes(irig.pack_from_timebase(tb, irig.irig_frame)))
+            tb.advance()
+    else:
+        for n in range(86400 * rate):
+            sec = first + (n // rate)
+            h.update(pack(sec, (n % rate) * 10 // rate))
+    return binascii.hexlify(h.digest())[:16].decode()
+
+
+def pack_fast(sec, tenths):
+    return bytes(irig.pack_from_seconds_fast(sec, irig.irig_frame, 0, tenths))
+
+
+def pack_bytecode(sec, tenths):
+    irig.pack_from_seconds(sec, 0, tenths)
+    return bytes(array("I", irig.irig_fifo))
+
+
+packers = [("timebase", None)]
+if FLOAT:
+    packers.append(("viper", pack_fast))
+if BYTECODE:
+    packers.append(("bytecode", pack_bytecode))
+
+fails = 0
+checked = 0
+for doy in DAYS:
+    if doy not in corpus:
+        continue
+    for name, pack in packers:
+        took = utime.ticks_ms()
+        h = day_hash(pack, doy)
+        took = utime.ticks_diff(utime.ticks_ms(), took)
+        checked += 1
+        if h != corpus[doy]:
+            fails += 1
+            print("MISMATCH %d-%3.3d %-8s %s != %s" % (year, doy, name, h, corpus[doy]))
+        else:
+            print("%d-%3.3d %-8s OK (%d ms)" % (year, doy, name, took))
+
+print("Checked %d day(s) against %s, %d mismatch(es)" % (checked, CORPUS, fails))
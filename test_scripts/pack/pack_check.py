@@ -0,0 +1,74 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Check that the viper/native frame packer ('pack_from_seconds_fast()')
+# produces exactly the same FIFO words as the bytecode 'pack_from_seconds()',
+# and puts user data where 'libs/user_data.py' expects it - then time both
+# and measure the heap used per frame.
+#
+# MIT license - go make something cool....
+#
+# On the Pico, with 'pico-irig.py' (or 'pico_irig.mpy') copied over:
+# $ mpremote run pack_check.py
+#
+# or on the host, with the shim (where the timings mean nothing, as the
+# virtual clock does not move during computation):
+# $ python3 ../shim/run_virtual.py pack_check.py -p ../..
+
+import gc
+import utime
+
+try:
+    irig = __import__("pico_irig")
+except ImportError:
+    irig = __import__("pico-irig")
+
+from libs.user_data import unpack
+
+# (seconds, tenths) at awkward times: epoch, leap days, day 366, year/century
+# roll-over, tenths and the last second of the day
+cases = [(0, 0), (0, 5), (59, 9), (86399, 0), (86399, 9),
+         (946684799, 9), (946684800, 0), (951782400, 0), (951868800, 0),
+         (978220800, 0), (978307199, 0), (1709164800, 5), (1735689599, 9),
+         (2147483647, 0), (4102444799, 0)]
+
+# and a spread of others, deterministic so any failure can be repeated
+seed = 12345
+for i in range(200):
+    seed = (seed * 1103515245 + 12345) & 0x7fffffff
+    cases.append((seed % 4102444800, (seed >> 8) % 10))
+
+fails = 0
+for n, (t, tenths) in enumerate(cases):
+    # with user data in the spare control bits, every other frame
+    user = (seed >> (n & 7)) & 0xffff if n & 1 else 0
+    irig.pack_from_seconds(t, user, tenths)
+    ref = list(irig.irig_fifo)
+    got = list(irig.pack_from_seconds_fast(t, irig.irig_frame, user, tenths))
+    if ref != got or unpack(got) != user:
+        fails += 1
+        print("MISMATCH %d.%d, user 0x%4.4x" % (t, tenths, user))
+        print("  bytecode", ["%8.8x" % w for w in ref])
+        print("  viper   ", ["%8.8x" % w for w in got])
+
+print("Checked %d frames, %d mismatch(es)" % (len(cases), fails))
+
+
+def bench(name, func, count=100):
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    start = utime.ticks_us()
+    for i in range(count):
+        func(1735689600 + i)
+    took = utime.ticks_diff(utime.ticks_us(), start)
+    alloc = gc.mem_alloc() - before
+    gc.enable()
+    print("%-10s %8.1f frames/s, %6d us/frame, %6d bytes/frame" % \
+            (name, count * 1000000 / max(took, 1), took // count, alloc // count))
+
+
+bench("bytecode", irig.pack_from_seconds)
+bench("viper", lambda t: irig.pack_from_seconds_fast(t, irig.irig_frame))
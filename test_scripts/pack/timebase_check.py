@@ -0,0 +1,105 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Check that the integer timebase ('libs/timebase.py') stays exact over years
+# of frames, for IRIG-B/A/G rates. It is advanced in random jumps (and frame
+# by frame around every midnight it crosses) and every field compared with
+# one derived directly from the frame count. Then the heap used per frame by
+# the frame loop's advance/pack is measured, which should be 0.
+#
+# For comparison the old float accumulator is run over a day of IRIG-A, and
+# the frames where its tenths were wrong are counted.
+#
+# MIT license - go make something cool....
+#
+# On the Pico, with 'pico-irig.py' and 'libs/' copied over:
+# $ mpremote run timebase_check.py
+#
+# or on the host, with the shim:
+# $ python3 ../shim/run_virtual.py timebase_check.py -p ../..
+#
+# settings (edit here, as 'run_virtual.py' passes no arguments)
+
+YEARS = 12
+RATES = [1, 10, 100]
+
+import gc
+import utime
+
+from libs.timebase import Timebase, DAY
+
+try:
+    irig = __import__("pico_irig")
+except ImportError:
+    irig = __import__("pico-irig")
+
+start = utime.mktime((2020, 1, 1, 0, 0, 0, 0, 0)) - 1    # just before midnight
+fails = 0
+
+
+def compare(tb, n, rate):
+    global fails
+    sec = start + (n // rate)
+    sub = n % rate
+    gm = utime.gmtime(sec)
+    want = (sec, sec % DAY, sub * 10 // rate, sub * 100 // rate, gm[0], gm[7])
+    got = (tb.seconds(), tb.tod(), tb.tenths(), tb.hundredths(), tb.year, tb.doy)
+    if got != want:
+        fails += 1
+        if fails < 10:
+            print("MISMATCH rate %d, frame %d: %s != %s" % (rate, n, got, want))
+    return sec
+
+
+checks = 0
+for rate in RATES:
+    tb = Timebase(start, rate)
+    n = 0
+    seed = 12345
+    end = YEARS * 365 * DAY * rate
+    while n < end:
+        seed = (seed * 1103515245 + 12345) & 0x7fffffff
+        jump = seed % (3 * DAY * rate)
+        day = tb.day
+        tb.advance(jump)
+        n += jump
+        compare(tb, n, rate)
+        checks += 1
+        if tb.day != day:
+            # step across the midnight, frame by frame
+            back = (tb.tod() * rate) + tb.sub() + rate
+            tb = Timebase(start, rate)
+            tb.advance(n - back)
+            for i in range(2 * rate):
+                compare(tb, n - back + i, rate)
+                tb.advance()
+                checks += 1
+            tb = Timebase(start, rate)
+            tb.advance(n)
+    print("Rate %3d frames/s: %d years, ends %s" % (rate, YEARS, tb))
+
+print("Checked %d points, %d mismatch(es)" % (checks, fails))
+
+# the old float accumulator, for a day of IRIG-A
+t = float(start + 1)
+wrong = 0
+for n in range(DAY * 10):
+    if int((t - int(t)) * 10) != n % 10:
+        wrong += 1
+    t += 1000 / 10000
+print("Float accumulator: %d of %d IRIG-A frames with the wrong tenths" % \
+        (wrong, DAY * 10))
+
+# heap per frame, as the frame loop
+tb = Timebase(start, 10)
+gc.collect()
+gc.disable()
+before = gc.mem_alloc()
+for n in range(1000):
+    irig.pack_from_timebase(tb, irig.irig_frame)
+    tb.advance()
+alloc = gc.mem_alloc() - before
+gc.enable()
+print("Timebase advance/pack: %d bytes/frame" % (alloc // 1000))
@@ -0,0 +1,123 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Check the loopback ('libs/loopback.py') against a rendered DCLS waveform.
+# Frames are packed by 'pico-irig.py' and rendered onto GPIO6 with edge
+# jitter; each is also passed to 'expect()' as when pushed to the FIFO. One
+# frame is sent with a changed bit (a mismatch), and an extra frame is expected
+# but never sent (a slip) - everything else should be verified.
+#
+# The SM is set up as 'pico-irig.py' does, at the CPU clock of 120MHz - and
+# the old rate (1 SM clock per sample) is checked to be out of range.
+#
+# MIT license - go make something cool....
+#
+# Host only, as the waveform is scheduled on the virtual clock:
+# $ python3 ../shim/run_virtual.py loopback_check.py -p ../.. -s 12
+#
+# settings (edit here, as 'run_virtual.py' passes no arguments)
+#   IRIG-A: FORMAT = "A"
+
+import random
+import rp2
+import utime
+import vpico
+from machine import Pin, freq
+
+from libs.loopback import Loopback, dcls_capture, SAMPLE_CLOCKS
+from libs.pio_loader import PIO_BASE, PIO_FDEBUG
+from libs.timebase import Timebase
+
+try:
+    irig = __import__("pico_irig")
+except ImportError:
+    irig = __import__("pico-irig")
+
+FORMAT = "B"
+FRAMES = 10
+JITTER_US = 20                  # +/- on each rendered edge, IRIG-B
+DCLS_PIN = 6
+CORRUPT = 4                     # this frame is sent with a bit changed
+MISSING = 7                     # an extra frame is expected before this one
+START = 1735689600              # UTC of the first frame
+
+freq(120000000)
+irig_freq = 1000 if FORMAT == "B" else 10000
+bit_rate = irig_freq // 10
+jitter = JITTER_US * 1e-6 * 100 / bit_rate
+clock = vpico.board.clock
+gpio = vpico.board.gpio
+fails = 0
+
+# at 1 SM clock per sample the divider is over the maximum, for IRIG-B
+try:
+    rp2.StateMachine(4, dcls_capture, freq=irig_freq, in_base=Pin(DCLS_PIN))
+    print("SM freq %d accepted" % irig_freq)
+    if FORMAT == "B":
+        fails += 1
+except ValueError as e:
+    print("SM freq %d: %s" % (irig_freq, e))
+    if FORMAT != "B":
+        fails += 1
+
+sm = rp2.StateMachine(4, dcls_capture, freq=irig_freq * SAMPLE_CLOCKS, \
+            in_base=Pin(DCLS_PIN))
+loopback = Loopback(sm, PIO_BASE[1] + PIO_FDEBUG, 1 << 0)
+
+# render the frames onto the DCLS pin, CPU driven
+drive = Pin(DCLS_PIN, Pin.OUT, value=0)
+def level(v):
+    gpio.cpu_out[DCLS_PIN] = v
+    gpio.update(DCLS_PIN)
+
+random.seed(1)
+t0 = clock.seconds() + 0.25
+frames = []
+tb = Timebase(START, bit_rate // 100)
+for f in range(FRAMES):
+    frame = list(irig.pack_from_timebase(tb, irig.irig_frame, 0))
+    frames.append(frame)
+    tb.advance()
+    sent = list(frame)
+    if f == CORRUPT:
+        sent[2] ^= 1 << 8               # a Data 0/1, not a marker
+    for n in range(100):
+        code = (sent[n >> 4] >> ((n & 0x0f) << 1)) & 3
+        edge = t0 + (f * 100 + n) / bit_rate
+        width = (0.2, 0.5, 0.8)[code] / bit_rate
+        j = lambda: random.uniform(-jitter, jitter)
+        clock.at(clock.when(edge + j()), level, 1)
+        clock.at(clock.when(edge + width + j()), level, 0)
+end = t0 + FRAMES * 100 / bit_rate
+
+# a marker (Pr) before the first frame so that it syncs on its P0, and the
+# P0 after the last so that it completes
+for edge in (t0 - 1.0 / bit_rate, end):
+    clock.at(clock.when(edge), level, 1)
+    clock.at(clock.when(edge + 0.8 / bit_rate), level, 0)
+
+utime.sleep(t0 - 1.5 / bit_rate - clock.seconds())
+loopback.start()
+expected = 0
+while clock.seconds() < end + 2 / bit_rate:
+    # expect each frame as it starts, as the main loop pushes them ahead
+    while expected < FRAMES and clock.seconds() > t0 + expected * 100 / bit_rate:
+        if expected == MISSING:
+            extra = list(frames[expected])
+            extra[1] ^= 1 << 4
+            loopback.expect(extra)
+        loopback.expect(frames[expected])
+        expected += 1
+    loopback.poll()
+    utime.sleep(0.002)
+loopback.stop()
+loopback.report()
+
+want = (FRAMES - 1, 1, 1, 0)
+got = (loopback.verified, loopback.mismatches, loopback.slips, loopback.overruns)
+print("verified/mismatches/slips/overruns %s, expected %s" % (got, want))
+if got != want:
+    fails += 1
+print("%d failure(s)" % fails)
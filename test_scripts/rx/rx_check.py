@@ -0,0 +1,119 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Check the IRIG receiver ('libs/irig_rx.py') against a rendered DCLS
+# waveform. Frames are packed by 'pico-irig.py' (with user data in the
+# control bits), rendered onto the receiver's input pin with optional edge
+# jitter, and the decoded time/CF/SBS and the on-time output edges are
+# compared with what was sent.
+#
+# MIT license - go make something cool....
+#
+# Host only, as the waveform is scheduled on the virtual clock:
+# $ python3 ../shim/run_virtual.py rx_check.py -p ../.. -s 30
+#
+# settings (edit here, as 'run_virtual.py' passes no arguments)
+#   IRIG-A: FORMAT = "A"
+
+import random
+import rp2
+import utime
+import vpico
+from machine import Pin
+
+from libs.irig_rx import irig_rx, IrigReceiver, RX_CLOCKS, RX_LATENCY
+from libs.timebase import Timebase
+
+try:
+    irig = __import__("pico_irig")
+except ImportError:
+    irig = __import__("pico-irig")
+
+FORMAT = "B"
+FRAMES = 20
+JITTER_US = 20                  # +/- on each rendered edge
+RX_PIN = 10
+ON_TIME_PIN = 11
+START = 1735689600              # UTC of the first frame
+
+bit_rate = 100 if FORMAT == "B" else 1000
+frames_s = 100 / bit_rate
+clock = vpico.board.clock
+gpio = vpico.board.gpio
+
+# the receiver
+sm = rp2.StateMachine(0, irig_rx, freq=bit_rate * RX_CLOCKS, \
+            in_base=Pin(RX_PIN), jmp_pin=Pin(RX_PIN), set_base=Pin(ON_TIME_PIN))
+rx = IrigReceiver(sm)
+
+# capture the on-time output
+on_time = []
+def trace(seconds, pin, level):
+    if pin == ON_TIME_PIN and level:
+        on_time.append(seconds)
+gpio.trace = trace
+
+# render the frames onto the input pin, CPU driven
+drive = Pin(RX_PIN, Pin.OUT, value=0)
+def level(v):
+    gpio.cpu_out[RX_PIN] = v
+    gpio.update(RX_PIN)
+
+random.seed(1)
+t0 = clock.seconds() + 0.25
+sent = []
+pr_edges = []
+tb = Timebase(START, bit_rate // 100)
+for f in range(FRAMES):
+    user = random.getrandbits(16)
+    frame = list(irig.pack_from_timebase(tb, irig.irig_frame, user))
+    sent.append((tb.seconds(), tb.tenths(), frame))
+    tb.advance()
+    for n in range(100):
+        code = (frame[n >> 4] >> ((n & 0x0f) << 1)) & 3
+        edge = t0 + (f * 100 + n) / bit_rate
+        if n == 0:
+            pr_edges.append(edge)
+        width = (0.2, 0.5, 0.8)[code] / bit_rate
+        j = lambda: random.uniform(-JITTER_US, JITTER_US) * 1e-6
+        clock.at(clock.when(edge + j()), level, 1)
+        clock.at(clock.when(edge + width + j()), level, 0)
+
+rx.start()
+decoded = []
+end = t0 + (FRAMES + 0.5) * frames_s
+while clock.seconds() < end:
+    frame = rx.poll()
+    if frame:
+        decoded.append(frame)
+    utime.sleep(0.001)
+
+# decoded frames, in order - the first frame's P0 is missing, so sync is
+# on the second
+fails = 0
+for s, (utc, tenths, cf, sbs, ok) in zip(sent[1:], decoded):
+    if (utc, tenths) != (s[0], s[1]) or not ok:
+        fails += 1
+        print("BAD frame %d.%d (sent %d.%d), SBS %d %s" % \
+                (utc, tenths, s[0], s[1], sbs, ok))
+        continue
+    # CF as sent, positions 60..68 and 70..78 from the FIFO words
+    word = s[2]
+    bit = lambda n: (word[n >> 4] >> ((n & 0x0f) << 1)) & 1
+    expect = sum(bit(60 + i) << i for i in range(9)) | \
+            sum(bit(70 + i) << (9 + i) for i in range(9))
+    if cf != expect:
+        fails += 1
+        print("BAD CF %d.%d, 0x%5.5x != 0x%5.5x" % (utc, tenths, cf, expect))
+
+# on-time edges, against the nearest rendered Pr
+latency = RX_LATENCY / (bit_rate * RX_CLOCKS)
+errors = [min([abs(e - p) for p in pr_edges]) for e in on_time]
+print("IRIG-%s: %d frames sent, %d decoded, %d bad" % \
+        (FORMAT, FRAMES, len(decoded), fails))
+if errors:
+    print("On-time edges: %d, error %.2f..%.2f us (%.2f us expected latency, %d us jitter)" % \
+        (len(on_time), min(errors) * 1e6, max(errors) * 1e6, latency * 1e6, JITTER_US))
+rx.report()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+#
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Batch decoding of capture directories with 'wav_decode.py'. Each channel of
+# each WAV is a job, spread over a pool of processes (one per core by default)
+# so that a directory of long captures decodes about as many times faster.
+#
+# Results are cached by the SHA-256 of the file (and the decoder's version and
+# options), so re-running over a directory only decodes new or changed
+# captures. For each capture a '<name>.json' is written to the output
+# directory, and a merged 'summary.json' and 'summary.csv' (one line per
+# channel) with the totals - decode errors, frame slips and the timing errors
+# pooled over all channels.
+#
+# MIT license - go make something cool....
+#
+# $ python3 wav_batch.py ../../sample --out results
+# $ python3 wav_batch.py captures/ --out results --jobs 4 --recursive
+
+import argparse
+import concurrent.futures
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+
+import wav_decode
+
+CSV_FIELDS = ["file", "channel", "format", "symbols", "frames", "errors", \
+        "sbs_errors", "slips", "ppm", "on_time_us_rms", "on_time_us_max", \
+        "period_us_rms", "period_us_max", "first", "last"]
+
+
+def file_hash(name):
+    h = hashlib.sha256()
+    with open(name, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def find(paths, recursive=False):
+    # WAV files under the paths, sorted
+    names = []
+    for path in paths:
+        if os.path.isfile(path):
+            names.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            names += [os.path.join(root, f) for f in files \
+                    if f.lower().endswith(".wav")]
+            if not recursive:
+                break
+    return sorted(names)
+
+
+def cache_key(digest, fmt):
+    return "%s-v%d-%s" % (digest, wav_decode.VERSION, fmt or "auto")
+
+
+def job(name, channel, fmt):
+    # in a worker, the results for one channel
+    fs, data = wav_decode.read_wav(name)
+    start = time.perf_counter()
+    r = wav_decode.decode_channel(data[:, channel], fs, fmt)
+    r["channel"] = channel
+    r["seconds"] = round(time.perf_counter() - start, 3)
+    return name, r
+
+
+def merge(stats):
+    # pooled count/mean/rms/max of a list of 'wav_decode.stats()'
+    stats = [s for s in stats if s.get("count")]
+    count = sum(s["count"] for s in stats)
+    if not count:
+        return {"count": 0}
+    return {"count": count, \
+            "mean": sum(s["mean"] * s["count"] for s in stats) / count, \
+            "rms": (sum(s["rms"] ** 2 * s["count"] for s in stats) / count) ** 0.5, \
+            "max": max(s["max"] for s in stats)}
+
+
+def summarize(results):
+    chans = [r for f in results for r in f["channels"]]
+    return {"files": len(results), "channels": len(chans), \
+            "frames": sum(r["frames"] for r in chans), \
+            "errors": sum(r["errors"] for r in chans), \
+            "sbs_errors": sum(r.get("sbs_errors", 0) for r in chans), \
+            "slips": sum(r["slips"] for r in chans), \
+            "on_time_us": merge([r.get("on_time_us", {}) for r in chans]), \
+            "period_us": merge([r.get("period_us", {}) for r in chans]), \
+            "failed": sorted(set(f["file"] for f in results \
+                    for r in f["channels"] if r["errors"] or r["slips"] \
+                    or r.get("sbs_errors") or not r["frames"]))}
+
+
+def csv_row(name, r):
+    row = {k: r.get(k, "") for k in CSV_FIELDS}
+    row["file"] = name
+    for s in ("on_time_us", "period_us"):
+        for k in ("rms", "max"):
+            row["%s_%s" % (s, k)] = r.get(s, {}).get(k, "")
+    return row
+
+
+def run(names, out, cache, jobs=None, fmt=None, verbose=False):
+    os.makedirs(out, exist_ok=True)
+    os.makedirs(cache, exist_ok=True)
+
+    results = {}
+    todo = []
+    cached = 0
+    same = {}                   # key -> names, decoded once
+    for name in names:
+        digest = file_hash(name)
+        key = cache_key(digest, fmt)
+        path = os.path.join(cache, key + ".json")
+        if key in same:
+            same[key].append(name)
+            continue
+        same[key] = [name]
+        if os.path.exists(path):
+            with open(path) as f:
+                results[name] = json.load(f)
+            results[name]["file"] = name
+            cached += 1
+            continue
+        try:
+            count = wav_decode.channels(name)
+        except Exception as e:
+            print("%s: %s" % (name, e), file=sys.stderr)
+            continue
+        results[name] = {"file": name, "sha256": digest, "key": key, \
+                "channels": [None] * count}
+        todo += [(name, c) for c in range(count)]
+
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(job, name, c, fmt) for name, c in todo]
+        for future in concurrent.futures.as_completed(futures):
+            name, r = future.result()
+            results[name]["channels"][r["channel"]] = r
+            if verbose:
+                print("%s %s" % (name, wav_decode.line(r)))
+    elapsed = time.perf_counter() - start
+
+    for group in same.values():
+        for name in group[1:]:
+            if group[0] in results:
+                results[name] = dict(results[group[0]], file=name)
+
+    ordered = [results[n] for n in names if n in results]
+    # per capture, named by its path (less the common part) so that the
+    # same name in sub-directories doesn't clash
+    common = os.path.commonpath([os.path.dirname(os.path.abspath(n)) \
+            for n in names])
+    rows = []
+    for f in ordered:
+        body = dict(f)
+        key = body.pop("key", None)
+        if key:
+            with open(os.path.join(cache, key + ".json"), "w") as c:
+                json.dump(body, c, indent=1)
+        base = os.path.relpath(os.path.abspath(f["file"]), common)
+        base = os.path.splitext(base)[0].replace(os.sep, "_")
+        with open(os.path.join(out, base + ".json"), "w") as c:
+            json.dump(body, c, indent=1)
+        rows += [csv_row(f["file"], r) for r in f["channels"]]
+
+    summary = summarize(ordered)
+    summary.update({"decoded": len(todo), "cached": cached, \
+            "seconds": round(elapsed, 3), "jobs": jobs or os.cpu_count()})
+    with open(os.path.join(out, "summary.json"), "w") as c:
+        json.dump(summary, c, indent=1)
+    with open(os.path.join(out, "summary.csv"), "w", newline="") as c:
+        w = csv.DictWriter(c, CSV_FIELDS)
+        w.writeheader()
+        w.writerows(rows)
+    return ordered, summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode directories of IRIG WAV captures")
+    parser.add_argument("path", nargs="+", help="WAV file(s) or directories")
+    parser.add_argument("--out", "-o", default="results", help="Output directory. Default 'results'")
+    parser.add_argument("--cache", help="Cache directory. Default '<out>/cache'")
+    parser.add_argument("--jobs", "-j", type=int, help="Processes. Default one per core")
+    parser.add_argument("--format", "-f", choices=sorted(wav_decode.FORMATS), help="IRIG format. Default detected")
+    parser.add_argument("--recursive", "-r", action="store_true", help="Also search sub-directories")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Print each channel as decoded")
+    args = parser.parse_args()
+
+    names = find(args.path, args.recursive)
+    if not names:
+        print("No WAV files found", file=sys.stderr)
+        sys.exit(1)
+    results, summary = run(names, args.out, args.cache or \
+            os.path.join(args.out, "cache"), args.jobs, args.format, args.verbose)
+
+    for f in results:
+        print(f["file"])
+        for r in f["channels"]:
+            print("  " + wav_decode.line(r))
+    print("%d files (%d cached), %d channels decoded in %.1fs with %d processes" % \
+            (summary["files"], summary["cached"], summary["decoded"], \
+            summary["seconds"], summary["jobs"]))
+    print("%d frames, %d decode errors, %d SBS errors, %d slips" % \
+            (summary["frames"], summary["errors"], summary["sbs_errors"], \
+            summary["slips"]))
+    for s in ("on_time_us", "period_us"):
+        if summary[s]["count"]:
+            print("%s: mean %.2f, rms %.2f, max %.2f" % \
+                    (s, summary[s]["mean"], summary[s]["rms"], summary[s]["max"]))
+    for name in summary["failed"]:
+        print("FAILED: %s" % name)
+    sys.exit(1 if summary["failed"] else 0)
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+#
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Host decoder for IRIG-B/A audio captures (WAV, as those in 'sample/'), one
+# unit per channel. With NumPy, a channel is decoded in one pass:
+#
+#   envelope  - analytic signal (FFT), averaged over exactly a carrier cycle
+#               (more would round off the 2 high cycles of a data-0)
+#   threshold - midway between the low and high carrier amplitudes, with
+#               hysteresis either side of it
+#   symbols   - each rising edge of the envelope starts a symbol, and the
+#               high time classifies it as data-0/data-1/marker (or error),
+#               with the same thresholds as 'libs/irig_rx.py'. Highs and
+#               lows shorter than 0.1 bit are merged, as carrier ripple
+#   frames    - a Pr follows P0, and the 100 symbols must have the markers
+#               (and only the markers) in place
+#
+# Edges are interpolated between samples, at the middle threshold. The timing is reported as the
+# symbol period error (each leading edge against the bit clock fitted over
+# its frame), the on-time error (each Pr against a line fitted through all of
+# them, so less the capture's sample clock error, which is reported as ppm),
+# and frame slips (the decoded time not following the count of frames).
+#
+# Years are 2 digits, taken as 1970..2069.
+#
+# MIT license - go make something cool....
+#
+# $ python3 wav_decode.py ../../sample/IRIG-B_fake_trigger.wav
+# $ python3 wav_decode.py ../../sample/IRIG-A_fake_trigger.wav --channel 0 --frames
+#
+# See 'wav_batch.py' for decoding directories of captures.
+
+import argparse
+import json
+import wave
+
+import numpy as np
+
+VERSION = 2                     # of the results, for 'wav_batch.py's cache
+DAY = 86400
+
+CODE_DATA0 = 0
+CODE_DATA1 = 1
+CODE_MARKER = 2
+CODE_ERROR = 3
+
+# high time, in bits, as 'libs/irig_rx.py'
+WIDTHS = [0.35, 0.65, 0.95]
+RUN_MIN = 0.1                   # bits, shorter highs/lows are merged
+ENV_CYCLES = 1                  # carrier cycles averaged for the envelope
+HYSTERESIS = 0.15               # of the low to high amplitude, either side
+
+# formats, name -> carrier Hz (frames/s is carrier / 1000)
+FORMATS = {"B": 1000, "A": 10000}
+
+MARKERS = np.zeros(100, dtype=bool)
+MARKERS[[0] + list(range(9, 100, 10))] = True
+
+
+def read_wav(name):
+    # (sample rate, samples as an (n, channels) int16 array)
+    with wave.open(name, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError("%s: only 16 bit PCM" % name)
+        data = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+        return w.getframerate(), data.reshape(-1, w.getnchannels())
+
+
+def channels(name):
+    with wave.open(name, "rb") as w:
+        return w.getnchannels()
+
+
+def detect_format(x, fs):
+    # by the carrier with the most energy, from the first few seconds
+    seg = x[:min(len(x), fs * 4)].astype(np.float64)
+    seg -= seg.mean()
+    t = np.arange(len(seg)) / fs
+    best = None
+    for name, fc in FORMATS.items():
+        if fc * 2.2 > fs:
+            continue
+        power = abs(np.dot(seg, np.exp(-2j * np.pi * fc * t)))
+        if best is None or power > best[1]:
+            best = (name, power)
+    return best[0] if best else None
+
+
+def envelope(x, fs, carrier):
+    # magnitude of the analytic signal, averaged over exactly 'ENV_CYCLES'
+    # of the carrier (including the fraction of a sample, as IRIG-A at
+    # 44.1kHz is 4.41 samples per cycle) so that the ripple cancels
+    x = x.astype(np.float64)
+    x -= np.median(x)
+    n = len(x)
+    h = np.zeros(n)
+    h[0] = 1
+    h[1:(n + 1) // 2] = 2
+    if n % 2 == 0:
+        h[n // 2] = 1
+    env = np.abs(np.fft.ifft(np.fft.fft(x) * h))
+
+    w = ENV_CYCLES * fs / carrier
+    c = np.concatenate(([0.0], np.cumsum(env)))
+    start = np.arange(n) - (w / 2)
+    at = lambda i: np.interp(i, np.arange(n + 1), c)
+    return (at(start + w) - at(start)) / w
+
+
+def threshold(env):
+    # (middle, low, high) thresholds, between the low and high amplitudes
+    # and ignoring silence
+    on = env > 0.1 * env.max()
+    if not on.any():
+        return None
+    low, high = np.percentile(env[on], [20, 95])
+    if high < low * 1.3:
+        return None                     # no modulation
+    mid = (low + high) / 2
+    band = HYSTERESIS * (high - low)
+    return mid, mid - band, mid + band
+
+
+def crossings(env, thr, index):
+    # sub-sample times (in samples) that 'env' crosses 'thr' at 'index'
+    a = env[index - 1]
+    b = env[index]
+    return (index - 1) + (thr - a) / np.where(b != a, b - a, 1)
+
+
+def levels(env, low, high):
+    # high/low with hysteresis, ie. the last threshold passed
+    passed = np.where(env > high, 1, np.where(env < low, 0, -1))
+    last = np.where(passed >= 0, np.arange(len(env)), 0)
+    np.maximum.accumulate(last, out=last)
+    level = passed[last]
+    level[level < 0] = 0                # before either was passed
+    return level.astype(bool)
+
+
+def _last_before(cross, index):
+    # the last of 'cross' at or before each of 'index'
+    return cross[np.maximum(np.searchsorted(cross, index, "right") - 1, 0)]
+
+
+def symbols(x, fs, carrier):
+    # (leading edge times in s, high times in bits, codes)
+    env = envelope(x, fs, carrier)
+    thr = threshold(env)
+    if thr is None:
+        return np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.uint8)
+    mid, low, high = thr
+    bit = fs / (carrier / 10)
+    level = levels(env, low, high)
+    step = np.diff(level.astype(np.int8))
+    rise = np.flatnonzero(step == 1) + 1
+    fall = np.flatnonzero(step == -1) + 1
+    # each rise with the fall after it, the last is incomplete
+    j = np.searchsorted(fall, rise)
+    ok = j < len(fall)
+    rise, fall = rise[ok], fall[j[ok]]
+    if not len(rise):
+        return np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.uint8)
+
+    # the edges are where the middle threshold was last crossed, before the
+    # hysteresis one
+    above = env > mid
+    up = np.flatnonzero(above[1:] & ~above[:-1]) + 1
+    down = np.flatnonzero(above[:-1] & ~above[1:]) + 1
+    t_rise = crossings(env, mid, _last_before(up, rise)) if len(up) else rise
+    t_fall = crossings(env, mid, _last_before(down, fall)) if len(down) else fall
+
+    # merge short highs into the low, then short lows into the high
+    keep = (t_fall - t_rise) >= RUN_MIN * bit
+    t_rise, t_fall = t_rise[keep], t_fall[keep]
+    if len(t_rise) > 1:
+        gap = np.concatenate(((t_rise[1:] - t_fall[:-1]) >= RUN_MIN * bit, [True]))
+        t_rise = t_rise[np.concatenate(([True], gap[:-1]))]
+        t_fall = t_fall[gap]
+
+    width = (t_fall - t_rise) / bit
+    codes = np.digitize(width, WIDTHS).astype(np.uint8)
+    return t_rise / fs, width, codes
+
+
+def find_frames(codes):
+    # indices of the Pr of each complete, well formed frame
+    if len(codes) < 101:
+        return np.zeros(0, dtype=np.int64)
+    win = np.lib.stride_tricks.sliding_window_view(codes, 100)
+    pr = np.flatnonzero((codes[1:len(win)] == CODE_MARKER) & \
+            (codes[:len(win) - 1] == CODE_MARKER)) + 1
+    frames = win[pr]
+    ok = np.all((frames == CODE_MARKER) == MARKERS, axis=1) & \
+            np.all(frames != CODE_ERROR, axis=1)
+    return pr[ok]
+
+
+def _bits(frames, start, count):
+    # little endian values from the data bits, for each frame
+    weights = 1 << np.arange(count, dtype=np.int64)
+    return (frames[:, start:start + count] & 1).astype(np.int64) @ weights
+
+
+def decode(frames):
+    # (UTC seconds, tenths, control functions, SBS consistent) for each of
+    # the (n, 100) frames of codes, as 'libs/irig_rx.py'
+    sec = _bits(frames, 1, 4) + 10 * _bits(frames, 6, 3)
+    minute = _bits(frames, 10, 4) + 10 * _bits(frames, 15, 3)
+    hour = _bits(frames, 20, 4) + 10 * _bits(frames, 25, 2)
+    doy = _bits(frames, 30, 4) + 10 * _bits(frames, 35, 4) + \
+            100 * _bits(frames, 40, 2)
+    tenths = _bits(frames, 45, 4)
+    year = _bits(frames, 50, 4) + 10 * _bits(frames, 55, 4)
+    cf = _bits(frames, 60, 9) | (_bits(frames, 70, 9) << 9)
+    sbs = _bits(frames, 80, 9) | (_bits(frames, 90, 8) << 9)
+
+    year = np.where(year < 70, 2000 + year, 1900 + year)
+    first = (year - 1970).astype("datetime64[Y]").astype("datetime64[D]")
+    days = first.astype(np.int64) + np.maximum(doy, 1) - 1
+    tod = (hour * 3600) + (minute * 60) + sec
+    return (days * DAY) + tod, tenths, cf, sbs == tod
+
+
+def stats(values):
+    # summary of an array of timing errors, also for merging
+    v = np.asarray(values, dtype=np.float64)
+    if not len(v):
+        return {"count": 0}
+    return {"count": int(len(v)), "mean": float(v.mean()), \
+            "rms": float(np.sqrt(np.mean(v * v))), "max": float(np.abs(v).max())}
+
+
+def decode_channel(x, fs, fmt=None):
+    # results for one channel, as a dict (JSON-able)
+    fmt = fmt or detect_format(x, fs)
+    result = {"format": fmt, "symbols": 0, "frames": 0, "errors": 0, \
+            "slips": 0}
+    if fmt is None:
+        result["errors"] = 1
+        return result
+    carrier = FORMATS[fmt]
+    rate = carrier // 1000
+    bit_s = 10.0 / carrier
+
+    t, width, codes = symbols(x, fs, carrier)
+    pr = find_frames(codes)
+    result["symbols"] = int(len(codes))
+    result["frames"] = int(len(pr))
+    # symbols not in a good frame, after the first (the start is expected)
+    covered = np.zeros(len(codes), dtype=bool)
+    for p in pr:
+        covered[p:p + 100] = True
+    if len(pr):
+        last = min(len(codes), pr[-1] + 100)
+        result["errors"] = int(np.count_nonzero(~covered[pr[0]:last]))
+    else:
+        result["errors"] = int(len(codes) > 0)
+    if not len(pr):
+        return result
+
+    frames = np.lib.stride_tricks.sliding_window_view(codes, 100)[pr]
+    utc, tenths, cf, consistent = decode(frames)
+    # in frames since the first
+    stamp = (utc * rate) + (tenths * rate // 10)
+    index = stamp - stamp[0]
+    result["first"] = "%d.%d" % (utc[0], tenths[0])
+    result["last"] = "%d.%d" % (utc[-1], tenths[-1])
+    result["sbs_errors"] = int(np.count_nonzero(~consistent))
+
+    # slips: the decoded time doesn't follow the frames in between, counted
+    # with the median frame period (the capture's clock may be well off)
+    on_time = t[pr]
+    if len(pr) > 1:
+        steps = np.diff(index)
+        ok = steps > 0
+        if not ok.any():
+            result["slips"] = int(len(steps))
+            return result
+        period = np.median(np.diff(on_time)[ok] / steps[ok])
+        elapsed = np.rint(np.diff(on_time) / period).astype(np.int64)
+        slips = np.flatnonzero(steps != elapsed) + 1
+        result["slips"] = int(len(slips))
+        result["ppm"] = float(((period * rate) - 1) * 1e6)
+
+        # on-time, against a line through the Prs (by decoded time) of each
+        # run without slips
+        errors = []
+        for seg in np.split(np.arange(len(pr)), slips):
+            if len(seg) > 2:
+                fit = np.polyfit(index[seg], on_time[seg], 1)
+                errors.append(on_time[seg] - np.polyval(fit, index[seg]))
+        if errors:
+            result["on_time_us"] = stats(np.concatenate(errors) * 1e6)
+
+    # symbol periods, each leading edge against its frame's bit clock
+    errors = []
+    for p in pr:
+        k = np.arange(100)
+        edges = t[p:p + 100]
+        fit = np.polyfit(k, edges, 1)
+        errors.append((edges - np.polyval(fit, k)) * 1e6)
+    result["period_us"] = stats(np.concatenate(errors))
+    result["bit_us"] = float(bit_s * 1e6)
+    return result
+
+
+def decode_file(name, channel=None, fmt=None):
+    # results for each channel (or the one), as a list
+    fs, data = read_wav(name)
+    chans = range(data.shape[1]) if channel is None else [channel]
+    out = []
+    for c in chans:
+        r = decode_channel(data[:, c], fs, fmt)
+        r["channel"] = c
+        out.append(r)
+    return out
+
+
+def line(r):
+    # one line summary of a channel's results
+    text = "ch%d IRIG-%s %5d symbols %4d frames %4d errors %3d slips" % \
+            (r["channel"], r["format"] or "?", r["symbols"], r["frames"], \
+            r["errors"], r["slips"])
+    if "on_time_us" in r:
+        text += ", on-time %.1f us rms, period %.1f us rms, %+.1f ppm" % \
+                (r["on_time_us"]["rms"], r["period_us"]["rms"], r["ppm"])
+    return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode IRIG-B/A from WAV captures")
+    parser.add_argument("wav", nargs="+", help="WAV capture(s), one unit per channel")
+    parser.add_argument("--channel", "-c", type=int, help="Only this channel")
+    parser.add_argument("--format", "-f", choices=sorted(FORMATS), help="IRIG format. Default detected")
+    parser.add_argument("--frames", action="store_true", help="Also print each frame's time")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    for name in args.wav:
+        results = decode_file(name, args.channel, args.format)
+        if args.json:
+            print(json.dumps({"file": name, "channels": results}, indent=1))
+            continue
+        print(name)
+        for r in results:
+            print("  " + line(r))
+        if args.frames:
+            fs, data = read_wav(name)
+            for r in results:
+                if not r["frames"]:
+                    continue
+                carrier = FORMATS[r["format"]]
+                t, width, codes = symbols(data[:, r["channel"]], fs, carrier)
+                pr = find_frames(codes)
+                frames = np.lib.stride_tricks.sliding_window_view(codes, 100)[pr]
+                utc, tenths, cf, ok = decode(frames)
+                for p, u, d, c, k in zip(pr, utc, tenths, cf, ok):
+                    print("  ch%d %10.6f s  %d.%d  cf 0x%05x%s" % (r["channel"], \
+                            t[p], u, d, c, "" if k else "  SBS mismatch"))
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+#
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Host tool to read Saleae Logic-2 '.sal' captures directly (without the
+# vendor GUI) and compute the trigger offset between a 1PPS edge and the
+# regenerated 12KHz/1Hz edge, ie. the measurement described in
+# 'docs/precision_trigger.md'.
+#
+# MIT license - go make something cool....
+#
+# A '.sal' is a zip archive with a 'meta.json' and a '<type>-<ch>.bin' per
+# channel. Each channel binary is:
+#
+#   '<SALEAE>', u32 version (2), u32 type (100 = digital, 101 = analog)
+#   u8, f64 sample_rate, u64 start_unix_ms, f64 start_frac_ms
+#   u8, u64 first_sample, u8, u64 last_sample
+#   u64 chunk_count, then chunks...
+#
+# Digital chunk:
+#   u64 start, u64 end, u8 initial_state, u8, u64 length, payload[length]
+#   payload is a list of run lengths (minus one), alternating state from
+#   'initial_state', each coded big-endian 7 bits per byte with bit-7 as
+#   continuation - except the first byte, which only carries 6 bits and
+#   uses bit-6 as continuation.
+#
+# Analog chunk:
+#   u64 start, u64 end, u64 count, i16 samples[count]
+#   u32, u64, u64 levels, then 'levels' x (u64 count, (i16 min, i16 max)[count])
+#   the min/max 'mipmap' levels are only used for display and are skipped.
+#
+# Everything is read from the archive as a stream, one chunk at a time, so
+# multi-GByte captures are processed in constant memory.
+#
+# Example, for the capture in 'docs':
+# $ python3 sal_stats.py ../../docs/precision-2024-12-27_22-11-41.sal \
+#        --pps 13 --pps-edge falling --regen 15 --regen-edge rising
+
+import argparse
+import json
+import os
+import struct
+import sys
+import zipfile
+from array import array
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+from libs.stats import Stats
+
+SAL_MAGIC = b"<SALEAE>"
+SAL_DIGITAL = 100
+SAL_ANALOG = 101
+
+EDGE_RISING = 1
+EDGE_FALLING = 0
+
+HEADER = struct.Struct("<8sII")
+HEADER_TIME = struct.Struct("<BdQdBQBQ")
+U64 = struct.Struct("<Q")
+DIGITAL_CHUNK = struct.Struct("<QQBBQ")
+ANALOG_CHUNK = struct.Struct("<QQQ")
+MIPMAP = struct.Struct("<IQQ")
+
+
+def _read(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise EOFError("truncated channel binary")
+    return data
+
+
+def decode_runs(payload):
+    # Decode the varint run lengths of a digital chunk
+    value = 0
+    first = True
+    for byte in payload:
+        if first:
+            value = byte & 0x3f
+            more = byte & 0x40
+            first = False
+        else:
+            value = (value << 7) | (byte & 0x7f)
+            more = byte & 0x80
+
+        if not more:
+            yield value + 1
+            first = True
+
+
+class SalChannel:
+    def __init__(self, archive, info):
+        self.archive = archive
+        self.channel = info["deviceChannel"]
+        self.kind = info["type"]
+        self.member = info["file"].lstrip("./")
+
+        self.sample_rate = 0.0
+        self.start_frac = 0.0
+
+    def _open(self):
+        f = self.archive.zip.open(self.member)
+
+        magic, version, kind = HEADER.unpack(_read(f, HEADER.size))
+        if magic != SAL_MAGIC or version != 2:
+            raise ValueError("%s: unsupported channel binary" % self.member)
+
+        fields = HEADER_TIME.unpack(_read(f, HEADER_TIME.size))
+        self.sample_rate = fields[1]
+        self.start_frac = fields[3] / 1000
+
+        count, = U64.unpack(_read(f, U64.size))
+        return f, kind, count
+
+    def time(self, sample):
+        # seconds since 'captureStartTime' (whole ms), common to all channels
+        return self.start_frac + sample / self.sample_rate
+
+    def transitions(self):
+        # Yield (sample, state) for each transition of a digital channel
+        f, kind, count = self._open()
+        if kind != SAL_DIGITAL:
+            raise ValueError("channel %d is not digital" % self.channel)
+
+        last = None
+        with f:
+            for c in range(count):
+                start, end, state, _, length = \
+                        DIGITAL_CHUNK.unpack(_read(f, DIGITAL_CHUNK.size))
+                payload = _read(f, length)
+
+                sample = start
+                for run in decode_runs(payload):
+                    if state != last:
+                        if last is not None:
+                            yield sample, state
+                        last = state
+                    sample += run
+                    state ^= 1
+
+    def samples(self):
+        # Yield (start, array('h')) for each chunk of an analog channel
+        f, kind, count = self._open()
+        if kind != SAL_ANALOG:
+            raise ValueError("channel %d is not analog" % self.channel)
+
+        with f:
+            for c in range(count):
+                start, end, length = \
+                        ANALOG_CHUNK.unpack(_read(f, ANALOG_CHUNK.size))
+                data = array("h")
+                data.frombytes(_read(f, length * 2))
+                yield start, data
+
+                _, _, levels = MIPMAP.unpack(_read(f, MIPMAP.size))
+                for l in range(levels):
+                    n, = U64.unpack(_read(f, U64.size))
+                    f.read(n * 4)
+
+    def analog_crossings(self, threshold):
+        # Yield (fractional sample, state) as an analog channel crosses
+        # 'threshold', with linear interpolation between samples
+        last = None
+        for start, data in self.samples():
+            for i in range(len(data)):
+                v = data[i]
+                if last is not None:
+                    if last < threshold <= v:
+                        yield start + i - 1 + (threshold - last) / (v - last), 1
+                    elif last >= threshold > v:
+                        yield start + i - 1 + (last - threshold) / (last - v), 0
+                last = v
+
+    def edges(self, polarity, threshold=None):
+        # Yield times (in seconds) of the requested edge
+        if self.kind == "Digital":
+            source = self.transitions()
+        else:
+            source = self.analog_crossings(threshold)
+
+        for sample, state in source:
+            if state == polarity:
+                yield self.time(sample)
+
+
+class SalArchive:
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path)
+        self.meta = json.loads(self.zip.read("meta.json"))
+
+        self.channels = {}
+        for info in self.meta["binData"]:
+            ch = SalChannel(self, info)
+            self.channels[ch.channel] = ch
+
+    def close(self):
+        self.zip.close()
+
+    def trigger_time(self):
+        return self.meta["data"].get("digitalTriggerTime")
+
+
+def trigger_offsets(pps, regen, window):
+    # Pair each PPS edge with the first regen edge following it, both
+    # iterators are consumed in step so nothing is buffered
+    r = next(regen, None)
+    for p in pps:
+        while r is not None and r < p:
+            r = next(regen, None)
+        if r is None:
+            return
+        if r - p <= window:
+            yield r - p
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trigger offset statistics from a Saleae '.sal' capture")
+    parser.add_argument("capture", help="'.sal' archive")
+    parser.add_argument("--pps", type=int, help="Channel with 1PPS input")
+    parser.add_argument("--pps-edge", choices=["rising", "falling"], default="falling")
+    parser.add_argument("--regen", type=int, help="Channel with regenerated 12KHz/1Hz output")
+    parser.add_argument("--regen-edge", choices=["rising", "falling"], default="rising")
+    parser.add_argument("--threshold", type=float, default=0.0, help="ADC counts, when using analog channel(s)")
+    parser.add_argument("--window", type=float, default=0.001, help="Max offset (s) to pair edges. Default 1ms")
+    parser.add_argument("--resolution", type=float, default=2e-9, help="Histogram bin (s). Default 2ns")
+    parser.add_argument("--list", action="store_true", help="List channels and exit")
+    args = parser.parse_args()
+
+    sal = SalArchive(args.capture)
+
+    if args.list or args.pps is None or args.regen is None:
+        print("Trigger at %s s" % sal.trigger_time())
+        for ch in sorted(sal.channels):
+            print("Channel %d: %s (%s)" % (ch, sal.channels[ch].kind, sal.channels[ch].member))
+        sal.close()
+        exit(0)
+
+    pps = sal.channels[args.pps].edges(
+            EDGE_RISING if args.pps_edge == "rising" else EDGE_FALLING,
+            args.threshold)
+    regen = sal.channels[args.regen].edges(
+            EDGE_RISING if args.regen_edge == "rising" else EDGE_FALLING,
+            args.threshold)
+
+    stats = Stats()
+    histogram = {}
+    for offset in trigger_offsets(pps, regen, args.window):
+        stats.add(offset)
+        b = round(offset / args.resolution)
+        histogram[b] = histogram.get(b, 0) + 1
+    sal.close()
+
+    if not stats.count:
+        print("No trigger events found")
+        exit(1)
+
+    # same layout as 'precision2.dat' in the docs, ie. 'count value'
+    for b in sorted(histogram):
+        print("%7d %.9f" % (histogram[b], b * args.resolution))
+
+    print()
+    print("Events: %d" % stats.count)
+    print("Mean:   %.9f s" % stats.mean)
+    print("Sigma:  %.3f ns" % (stats.sigma() * 1e9))
+    print("Min:    %.9f s" % stats.min)
+    print("Max:    %.9f s" % stats.max)
+    print("Range:  %.3f ns" % ((stats.max - stats.min) * 1e9))
@@ -0,0 +1,178 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# CPython shim for MicroPython's 'machine' module, backed by 'vpico'.
+#
+# MIT license - go make something cool....
+
+import vpico
+
+
+class _Mem32:
+    def __getitem__(self, addr):
+        return vpico.board.read32(addr)
+
+    def __setitem__(self, addr, value):
+        vpico.board.write32(addr, value)
+
+
+mem32 = _Mem32()
+
+
+def freq(hz=None):
+    clock = vpico.board.clock
+    if hz is None:
+        return clock.hz
+    clock.set_hz(hz)
+
+
+def disable_irq():
+    state = vpico.board.irq_enabled
+    vpico.board.irq_enabled = False
+    return state
+
+
+def enable_irq(state=True):
+    vpico.board.irq_enabled = state
+
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+
+def unique_id():
+    return b"\xe6\x61\x64\x08\x43\x2f\x8e\x2f"
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, *, value=None):
+        self.id = id
+        self.init(mode, pull, value=value)
+
+    def init(self, mode=-1, pull=-1, *, value=None):
+        gpio = vpico.board.gpio
+        n = self.id
+        if mode in (Pin.IN, Pin.OUT, Pin.OPEN_DRAIN):
+            gpio.func[n] = gpio.FUNC_SIO
+            gpio.cpu_oe[n] = mode == Pin.OUT
+        if pull != -1:
+            gpio.pull[n] = {Pin.PULL_UP: "up", Pin.PULL_DOWN: "down"}.get(pull)
+        if value is not None:
+            gpio.cpu_out[n] = 1 if value else 0
+        gpio.update(n)
+
+    def value(self, v=None):
+        gpio = vpico.board.gpio
+        if v is None:
+            return gpio.level(self.id)
+        gpio.cpu_out[self.id] = 1 if v else 0
+        gpio.update(self.id)
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(1 - vpico.board.gpio.cpu_out[self.id])
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, *, hard=False):
+        # kept, but not called - edges are not modelled outside the PIO
+        self.handler = handler
+        self.trigger = trigger
+
+    def __repr__(self):
+        return "Pin(GPIO%d)" % self.id
+
+
+class I2C:
+    # Register-file model, each device address holds 256 bytes
+
+    def __init__(self, id, *, scl=None, sda=None, freq=400000):
+        self.id = id
+        self.devices = {}
+
+    def _mem(self, addr):
+        return self.devices.setdefault(addr, bytearray(256))
+
+    def scan(self):
+        return sorted(self.devices)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8):
+        mem = self._mem(addr)
+        return bytes(mem[(memaddr + i) & 0xff] for i in range(nbytes))
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        buf[:] = self.readfrom_mem(addr, memaddr, len(buf))
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        mem = self._mem(addr)
+        for i, b in enumerate(buf):
+            mem[(memaddr + i) & 0xff] = b
+
+
+class UART:
+    # Receive buffer only, 'feed()' bytes in as if they arrived
+
+    def __init__(self, id, baudrate=115200, *, tx=None, rx=None, rxbuf=256, **kwargs):
+        self.id = id
+        self.baudrate = baudrate
+        self.rxbuf = rxbuf
+        self.buf = bytearray()
+
+    def feed(self, data):
+        self.buf += data
+        del self.buf[:-self.rxbuf]
+
+    def any(self):
+        return len(self.buf)
+
+    def read(self, nbytes=None):
+        if not self.buf:
+            return None
+        if nbytes is None:
+            nbytes = len(self.buf)
+        data = bytes(self.buf[:nbytes])
+        del self.buf[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        if not self.buf:
+            return None
+        n = min(len(buf) if nbytes is None else nbytes, len(self.buf))
+        buf[:n] = self.buf[:n]
+        del self.buf[:n]
+        return n
+
+    def write(self, buf):
+        return len(buf)
+
+
+class PWM:
+    # Claims the pin for its slice, the registers are driven through 'mem32'
+
+    def __init__(self, dest, *, freq=None, duty_u16=None):
+        self.pin = dest if isinstance(dest, int) else dest.id
+        gpio = vpico.board.gpio
+        gpio.func[self.pin] = gpio.FUNC_PWM
+        gpio.update(self.pin)
+
+    def deinit(self):
+        vpico.board.gpio.func[self.pin] = vpico.board.gpio.FUNC_SIO
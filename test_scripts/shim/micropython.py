@@ -0,0 +1,109 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# CPython shim for MicroPython's 'micropython' module.
+#
+# MIT license - go make something cool....
+#
+# '@micropython.native' and '@micropython.viper' are no-ops, the Python
+# code runs as is. '@micropython.asm_thumb' can not run on the host, so the
+# listing is recorded (instructions and 'data()' words) and calls go to a
+# model of the function in 'vpico.thumb_models'.
+
+import vpico
+
+
+def const(value):
+    return value
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def opt_level(level=None):
+    return 0
+
+
+def heap_lock():
+    pass
+
+
+def heap_unlock():
+    return 0
+
+
+def mem_info(verbose=False):
+    pass
+
+
+def schedule(func, arg):
+    clock = vpico.board.clock
+    clock.at(clock.now, func, arg)
+
+
+def native(func):
+    return func
+
+
+# viper's types, also used as casts - on the host arrays are indexed as is
+def ptr8(x):
+    return x
+
+
+ptr16 = ptr32 = ptr8
+
+
+def uint(x):
+    return int(x) & 0xffffffff
+
+
+def viper(func):
+    return func
+
+
+class _Name(str):
+    # Stand-in for registers/labels/instructions in an '@asm_thumb' listing
+    def __call__(self, *args):
+        _listing.append((str(self), args))
+
+
+class _Globals(dict):
+    def __missing__(self, key):
+        return _Name(key)
+
+
+_listing = []
+
+
+class ThumbFunction:
+    def __init__(self, func):
+        global _listing
+
+        self.name = func.__name__
+        self.__name__ = func.__name__
+        argcount = func.__code__.co_argcount
+
+        _listing = []
+        body = type(func)(func.__code__, _Globals())
+        body(*[_Name("r%d" % i) for i in range(argcount)])
+        self.listing = _listing
+        _listing = []
+
+        self.data = [args[1] for op, args in self.listing \
+                        if op == "data" and args[0] == 4]
+
+    def count(self, op):
+        return sum(1 for o, args in self.listing if o == op)
+
+    def __call__(self, *args):
+        model = vpico.thumb_models.get(self.name)
+        if model is None:
+            raise NotImplementedError("no model for asm_thumb '%s'" % self.name)
+        return model(self, *args)
+
+
+def asm_thumb(func):
+    return ThumbFunction(func)
@@ -0,0 +1,640 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# CPython shim for MicroPython's 'rp2' module, backed by 'vpico'.
+#
+# MIT license - go make something cool....
+#
+# '@rp2.asm_pio' assembles to the same 16bit instructions, and returns the
+# same program list layout, as MicroPython does - so code inspecting the
+# program (ie. its length) works on both.
+
+from array import array
+
+import vpico
+
+# program list layout, as MicroPython's 'rp2.py'
+_PROG_DATA = 0
+_PROG_OFFSET_PIO0 = 1
+_PROG_OFFSET_PIO1 = 2
+_PROG_EXECCTRL = 3
+_PROG_SHIFTCTRL = 4
+_PROG_OUT_PINS = 5
+_PROG_SET_PINS = 6
+_PROG_SIDESET_PINS = 7
+_PROG_MAX_FIELDS = 8
+
+
+class PIOASMError(Exception):
+    pass
+
+
+class Program(list):
+    # list, with the extra information a host tool might want
+    name = None
+    labels = None
+    wrap_target = 0
+    wrap = 0
+
+
+class PIOASMEmit:
+    def __init__(
+        self,
+        *,
+        out_init=None,
+        set_init=None,
+        sideset_init=None,
+        side_pindir=False,
+        in_shiftdir=0,
+        out_shiftdir=0,
+        autopush=False,
+        autopull=False,
+        push_thresh=32,
+        pull_thresh=32,
+        fifo_join=0
+    ):
+        self.labels = {}
+        execctrl = side_pindir << 29
+        shiftctrl = (
+            fifo_join << 30
+            | (pull_thresh & 0x1F) << 25
+            | (push_thresh & 0x1F) << 20
+            | out_shiftdir << 19
+            | in_shiftdir << 18
+            | autopull << 17
+            | autopush << 16
+        )
+        self.prog = Program([array("H"), -1, -1, execctrl, shiftctrl,
+                             out_init, set_init, sideset_init])
+
+        self.wrap_used = False
+
+        if sideset_init is None:
+            self.sideset_count = 0
+        elif isinstance(sideset_init, int):
+            self.sideset_count = 1
+        else:
+            self.sideset_count = len(sideset_init)
+
+    def start_pass(self, pass_):
+        if pass_ == 1:
+            if not self.wrap_used and self.num_instr:
+                self.wrap()
+            self.delay_max = 31
+            if self.sideset_count:
+                self.sideset_opt = self.num_sideset != self.num_instr
+                if self.sideset_opt:
+                    self.prog[_PROG_EXECCTRL] |= 1 << 30
+                    self.sideset_count += 1
+                self.delay_max >>= self.sideset_count
+        self.pass_ = pass_
+        self.num_instr = 0
+        self.num_sideset = 0
+
+    def __getitem__(self, key):
+        return self.delay(key)
+
+    def delay(self, delay):
+        if self.pass_ > 0:
+            if delay > self.delay_max:
+                raise PIOASMError("delay too large")
+            self.prog[_PROG_DATA][-1] |= delay << 8
+        return self
+
+    def side(self, value):
+        self.num_sideset += 1
+        if self.pass_ > 0:
+            if self.sideset_count == 0:
+                raise PIOASMError("no sideset")
+            elif value >= (1 << self.sideset_count):
+                raise PIOASMError("sideset too large")
+            set_bit = 13 - self.sideset_count
+            self.prog[_PROG_DATA][-1] |= self.sideset_opt << 12 | value << set_bit
+        return self
+
+    def wrap_target(self):
+        self.prog[_PROG_EXECCTRL] |= self.num_instr << 7
+        self.prog.wrap_target = self.num_instr
+
+    def wrap(self):
+        assert self.num_instr
+        self.prog[_PROG_EXECCTRL] |= (self.num_instr - 1) << 12
+        self.prog.wrap = self.num_instr - 1
+        self.wrap_used = True
+
+    def label(self, label):
+        if self.pass_ == 0:
+            if label in self.labels:
+                raise PIOASMError("duplicate label {}".format(label))
+            self.labels[label] = self.num_instr
+
+    def word(self, instr, label=None):
+        self.num_instr += 1
+        if self.pass_ > 0:
+            if label is None:
+                label = 0
+            else:
+                if label not in self.labels:
+                    raise PIOASMError("unknown label {}".format(label))
+                label = self.labels[label]
+            self.prog[_PROG_DATA].append(instr | label)
+        return self
+
+    def nop(self):
+        return self.word(0xA042)
+
+    def jmp(self, cond, label=None):
+        if label is None:
+            label = cond
+            cond = 0  # always
+        return self.word(0x0000 | cond << 5, label)
+
+    def wait(self, polarity, src, index):
+        if src == 6:
+            src = 1  # "pin"
+        elif src != 0:
+            src = 2  # "irq"
+        return self.word(0x2000 | polarity << 7 | src << 5 | index)
+
+    def in_(self, src, data):
+        if not 0 < data <= 32:
+            raise PIOASMError("invalid bit count {}".format(data))
+        return self.word(0x4000 | src << 5 | data & 0x1F)
+
+    def out(self, dest, data):
+        if dest == 8:
+            dest = 7  # exec
+        if not 0 < data <= 32:
+            raise PIOASMError("invalid bit count {}".format(data))
+        return self.word(0x6000 | dest << 5 | data & 0x1F)
+
+    def push(self, value=0, value2=0):
+        value |= value2
+        if not value & 1:
+            value |= 0x20  # block by default
+        return self.word(0x8000 | (value & 0x60))
+
+    def pull(self, value=0, value2=0):
+        value |= value2
+        if not value & 1:
+            value |= 0x20  # block by default
+        return self.word(0x8080 | (value & 0x60))
+
+    def mov(self, dest, src):
+        if dest == 8:
+            dest = 4  # exec
+        return self.word(0xA000 | dest << 5 | src)
+
+    def irq(self, mod, index=None):
+        if index is None:
+            index = mod
+            mod = 0  # no modifiers
+        return self.word(0xC000 | (mod & 0x60) | index)
+
+    def set(self, dest, data):
+        return self.word(0xE000 | dest << 5 | data)
+
+
+_pio_funcs = {
+    # source constants for wait
+    "gpio": 0,
+    # "pin": see below, translated to 1
+    # "irq": see below function, translated to 2
+    # source/dest constants for in_, out, mov, set
+    "pins": 0,
+    "x": 1,
+    "y": 2,
+    "null": 3,
+    "pindirs": 4,
+    "pc": 5,
+    "status": 5,
+    "isr": 6,
+    "osr": 7,
+    "exec": 8,  # translated to 4 for mov, 7 for out
+    # operation functions for mov's src
+    "invert": lambda x: x | 0x08,
+    "reverse": lambda x: x | 0x10,
+    # jmp condition constants
+    "not_x": 1,
+    "x_dec": 2,
+    "not_y": 3,
+    "y_dec": 4,
+    "x_not_y": 5,
+    "pin": 6,
+    "not_osre": 7,
+    # constants for push, pull
+    "noblock": 0x01,
+    "block": 0x21,
+    "iffull": 0x40,
+    "ifempty": 0x40,
+    # constants and modifiers for irq
+    # "noblock": see above
+    # "block": see above
+    "clear": 0x40,
+    "rel": lambda x: x | 0x10,
+    # functions
+    "wrap_target": None,
+    "wrap": None,
+    "label": None,
+    "word": None,
+    "nop": None,
+    "jmp": None,
+    "wait": None,
+    "in_": None,
+    "out": None,
+    "push": None,
+    "pull": None,
+    "mov": None,
+    "irq": None,
+    "set": None,
+}
+
+
+def asm_pio(**kw):
+    emit = PIOASMEmit(**kw)
+
+    def dec(f):
+        nonlocal emit
+
+        gl = _pio_funcs
+        gl["wrap_target"] = emit.wrap_target
+        gl["wrap"] = emit.wrap
+        gl["label"] = emit.label
+        gl["word"] = emit.word
+        gl["nop"] = emit.nop
+        gl["jmp"] = emit.jmp
+        gl["wait"] = emit.wait
+        gl["in_"] = emit.in_
+        gl["out"] = emit.out
+        gl["push"] = emit.push
+        gl["pull"] = emit.pull
+        gl["mov"] = emit.mov
+        gl["irq"] = emit.irq
+        gl["set"] = emit.set
+
+        for pass_ in range(2):
+            emit.start_pass(pass_)
+            exec(f.__code__, dict(gl))
+
+        for k in _pio_funcs:
+            if callable(_pio_funcs[k]) and k not in ("invert", "reverse", "rel"):
+                _pio_funcs[k] = None
+
+        prog = emit.prog
+        prog.name = f.__name__
+        prog.labels = emit.labels
+        emit = None
+        return prog
+
+    return dec
+
+
+def asm_pio_encode(instr, sideset_count, sideset_opt=False):
+    emit = PIOASMEmit()
+    emit.sideset_count = sideset_count
+    emit.sideset_opt = sideset_opt != 0
+    emit.delay_max = 31 >> (sideset_count + emit.sideset_opt)
+    emit.pass_ = 1
+    emit.num_instr = 0
+    emit.num_sideset = 0
+
+    gl = dict(_pio_funcs)
+    for k in ("word", "nop", "jmp", "wait", "in_", "out", "push", "pull",
+              "mov", "irq", "set"):
+        gl[k] = getattr(emit, k)
+
+    exec(instr, gl)
+    if len(emit.prog[_PROG_DATA]) != 1:
+        raise PIOASMError("expecting exactly 1 instruction")
+    return emit.prog[_PROG_DATA][0]
+
+
+# ---
+
+def _pin_id(pin):
+    if pin is None:
+        return None
+    return pin if isinstance(pin, int) else pin.id
+
+
+class PIO:
+    IN_LOW = 0
+    IN_HIGH = 1
+    OUT_LOW = 2
+    OUT_HIGH = 3
+
+    SHIFT_LEFT = 0
+    SHIFT_RIGHT = 1
+
+    JOIN_NONE = 0
+    JOIN_TX = 1
+    JOIN_RX = 2
+
+    IRQ_SM0 = 0x100
+    IRQ_SM1 = 0x200
+    IRQ_SM2 = 0x400
+    IRQ_SM3 = 0x800
+
+    def __init__(self, id):
+        self.id = id
+
+    @property
+    def _hw(self):
+        return vpico.board.pio[self.id]
+
+    def add_program(self, prog):
+        hw = self._hw
+        if prog[_PROG_OFFSET_PIO0 + self.id] >= 0:
+            return
+
+        data = prog[_PROG_DATA]
+        used = _used(hw)
+        for offset in range(32 - len(data), -1, -1):
+            if all(a not in used for a in range(offset, offset + len(data))):
+                break
+        else:
+            raise OSError(12, "ENOMEM")     # as MicroPython, when PIO is full
+
+        for i, instr in enumerate(data):
+            if instr >> 13 == 0:            # relocate 'jmp'
+                instr += offset
+            hw.instr[offset + i] = instr
+        prog[_PROG_OFFSET_PIO0 + self.id] = offset
+        hw.programs.append(prog)
+
+    def remove_program(self, prog=None):
+        hw = self._hw
+        if prog is None:
+            progs = list(hw.programs)
+        else:
+            progs = [prog] if prog in hw.programs else []
+
+        for p in progs:
+            offset = p[_PROG_OFFSET_PIO0 + self.id]
+            for sm in hw.sm:
+                # Note: real hardware would continue executing whatever is
+                # loaded here next, these are stopped and listed instead
+                if sm.enabled and offset <= sm.pc < offset + len(p[_PROG_DATA]):
+                    sm.set_enabled(False)
+                    hw.orphaned.append((sm.id, p.name))
+            hw.programs.remove(p)
+            p[_PROG_OFFSET_PIO0 + self.id] = -1
+
+    def state_machine(self, id, *args, **kw):
+        return StateMachine(self.id * 4 + id, *args, **kw)
+
+    def irq(self, handler=None, trigger=0xf00, hard=False):
+        hw = self._hw
+        for i in range(4):
+            if trigger & (0x100 << i):
+                hw.handlers[i] = (handler, self)
+                hw.inte |= 1 << i
+
+
+def _used(hw):
+    used = set()
+    for p in hw.programs:
+        offset = p[_PROG_OFFSET_PIO0 + hw.index]
+        used.update(range(offset, offset + len(p[_PROG_DATA])))
+    return used
+
+
+class StateMachine:
+    def __init__(self, id, prog=None, *args, **kw):
+        self.id = id
+        self.pio = PIO(id // 4)
+        if prog is not None:
+            self.init(prog, *args, **kw)
+
+    @property
+    def _hw(self):
+        return vpico.board.pio[self.id // 4].sm[self.id % 4]
+
+    def __eq__(self, other):
+        return isinstance(other, StateMachine) and other.id == self.id
+
+    def __hash__(self):
+        return self.id
+
+    def init(
+        self,
+        prog,
+        freq=-1,
+        *,
+        in_base=None,
+        out_base=None,
+        set_base=None,
+        jmp_pin=None,
+        sideset_base=None,
+        in_shiftdir=None,
+        out_shiftdir=None,
+        push_thresh=None,
+        pull_thresh=None
+    ):
+        sm = self._hw
+        board = vpico.board
+        self.pio.add_program(prog)
+        offset = prog[_PROG_OFFSET_PIO0 + self.pio.id]
+
+        sm.set_enabled(False)
+        hw = self.pio._hw
+        hw.orphaned = [o for o in hw.orphaned if o[0] != self.id]
+
+        if freq > 0:
+            # as the RP2040, a divider of 1 to 65536 (16.8 fixed point)
+            div = board.clock.hz / freq
+            if not 1 <= div <= 65536:
+                raise ValueError("freq out of range")
+            sm.div = max(vpico.SUB, int(board.clock.hz * vpico.SUB / freq))
+        else:
+            sm.div = vpico.SUB
+
+        execctrl = prog[_PROG_EXECCTRL] + (offset << 7) + (offset << 12)
+        if jmp_pin is not None:
+            execctrl |= _pin_id(jmp_pin) << 24
+        sm.write(vpico.SM_EXECCTRL, execctrl)
+
+        shiftctrl = prog[_PROG_SHIFTCTRL]
+        if in_shiftdir is not None:
+            shiftctrl = shiftctrl & ~(1 << 18) | in_shiftdir << 18
+        if out_shiftdir is not None:
+            shiftctrl = shiftctrl & ~(1 << 19) | out_shiftdir << 19
+        if push_thresh is not None:
+            shiftctrl = shiftctrl & ~(0x1f << 20) | (push_thresh & 0x1f) << 20
+        if pull_thresh is not None:
+            shiftctrl = shiftctrl & ~(0x1f << 25) | (pull_thresh & 0x1f) << 25
+        sm.write(vpico.SM_SHIFTCTRL, shiftctrl)
+
+        out_init = _init_list(prog[_PROG_OUT_PINS])
+        set_init = _init_list(prog[_PROG_SET_PINS])
+        sideset_init = _init_list(prog[_PROG_SIDESET_PINS])
+
+        sm.in_base = _pin_id(in_base) or 0
+        sm.out_base = _pin_id(out_base) or 0
+        sm.out_count = len(out_init)
+        sm.set_base = _pin_id(set_base) or 0
+        sm.set_count = len(set_init)
+        sm.sideset_base = _pin_id(sideset_base) or 0
+        sm.sideset_count = len(sideset_init) + sm.side_en
+
+        sm.tx.clear()
+        sm.rx.clear()
+        sm.restart()
+        sm.phase = board.clock.now
+        sm.pc = offset
+        sm.reset_stats()
+
+        # assign pins to this PIO and set their initial states
+        gpio = board.gpio
+        for base, init in ((out_base, out_init), (set_base, set_init),
+                           (sideset_base, sideset_init)):
+            if base is None:
+                continue
+            for i, state in enumerate(init):
+                pin = (_pin_id(base) + i) & 0x1f
+                gpio.func[pin] = self.pio.id + 1
+                gpio.pio_out[pin] = state & 1
+                gpio.pio_oe[pin] = bool(state & 2)
+                gpio.update(pin)
+
+    def active(self, value=None):
+        if value is None:
+            return self._hw.enabled
+        self._hw.set_enabled(value)
+
+    def restart(self):
+        self._hw.restart()
+
+    def exec(self, instr):
+        if isinstance(instr, str):
+            instr = asm_pio_encode(instr, self._hw.sideset_count)
+        self._hw.force(instr)
+
+    def put(self, value, shift=0):
+        sm = self._hw
+        if not isinstance(value, int):
+            for v in value:
+                self.put(v, shift)
+            return
+        while not sm.put(value << shift):
+            # blocks, as MicroPython does, letting time move forward
+            vpico.board.clock.sleep(sm.div / (vpico.board.clock.hz * vpico.SUB))
+
+    def get(self, buf=None, shift=0):
+        sm = self._hw
+        while not sm.rx:
+            vpico.board.clock.sleep(sm.div / (vpico.board.clock.hz * vpico.SUB))
+        return sm.get() >> shift
+
+    def rx_fifo(self):
+        return len(self._hw.rx)
+
+    def tx_fifo(self):
+        return len(self._hw.tx)
+
+    def irq(self, handler=None, trigger=0, hard=False):
+        hw = vpico.board.pio[self.id // 4]
+        index = self.id % 4
+        if handler is None:
+            hw.handlers.pop(index, None)
+            hw.inte &= ~(1 << index)
+        else:
+            hw.handlers[index] = (handler, self)
+            hw.inte |= 1 << index
+
+
+def _init_list(init):
+    if init is None:
+        return []
+    if isinstance(init, int):
+        return [init]
+    return list(init)
+
+
+class DMA:
+    # One claimed channel of the 'vpico' DMA model
+
+    def __init__(self):
+        self._hw = vpico.board.dma_claim()
+        self.channel = self._hw.index
+        self.registers = vpico.DMA_BASE + (self.channel * vpico.DMA_STRIDE)
+
+    def close(self):
+        self._hw.abort()
+        vpico.board.dma_claimed.discard(self.channel)
+
+    def pack_ctrl(self, default=None, **kw):
+        # as MicroPython, from the defaults (or 'default') plus the fields given
+        fields = dict(enable=1, high_pri=0, size=2, inc_read=1, inc_write=1,
+                      ring_size=0, ring_sel=0, chain_to=self.channel,
+                      treq_sel=vpico.DMA_TREQ_PERMANENT, irq_quiet=1, bswap=0,
+                      sniff_en=0)
+        if default is not None:
+            fields = self.unpack_ctrl(default)
+        for name, value in kw.items():
+            if name not in fields:
+                raise TypeError("unknown field '%s'" % name)
+            fields[name] = int(value)
+        ctrl = 0
+        for name, (shift, bits) in _DMA_CTRL.items():
+            ctrl |= (fields[name] & ((1 << bits) - 1)) << shift
+        return ctrl
+
+    @staticmethod
+    def unpack_ctrl(value):
+        return {name: (value >> shift) & ((1 << bits) - 1) \
+                for name, (shift, bits) in _DMA_CTRL.items()}
+
+    def config(self, read=None, write=None, count=None, ctrl=None, trigger=False):
+        if read is not None:
+            self.read = read
+        if write is not None:
+            self.write = write
+        if count is not None:
+            self.count = count
+        if ctrl is not None:
+            self.ctrl = ctrl
+        if trigger:
+            self.active(1)
+
+    def _reg(self, offset, value):
+        if not isinstance(value, int):
+            value = vpico.board.addressof(value)
+        vpico.board.write32(self.registers + offset, value)
+
+    # the non-triggering registers, from the first alias
+    read = property(lambda self: vpico.board.read32(self.registers + 0x00),
+                    lambda self, v: self._reg(0x00, v))
+    write = property(lambda self: vpico.board.read32(self.registers + 0x04),
+                     lambda self, v: self._reg(0x04, v))
+    count = property(lambda self: vpico.board.read32(self.registers + 0x08),
+                     lambda self, v: self._reg(0x08, v))
+    ctrl = property(lambda self: vpico.board.read32(self.registers + 0x10),
+                    lambda self, v: self._reg(0x10, v))
+
+    def active(self, value=None):
+        if value is None:
+            return self._hw.busy
+        if value:
+            self._hw.trigger()
+        else:
+            self._hw.abort()
+
+
+# DMA CTRL fields, (shift, bits)
+_DMA_CTRL = {
+    "enable": (0, 1),
+    "high_pri": (1, 1),
+    "size": (2, 2),
+    "inc_read": (4, 1),
+    "inc_write": (5, 1),
+    "ring_size": (6, 4),
+    "ring_sel": (10, 1),
+    "chain_to": (11, 4),
+    "treq_sel": (15, 6),
+    "irq_quiet": (21, 1),
+    "bswap": (22, 1),
+    "sniff_en": (23, 1),
+}
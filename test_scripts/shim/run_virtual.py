@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+#
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Run a MicroPython script (ie. 'pico-irig.py') unchanged on the host,
+# using the shim modules in this directory and a virtual clock. At the
+# end the FIFO refill/underflow figures and the startup time are reported.
+#
+# MIT license - go make something cool....
+#
+# $ python3 run_virtual.py ../../pico-irig.py --seconds 60 --quiet
+
+import argparse
+import builtins
+import contextlib
+import gc
+import io
+import os
+import runpy
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import vpico
+
+# MicroPython's heap on the RP2040
+HEAP_SIZE = 192 * 1024
+
+
+def install(script, seconds=None, seed=0, hz=125_000_000, path=()):
+    # Prepare a fresh virtual board and import path for 'script'
+    board = vpico.reset(hz)
+    board.random.seed(seed)
+    if seconds is not None:
+        board.clock.limit = seconds
+
+    for root in [os.path.dirname(os.path.abspath(script))] + list(path):
+        root = os.path.abspath(root)
+        if root not in sys.path:
+            sys.path.insert(1, root)
+
+    # MicroPython has these available without an 'import'
+    import machine
+    import micropython
+    builtins.machine = machine
+    builtins.micropython = micropython
+    for name in ("ptr8", "ptr16", "ptr32", "uint"):
+        setattr(builtins, name, getattr(micropython, name))
+
+    # MicroPython's 'gc' extras, the heap is modelled with 'tracemalloc'
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    gc.mem_alloc = lambda: tracemalloc.get_traced_memory()[0]
+    gc.mem_free = lambda: max(0, HEAP_SIZE - gc.mem_alloc())
+    gc.threshold = lambda amount=None: -1
+
+    import random
+    random.seed(seed)
+    return board
+
+
+def run(script, seconds, seed=0, quiet=False, path=()):
+    # Returns the board, so that the caller can inspect the results
+    board = install(script, seconds, seed, path=path)
+
+    # with a '.buffer', as on MicroPython, for binary output
+    out = io.TextIOWrapper(io.BytesIO(), write_through=True) if quiet else sys.stdout
+    with contextlib.redirect_stdout(out):
+        try:
+            runpy.run_path(script, run_name="__main__")
+        except vpico.SimulationEnd:
+            pass
+    return board
+
+
+def program_at(pio, pc):
+    for p in pio.programs:
+        offset = p[1 + pio.index]
+        if offset <= pc < offset + len(p[0]):
+            return p.name
+    return "?"
+
+
+def report(board, wall=None):
+    clock = board.clock
+    print("Virtual time: %.3f s" % clock.seconds())
+    if wall:
+        print("Wall time:    %.3f s (x%.1f real time)" % \
+                (wall, clock.seconds() / wall))
+
+    for pio in board.pio:
+        for sm in pio.sm:
+            if not sm.executed:
+                continue
+            print("SM-%d %-24s %s executed %d" % (sm.id, program_at(pio, sm.pc), \
+                    "running" if sm.enabled else "stopped", sm.executed))
+            if sm.pulls:
+                print("     pulls %d, underflows %d (%.3f ms starved), min TX level %d" % \
+                        (sm.pulls, sm.tx_stalls, \
+                        sm.tx_stall_ticks / (clock.hz * vpico.SUB) * 1000, \
+                        sm.tx_min_level))
+                print("     first pull at %.6f s" % clock.seconds(sm.first_pull))
+
+        for sm_id, name in pio.orphaned:
+            print("SM-%d was left running '%s' when it was removed" % (sm_id, name))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a MicroPython script against a virtual Pico")
+    parser.add_argument("script", help="Script to run, ie. pico-irig.py")
+    parser.add_argument("--seconds", "-s", type=float, default=10, help="Virtual seconds to run for. Default 10")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed. Default 0")
+    parser.add_argument("--quiet", "-q", action="store_true", help="Suppress the script's output")
+    parser.add_argument("--path", "-p", action="append", default=[], help="Extra import path, ie. for 'libs'")
+    args = parser.parse_args()
+
+    start = time.time()
+    board = run(args.script, args.seconds, args.seed, args.quiet, args.path)
+    report(board, time.time() - start)
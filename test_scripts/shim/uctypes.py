@@ -0,0 +1,48 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# CPython shim for MicroPython's 'uctypes' module, backed by 'vpico'.
+#
+# MIT license - go make something cool....
+#
+# Only what 'libs/irig_pwm.py' uses; 'addressof()' a buffer, and an array
+# of UINT32 at an address. The type values are the shim's own.
+
+import vpico
+
+ARRAY = 1 << 30
+UINT32 = 6 << 24
+
+
+def addressof(buf):
+    return vpico.board.addressof(buf)
+
+
+class _Words:
+    def __init__(self, addr, length):
+        self.addr = addr
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def _at(self, i):
+        if not 0 <= i < self.length:
+            raise IndexError("index out of range")
+        return self.addr + (4 * i)
+
+    def __getitem__(self, i):
+        return vpico.board.read32(self._at(i))
+
+    def __setitem__(self, i, value):
+        vpico.board.write32(self._at(i), value)
+
+
+class struct:
+    def __init__(self, addr, descriptor, layout_type=None):
+        for name, (offset, kind) in descriptor.items():
+            if offset & ~0xffff != ARRAY or kind & ~0xffff != UINT32:
+                raise NotImplementedError("only ARRAY of UINT32")
+            setattr(self, name, _Words(addr + (offset & 0xffff), kind & 0xffff))
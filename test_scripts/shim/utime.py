@@ -0,0 +1,81 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# CPython shim for MicroPython's 'utime' module, all times are taken
+# from the 'vpico' virtual clock. 'sleep()' is what moves it forwards.
+#
+# MIT license - go make something cool....
+
+import calendar
+
+import vpico
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = _TICKS_PERIOD // 2
+
+# seconds since 1970-01-01, at virtual time zero
+epoch = 0
+
+
+def _seconds():
+    return vpico.board.clock.seconds()
+
+
+def sleep(seconds):
+    vpico.board.clock.sleep(seconds)
+
+
+def sleep_ms(ms):
+    vpico.board.clock.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    vpico.board.clock.sleep(us / 1000000)
+
+
+def ticks_ms():
+    return int(_seconds() * 1000) & _TICKS_MAX
+
+
+def ticks_us():
+    return int(_seconds() * 1000000) & _TICKS_MAX
+
+
+def ticks_cpu():
+    clock = vpico.board.clock
+    return (clock.now // vpico.SUB) & _TICKS_MAX
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    diff = (ticks1 - ticks2) & _TICKS_MAX
+    return ((diff + _TICKS_HALFPERIOD) & _TICKS_MAX) - _TICKS_HALFPERIOD
+
+
+def time():
+    return epoch + int(_seconds())
+
+
+def time_ns():
+    return int((epoch + _seconds()) * 1e9)
+
+
+def gmtime(secs=None):
+    if secs is None:
+        secs = time()
+    t = __import__("time").gmtime(secs)
+    return (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min,
+            t.tm_sec, t.tm_wday, t.tm_yday)
+
+
+localtime = gmtime
+
+
+def mktime(t):
+    return calendar.timegm((t[0], t[1], t[2], t[3], t[4], t[5], 0, 0, 0))
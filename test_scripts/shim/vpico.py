@@ -0,0 +1,1239 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Virtual RP2040, used by the CPython shim modules ('rp2', 'machine',
+# 'utime' and 'micropython') so that 'pico-irig.py' can be run unchanged
+# on a host, against a virtual clock.
+#
+# MIT license - go make something cool....
+#
+# The model covers what the project actually uses:
+# * a virtual clock, counted in 1/256th of a SysClk cycle (same resolution
+#   as the PIO fractional clock dividers)
+# * GPIOs, with CPU/PIO function select, direction and pull-up/-down
+# * both PIO blocks; instruction memory, IRQ flags, FIFOs and the four
+#   StateMachines, which execute the real (assembled) PIO instructions
+# * the PIO registers, via 'mem32' - including the atomic XOR/SET/CLR
+#   aliases of the peripheral registers
+# * DMA channels, either unpaced or paced by a PWM slice's wrap, and the
+#   PWM slices' TOP/DIV/EN registers - as 'libs/irig_pwm.py' uses them.
+#   Buffers are given made-up SRAM addresses ('uctypes.addressof()'), and
+#   a paced block is moved in one go, at the wrap of its last transfer
+#
+# Python code on the 'CPU' takes zero time, time only moves forward when
+# it calls 'utime.sleep()' (or blocks on a full FIFO). StateMachines that
+# are stalled on a 'wait', an empty FIFO, or are spinning on a 'jmp' to
+# themselves are not clocked until something they depend on changes, so
+# the slow (12KHz) parts run many times faster than real time.
+
+import heapq
+import random
+
+SUB = 256                       # scheduler ticks per SysClk cycle
+
+PIO0_BASE = 0x50200000
+PIO1_BASE = 0x50300000
+SIO_CPUID = 0xd0000000
+PERIPH_BASE = 0x40000000        # APB/AHB peripherals, which have the aliases
+PERIPH_END = 0x60000000
+ALIAS_XOR = 0x1000
+ALIAS_SET = 0x2000
+ALIAS_CLR = 0x3000
+SYST_CSR = 0xe000e010
+SYST_RVR = 0xe000e014
+SYST_CVR = 0xe000e018
+SRAM_BUFFERS = 0x20008000       # made-up addresses, for 'uctypes.addressof()'
+
+# register offsets within a PIO block
+CTRL = 0x000
+FSTAT = 0x004
+FDEBUG = 0x008
+FLEVEL = 0x00c
+TXF0 = 0x010
+RXF0 = 0x020
+IRQ = 0x030
+IRQ_FORCE = 0x034
+INSTR_MEM0 = 0x048
+SM0_CLKDIV = 0x0c8
+SM_STRIDE = 0x18
+INTR = 0x128
+
+# offsets within a StateMachine's registers
+SM_CLKDIV = 0x00
+SM_EXECCTRL = 0x04
+SM_SHIFTCTRL = 0x08
+SM_ADDR = 0x0c
+SM_INSTR = 0x10
+SM_PINCTRL = 0x14
+
+# DMA channels, each with 4 aliases of its 4 registers - writing the last
+# register of an alias triggers the channel
+DMA_BASE = 0x50000000
+DMA_STRIDE = 0x40
+DMA_CHANNELS = 12
+DMA_ALIASES = (("read", "write", "count", "ctrl"),
+               ("ctrl", "read", "write", "count"),
+               ("ctrl", "count", "read", "write"),
+               ("ctrl", "write", "count", "read"))
+DMA_TREQ_PWM_WRAP0 = 24
+DMA_TREQ_PERMANENT = 0x3f
+DMA_BUSY = 1 << 24
+
+# PWM slices
+PWM_BASE = 0x40050000
+PWM_STRIDE = 0x14
+PWM_DIV = 0x04
+PWM_TOP = 0x10
+PWM_EN = 0x400500a0
+
+MASK32 = 0xffffffff
+
+
+def atomic(old, value, op):
+    # register value after a write through the XOR/SET/CLR alias 'op', or
+    # a plain write (op 0)
+    if op == ALIAS_XOR:
+        return old ^ value
+    if op == ALIAS_SET:
+        return old | value
+    if op == ALIAS_CLR:
+        return old & ~value
+    return value
+
+
+class SimulationEnd(Exception):
+    # Raised from 'utime.sleep()' when the requested run time is reached
+    pass
+
+
+def _bitrev(v):
+    r = 0
+    for i in range(32):
+        r = (r << 1) | (v & 1)
+        v >>= 1
+    return r
+
+
+def _mask(n):
+    return (1 << n) - 1
+
+
+class Clock:
+    def __init__(self, hz=125_000_000):
+        self.hz = hz
+        self.now = 0
+        self.queue = []
+        self.seq = 0
+
+        self.limit = None           # in seconds, see 'sleep()'
+        self._base = 0
+        self._base_s = 0.0
+
+    def seconds(self, when=None):
+        if when is None:
+            when = self.now
+        return self._base_s + (when - self._base) / (self.hz * SUB)
+
+    def set_hz(self, hz):
+        self._base_s = self.seconds()
+        self._base = self.now
+        self.hz = hz
+
+    def ticks(self, seconds):
+        return int(round(seconds * self.hz * SUB))
+
+    def when(self, seconds):
+        # absolute time, of a virtual time in seconds
+        return self._base + self.ticks(seconds - self._base_s)
+
+    def at(self, when, func, *args):
+        self.seq += 1
+        heapq.heappush(self.queue, (when, self.seq, func, args))
+
+    def run_until(self, when):
+        queue = self.queue
+        while queue and queue[0][0] <= when:
+            t, _, func, args = heapq.heappop(queue)
+            if t > self.now:
+                self.now = t
+            func(*args)
+        if when > self.now:
+            self.now = when
+
+    def sleep(self, seconds):
+        target = self.now + self.ticks(seconds)
+        if self.limit is not None and target >= self.when(self.limit):
+            self.run_until(self.when(self.limit))
+            raise SimulationEnd()
+        self.run_until(target)
+
+
+class GPIO:
+    FUNC_SIO = 0
+    FUNC_PIO0 = 1
+    FUNC_PIO1 = 2
+    FUNC_PWM = 3
+
+    def __init__(self, board, count=30):
+        self.board = board
+        self.count = count
+        self.levels = 0         # bit-mask of pin levels
+
+        self.func = [self.FUNC_SIO] * count
+        self.pull = [None] * count
+        self.cpu_oe = [False] * count
+        self.cpu_out = [0] * count
+        self.pio_oe = [False] * count
+        self.pio_out = [0] * count
+
+        # optional callback(seconds, pin, level) for capturing waveforms
+        self.trace = None
+
+    def level(self, pin):
+        return (self.levels >> pin) & 1
+
+    def drive(self, pin):
+        # Describe how the pin is being driven, ie. ('out', 1) or ('pull', 0)
+        if self.func[pin] != self.FUNC_SIO:
+            if self.pio_oe[pin]:
+                return ("out", self.pio_out[pin])
+        elif self.cpu_oe[pin]:
+            return ("out", self.cpu_out[pin])
+
+        if self.pull[pin] == "up":
+            return ("pull", 1)
+        if self.pull[pin] == "down":
+            return ("pull", 0)
+        return ("float", self.level(pin))
+
+    def update(self, pin):
+        v = self.drive(pin)[1]
+        if v != self.level(pin):
+            self.levels ^= (1 << pin)
+            if self.trace:
+                self.trace(self.board.clock.seconds(), pin, v)
+            self.board.wake()
+
+    def pio_write(self, pio, pin, value=None, oe=None):
+        if pin >= self.count:
+            return
+        if self.func[pin] != pio.index + 1:
+            return
+        if value is not None:
+            self.pio_out[pin] = value & 1
+        if oe is not None:
+            self.pio_oe[pin] = bool(oe & 1)
+        self.update(pin)
+
+
+class StateMachine:
+    def __init__(self, pio, index):
+        self.pio = pio
+        self.board = pio.board
+        self.index = index
+        self.id = pio.index * 4 + index
+
+        self.enabled = False
+        self.div = SUB              # clock divider, in scheduler ticks
+        self.phase = 0              # time of a clock edge, for the divider
+
+        self.gen = 0
+        self.blocked = False
+        self.delay = 0
+
+        self.pc = 0
+        self.x = 0
+        self.y = 0
+        self.isr = 0
+        self.isr_count = 0
+        self.osr = 0
+        self.osr_count = 32
+
+        self.exec_instr = None      # instruction from INSTR register/'exec'
+        self.irq_waiting = None
+
+        # EXECCTRL
+        self.wrap_top = 31
+        self.wrap_bottom = 0
+        self.jmp_pin = 0
+        self.side_en = False
+        self.side_pindir = False
+        self.status_sel = 0
+        self.status_n = 0
+
+        # SHIFTCTRL
+        self.join_rx = False
+        self.join_tx = False
+        self.pull_thresh = 32
+        self.push_thresh = 32
+        self.out_right = True
+        self.in_right = True
+        self.autopull = False
+        self.autopush = False
+
+        # PINCTRL
+        self.sideset_count = 0
+        self.set_count = 5
+        self.out_count = 0
+        self.in_base = 0
+        self.sideset_base = 0
+        self.set_base = 0
+        self.out_base = 0
+
+        self.tx = []
+        self.rx = []
+
+        self.watches = []
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.executed = 0
+        self.stalled = False
+        self.tx_stalls = 0          # times the SM ran out of data (underflow)
+        self.tx_stall_ticks = 0
+        self._tx_stall_start = None
+        self.pulls = 0
+        self.tx_min_level = None    # lowest TX level left after a pull (slack)
+        self.first_pull = None
+        self.last_pull = None
+
+    # --- FIFOs
+
+    def tx_depth(self):
+        return 8 if self.join_tx else (0 if self.join_rx else 4)
+
+    def rx_depth(self):
+        return 8 if self.join_rx else (0 if self.join_tx else 4)
+
+    def put(self, value):
+        if len(self.tx) >= self.tx_depth():
+            self.pio.fdebug |= 1 << (16 + self.index)       # TXOVER
+            return False
+        self.tx.append(value & MASK32)
+        self.board.wake()
+        return True
+
+    def get(self):
+        if not self.rx:
+            self.pio.fdebug |= 1 << (8 + self.index)        # RXUNDER
+            return None
+        v = self.rx.pop(0)
+        self.board.wake()
+        return v
+
+    def _pull_tx(self):
+        self.osr = self.tx.pop(0)
+        self.osr_count = 0
+
+        now = self.board.clock.now
+        self.pulls += 1
+        if self.first_pull is None:
+            self.first_pull = now
+        self.last_pull = now
+        if self.tx_min_level is None or len(self.tx) < self.tx_min_level:
+            self.tx_min_level = len(self.tx)
+
+        if self._tx_stall_start is not None:
+            self.tx_stall_ticks += now - self._tx_stall_start
+            self._tx_stall_start = None
+        self.board.wake()
+
+    def _tx_stall(self):
+        self.pio.fdebug |= 1 << (24 + self.index)           # TXSTALL
+        if self._tx_stall_start is None:
+            self._tx_stall_start = self.board.clock.now
+            if self.first_pull is not None:
+                self.tx_stalls += 1
+
+    # --- clocking
+
+    def set_enabled(self, enable):
+        enable = bool(enable)
+        if enable == self.enabled:
+            return
+        self.enabled = enable
+        self.gen += 1
+        if enable:
+            self.blocked = False
+            self._schedule(self.board.clock.now)
+
+    def clkdiv_restart(self):
+        self.phase = self.board.clock.now
+        if self.enabled:
+            self.gen += 1
+            self.blocked = False
+            self._schedule(self.phase)
+
+    def restart(self):
+        self.isr = 0
+        self.isr_count = 0
+        self.osr_count = 32
+        self.delay = 0
+        self.exec_instr = None
+        self.irq_waiting = None
+
+    def _schedule(self, earliest):
+        if earliest <= self.phase:
+            when = self.phase
+        else:
+            n = -(-(earliest - self.phase) // self.div)
+            when = self.phase + n * self.div
+        self.board.clock.at(when, self._tick, self.gen)
+
+    def wake(self):
+        if self.blocked and self.enabled:
+            self.blocked = False
+            self.gen += 1
+            self._schedule(self.board.clock.now + 1)
+
+    def _tick(self, gen):
+        if gen != self.gen or not self.enabled:
+            return
+        self.phase = self.board.clock.now
+
+        delay = self.step()
+        if self.blocked:
+            return
+        self.board.clock.at(self.phase + self.div * (1 + delay),
+                self._tick, self.gen)
+
+    # --- execution
+
+    def watch(self, addr, callback):
+        # one shot callback(), when the SM next reaches address 'addr'
+        self.watches.append((addr, callback))
+
+    def force(self, instr):
+        # Execute now, as for a write to the SMx_INSTR register
+        self.exec_instr = instr & 0xffff
+        self.step()
+        if self.blocked:
+            # ie. instruction will be retried when SM is (next) clocked
+            self.blocked = False
+            if self.enabled:
+                self.gen += 1
+                self._schedule(self.board.clock.now + 1)
+
+    def step(self):
+        if self.exec_instr is not None:
+            instr = self.exec_instr
+            forced = True
+        else:
+            instr = self.pio.instr[self.pc]
+            forced = False
+
+        field = (instr >> 8) & 0x1f
+        delay_bits = 5 - self.sideset_count
+        delay = field & _mask(delay_bits)
+        if self.sideset_count:
+            side = field >> delay_bits
+            if self.side_en:
+                if side & (1 << (self.sideset_count - 1)):
+                    self._sideset(side, self.sideset_count - 1)
+            else:
+                self._sideset(side, self.sideset_count)
+
+        pc = self.pc
+        result = self._execute(instr)
+        if result is None:
+            # stalled, block until something changes
+            if not self.stalled:
+                self.stalled = True
+            self.blocked = True
+            return 0
+
+        self.stalled = False
+        self.executed += 1
+        if forced and self.exec_instr == instr:
+            self.exec_instr = None
+
+        jumped, idle = result
+        if not jumped and not forced:
+            if self.pc == self.wrap_top:
+                self.pc = self.wrap_bottom
+            else:
+                self.pc = (self.pc + 1) & 0x1f
+
+        if self.watches:
+            for w in list(self.watches):
+                if w[0] == self.pc:
+                    self.watches.remove(w)
+                    w[1]()
+
+        if idle and self.pc == pc and delay == 0 and not forced:
+            # spinning on the same instruction, with nothing changing
+            self.blocked = True
+        return delay
+
+    def _sideset(self, value, count):
+        gpio = self.board.gpio
+        for i in range(count):
+            pin = (self.sideset_base + i) & 0x1f
+            if self.side_pindir:
+                gpio.pio_write(self.pio, pin, oe=(value >> i))
+            else:
+                gpio.pio_write(self.pio, pin, value=(value >> i))
+
+    def _read_pins(self, base):
+        levels = self.board.gpio.levels
+        return ((levels >> base) | (levels << (32 - base))) & MASK32
+
+    def _write_pins(self, base, count, value, dirs=False):
+        gpio = self.board.gpio
+        for i in range(count):
+            pin = (base + i) & 0x1f
+            if dirs:
+                gpio.pio_write(self.pio, pin, oe=(value >> i))
+            else:
+                gpio.pio_write(self.pio, pin, value=(value >> i))
+
+    def _irq_index(self, index):
+        i = index & 0x7
+        if index & 0x10:
+            i = (i & 0x4) | ((i + self.index) & 0x3)
+        return i
+
+    def _execute(self, instr):
+        # returns (jumped, idle) or None when stalled
+        op = instr >> 13
+
+        if op == 0:                                 # JMP
+            cond = (instr >> 5) & 0x7
+            addr = instr & 0x1f
+            if cond == 0:
+                take = True
+            elif cond == 1:
+                take = self.x == 0
+            elif cond == 2:
+                take = self.x != 0
+                self.x = (self.x - 1) & MASK32
+            elif cond == 3:
+                take = self.y == 0
+            elif cond == 4:
+                take = self.y != 0
+                self.y = (self.y - 1) & MASK32
+            elif cond == 5:
+                take = self.x != self.y
+            elif cond == 6:
+                take = self.board.gpio.level(self.jmp_pin) == 1
+            else:
+                take = self.osr_count < self.pull_thresh
+            if take:
+                self.pc = addr
+                return (True, cond in (0, 6, 7))
+            return (False, False)
+
+        if op == 1:                                 # WAIT
+            pol = (instr >> 7) & 1
+            src = (instr >> 5) & 0x3
+            index = instr & 0x1f
+            if src == 0:
+                ok = self.board.gpio.level(index) == pol
+            elif src == 1:
+                ok = self.board.gpio.level((self.in_base + index) & 0x1f) == pol
+            else:
+                bit = 1 << self._irq_index(index)
+                ok = bool(self.pio.irq_flags & bit) == bool(pol)
+                if ok and pol:
+                    self.pio.clear_irq(bit)
+            return (False, False) if ok else None
+
+        if op == 2:                                 # IN
+            src = (instr >> 5) & 0x7
+            count = (instr & 0x1f) or 32
+            if self.autopush and self.isr_count >= self.push_thresh:
+                if len(self.rx) >= self.rx_depth():
+                    return None
+                self._push()
+            data = self._source(src) & _mask(count)
+            if self.in_right:
+                self.isr = ((self.isr >> count) | (data << (32 - count))) & MASK32
+            else:
+                self.isr = ((self.isr << count) | data) & MASK32
+            self.isr_count = min(32, self.isr_count + count)
+            if self.autopush and self.isr_count >= self.push_thresh \
+                    and len(self.rx) < self.rx_depth():
+                self._push()
+            return (False, False)
+
+        if op == 3:                                 # OUT
+            dest = (instr >> 5) & 0x7
+            count = (instr & 0x1f) or 32
+            if self.autopull and self.osr_count >= self.pull_thresh:
+                if not self.tx:
+                    self._tx_stall()
+                    return None
+                self._pull_tx()
+            if self.out_right:
+                data = self.osr & _mask(count)
+                self.osr = (self.osr >> count) & MASK32
+            else:
+                data = (self.osr >> (32 - count)) & _mask(count)
+                self.osr = (self.osr << count) & MASK32
+            self.osr_count = min(32, self.osr_count + count)
+            if self.autopull and self.osr_count >= self.pull_thresh and self.tx:
+                self._pull_tx()
+
+            if dest == 0:
+                self._write_pins(self.out_base, self.out_count, data)
+            elif dest == 1:
+                self.x = data
+            elif dest == 2:
+                self.y = data
+            elif dest == 4:
+                self._write_pins(self.out_base, self.out_count, data, dirs=True)
+            elif dest == 5:
+                self.pc = data & 0x1f
+                return (True, False)
+            elif dest == 6:
+                self.isr = data
+                self.isr_count = count
+            elif dest == 7:
+                self.exec_instr = data & 0xffff
+                return (True, False)
+            return (False, False)
+
+        if op == 4:
+            if instr & 0x80:                        # PULL
+                if_empty = instr & 0x40
+                block = instr & 0x20
+                if if_empty and self.osr_count < self.pull_thresh:
+                    return (False, False)
+                if self.tx:
+                    self._pull_tx()
+                elif block:
+                    self._tx_stall()
+                    return None
+                else:
+                    self.osr = self.x
+                    self.osr_count = 0
+            else:                                   # PUSH
+                if_full = instr & 0x40
+                block = instr & 0x20
+                if if_full and self.isr_count < self.push_thresh:
+                    return (False, False)
+                if len(self.rx) < self.rx_depth():
+                    self._push()
+                elif block:
+                    return None
+                else:
+                    self.isr = 0
+                    self.isr_count = 0
+            return (False, False)
+
+        if op == 5:                                 # MOV
+            dest = (instr >> 5) & 0x7
+            mop = (instr >> 3) & 0x3
+            src = instr & 0x7
+            data = self._source(src)
+            if mop == 1:
+                data = ~data & MASK32
+            elif mop == 2:
+                data = _bitrev(data)
+
+            if dest == 0:
+                before = self.board.gpio.levels
+                self._write_pins(self.out_base, self.out_count, data)
+                single = self.wrap_top == self.wrap_bottom == self.pc
+                return (False, single and before == self.board.gpio.levels)
+            elif dest == 1:
+                self.x = data
+            elif dest == 2:
+                self.y = data
+            elif dest == 4:
+                self.exec_instr = data & 0xffff
+                return (True, False)
+            elif dest == 5:
+                self.pc = data & 0x1f
+                return (True, False)
+            elif dest == 6:
+                self.isr = data
+                self.isr_count = 0
+            elif dest == 7:
+                self.osr = data
+                self.osr_count = 0
+            return (False, False)
+
+        if op == 6:                                 # IRQ
+            bit = 1 << self._irq_index(instr & 0x1f)
+            if self.irq_waiting is not None:
+                if self.pio.irq_flags & bit:
+                    return None
+                self.irq_waiting = None
+                return (False, False)
+            if instr & 0x40:
+                self.pio.clear_irq(bit)
+            else:
+                self.pio.set_irq(bit)
+                if instr & 0x20:
+                    self.irq_waiting = bit
+                    return None
+            return (False, False)
+
+        # SET
+        dest = (instr >> 5) & 0x7
+        data = instr & 0x1f
+        if dest == 0:
+            self._write_pins(self.set_base, self.set_count, data)
+        elif dest == 1:
+            self.x = data
+        elif dest == 2:
+            self.y = data
+        elif dest == 4:
+            self._write_pins(self.set_base, self.set_count, data, dirs=True)
+        return (False, False)
+
+    def _source(self, src):
+        if src == 0:
+            return self._read_pins(self.in_base)
+        if src == 1:
+            return self.x
+        if src == 2:
+            return self.y
+        if src == 3:
+            return 0
+        if src == 5:
+            level = len(self.rx) if self.status_sel else len(self.tx)
+            return MASK32 if level < self.status_n else 0
+        if src == 6:
+            return self.isr
+        return self.osr
+
+    def _push(self):
+        self.rx.append(self.isr)
+        self.isr = 0
+        self.isr_count = 0
+        self.board.wake()
+
+    # --- registers
+
+    def read(self, offset):
+        if offset == SM_CLKDIV:
+            return (self.div << 8) & MASK32
+        if offset == SM_EXECCTRL:
+            return (self.side_en << 30) | (self.side_pindir << 29) | \
+                   (self.jmp_pin << 24) | (self.wrap_top << 12) | \
+                   (self.wrap_bottom << 7) | (self.status_sel << 4) | \
+                   self.status_n
+        if offset == SM_SHIFTCTRL:
+            return (self.join_rx << 31) | (self.join_tx << 30) | \
+                   ((self.pull_thresh & 0x1f) << 25) | \
+                   ((self.push_thresh & 0x1f) << 20) | \
+                   (self.out_right << 19) | (self.in_right << 18) | \
+                   (self.autopull << 17) | (self.autopush << 16)
+        if offset == SM_ADDR:
+            return self.pc
+        if offset == SM_INSTR:
+            return self.pio.instr[self.pc]
+        return (self.sideset_count << 29) | (self.set_count << 26) | \
+               (self.out_count << 20) | (self.in_base << 15) | \
+               (self.sideset_base << 10) | (self.set_base << 5) | self.out_base
+
+    def write(self, offset, value):
+        if offset == SM_CLKDIV:
+            self.div = max(SUB, value >> 8)
+        elif offset == SM_EXECCTRL:
+            self.side_en = bool(value & (1 << 30))
+            self.side_pindir = bool(value & (1 << 29))
+            self.jmp_pin = (value >> 24) & 0x1f
+            self.wrap_top = (value >> 12) & 0x1f
+            self.wrap_bottom = (value >> 7) & 0x1f
+            self.status_sel = (value >> 4) & 1
+            self.status_n = value & 0xf
+        elif offset == SM_SHIFTCTRL:
+            self.join_rx = bool(value & (1 << 31))
+            self.join_tx = bool(value & (1 << 30))
+            self.pull_thresh = ((value >> 25) & 0x1f) or 32
+            self.push_thresh = ((value >> 20) & 0x1f) or 32
+            self.out_right = bool(value & (1 << 19))
+            self.in_right = bool(value & (1 << 18))
+            self.autopull = bool(value & (1 << 17))
+            self.autopush = bool(value & (1 << 16))
+        elif offset == SM_INSTR:
+            self.force(value)
+        elif offset == SM_PINCTRL:
+            self.sideset_count = (value >> 29) & 0x7
+            self.set_count = (value >> 26) & 0x7
+            self.out_count = (value >> 20) & 0x3f
+            self.in_base = (value >> 15) & 0x1f
+            self.sideset_base = (value >> 10) & 0x1f
+            self.set_base = (value >> 5) & 0x1f
+            self.out_base = value & 0x1f
+
+
+class PIO:
+    def __init__(self, board, index, base):
+        self.board = board
+        self.index = index
+        self.base = base
+
+        self.instr = [0] * 32
+        self.irq_flags = 0
+        self.fdebug = 0
+        self.inte = 0               # SM IRQ flags which interrupt the CPU
+        self.handlers = {}
+        self.sm = [StateMachine(self, i) for i in range(4)]
+
+        self.programs = []          # loaded by 'rp2.PIO.add_program()'
+        self.orphaned = []          # SMs stopped by 'remove_program()'
+
+    def set_irq(self, bits):
+        new = bits & ~self.irq_flags
+        self.irq_flags |= bits
+        if new:
+            self.board.wake()
+            for i in range(4):
+                if new & self.inte & (1 << i):
+                    self.board.cpu_irq(self, i)
+
+    def clear_irq(self, bits):
+        if self.irq_flags & bits:
+            self.irq_flags &= ~bits
+            self.board.wake()
+
+    def ctrl(self, value):
+        for i in range(4):
+            if value & (1 << (8 + i)):
+                self.sm[i].clkdiv_restart()
+            if value & (1 << (4 + i)):
+                self.sm[i].restart()
+        for i in range(4):
+            self.sm[i].set_enabled(value & (1 << i))
+
+    def read(self, offset):
+        if offset == CTRL:
+            return sum(1 << i for i in range(4) if self.sm[i].enabled)
+        if offset == FSTAT:
+            v = 0
+            for i, sm in enumerate(self.sm):
+                v |= (len(sm.rx) >= sm.rx_depth()) << i
+                v |= (not sm.rx) << (8 + i)
+                v |= (len(sm.tx) >= sm.tx_depth()) << (16 + i)
+                v |= (not sm.tx) << (24 + i)
+            return v
+        if offset == FDEBUG:
+            return self.fdebug
+        if offset == FLEVEL:
+            v = 0
+            for i, sm in enumerate(self.sm):
+                v |= (len(sm.tx) | (len(sm.rx) << 4)) << (i * 8)
+            return v
+        if RXF0 <= offset < RXF0 + 16:
+            v = self.sm[(offset - RXF0) // 4].get()
+            return 0 if v is None else v
+        if offset == IRQ:
+            return self.irq_flags
+        if offset == INTR:
+            return (self.irq_flags & 0xf) << 8
+        if SM0_CLKDIV <= offset < SM0_CLKDIV + 4 * SM_STRIDE:
+            o = offset - SM0_CLKDIV
+            return self.sm[o // SM_STRIDE].read(o % SM_STRIDE)
+        return 0
+
+    def aliased(self, offset, value, op):
+        # value to write for an aliased write. Write-1-to-clear registers
+        # only see the bits written, write-only ones (FIFOs, instructions)
+        # read as 0
+        if offset in (FDEBUG, IRQ):
+            return 0 if op == ALIAS_CLR else value
+        if TXF0 <= offset < RXF0 + 16 or INSTR_MEM0 <= offset < INSTR_MEM0 + 128 \
+                or (SM0_CLKDIV <= offset < SM0_CLKDIV + 4 * SM_STRIDE and \
+                (offset - SM0_CLKDIV) % SM_STRIDE == SM_INSTR):
+            return atomic(0, value, op)
+        return atomic(self.read(offset), value, op)
+
+    def write(self, offset, value, op=0):
+        if op:
+            value = self.aliased(offset, value, op) & MASK32
+        if offset == CTRL:
+            self.ctrl(value)
+        elif offset == FDEBUG:
+            self.fdebug &= ~value
+        elif TXF0 <= offset < TXF0 + 16:
+            self.sm[(offset - TXF0) // 4].put(value)
+        elif offset == IRQ:
+            self.clear_irq(value & 0xff)
+        elif offset == IRQ_FORCE:
+            self.set_irq(value & 0xff)
+        elif INSTR_MEM0 <= offset < INSTR_MEM0 + 128:
+            self.instr[(offset - INSTR_MEM0) // 4] = value & 0xffff
+        elif SM0_CLKDIV <= offset < SM0_CLKDIV + 4 * SM_STRIDE:
+            o = offset - SM0_CLKDIV
+            self.sm[o // SM_STRIDE].write(o % SM_STRIDE, value)
+
+
+class DMAChannel:
+    def __init__(self, board, index):
+        self.board = board
+        self.index = index
+        self.regs = {"read": 0, "write": 0, "count": 0, "ctrl": 0}
+
+        self.busy = False
+        self.slice = None           # PWM slice pacing the current block
+        self.block = 0              # ++ on abort, cancels the pending block
+        self.blocks = []            # (start time, READ_ADDR) of paced blocks
+
+    def field(self, shift, bits):
+        return (self.regs["ctrl"] >> shift) & _mask(bits)
+
+    def read(self, offset):
+        name = DMA_ALIASES[offset >> 4][(offset >> 2) & 3]
+        if name == "ctrl":
+            return self.regs["ctrl"] | (DMA_BUSY if self.busy else 0)
+        return self.regs[name]
+
+    def write(self, offset, value):
+        name = DMA_ALIASES[offset >> 4][(offset >> 2) & 3]
+        self.regs[name] = value & (MASK32 & ~DMA_BUSY if name == "ctrl" else MASK32)
+        if offset & 0xc == 0xc:
+            self.trigger()
+
+    def trigger(self):
+        if self.busy or not self.field(0, 1):
+            return
+        self.busy = True
+        treq = self.field(15, 6)
+        if treq == DMA_TREQ_PERMANENT:
+            self.transfer()
+        elif DMA_TREQ_PWM_WRAP0 <= treq < DMA_TREQ_PWM_WRAP0 + 8:
+            self.slice = treq - DMA_TREQ_PWM_WRAP0
+            self.board.pwm_pace(self)
+        else:
+            raise NotImplementedError("DMA TREQ %d" % treq)
+
+    def abort(self):
+        self.busy = False
+        self.block += 1
+        if self in self.board.pwm_waiting:
+            self.board.pwm_waiting.remove(self)
+
+    def start(self, first, period):
+        # paced by the PWM, the first transfer at 'first' and one per wrap
+        self.blocks.append((first, self.regs["read"]))
+        end = first + (self.regs["count"] - 1) * period
+        self.board.clock.at(end, self.transfer, self.block)
+
+    def advance(self, addr, inc, ring, n):
+        # address after 'n' transfers, wrapping in the ring if it applies
+        if not inc:
+            return addr
+        step = n << self.field(2, 2)
+        bits = self.field(6, 4)
+        if not ring or not bits:
+            return (addr + step) & MASK32
+        mask = _mask(bits)
+        return (addr & ~mask) | ((addr + step) & mask)
+
+    def transfer(self, block=None):
+        # move the whole block, then chain. Without a write increment only
+        # the last value would be left, so just that one is moved
+        if block is not None and block != self.block:
+            return
+        regs = self.regs
+        inc_read, inc_write = self.field(4, 1), self.field(5, 1)
+        ring_write = self.field(10, 1)
+        n = regs["count"]
+        if n and not inc_write:
+            regs["read"] = self.advance(regs["read"], inc_read, not ring_write, n - 1)
+            n = 1
+        for i in range(n):
+            value = self.board.read32(regs["read"] & ~3)
+            self.board.write32(regs["write"] & ~3, value)
+            regs["read"] = self.advance(regs["read"], inc_read, not ring_write, 1)
+            regs["write"] = self.advance(regs["write"], inc_write, ring_write, 1)
+        self.busy = False
+
+        chain = self.field(11, 4)
+        if chain != self.index:
+            self.board.dma[chain].trigger()
+
+
+class Board:
+    def __init__(self, hz=125_000_000):
+        self.clock = Clock(hz)
+        self.gpio = GPIO(self)
+        self.pio = [PIO(self, 0, PIO0_BASE), PIO(self, 1, PIO1_BASE)]
+        self.memory = {}
+
+        self.dma = [DMAChannel(self, i) for i in range(DMA_CHANNELS)]
+        self.dma_claimed = set()
+        self.pwm_started = [None] * 8     # when each slice was enabled
+        self.pwm_waiting = []             # DMA channels paced by a stopped slice
+        self.buffers = []                 # (address, buffer), see 'addressof()'
+        self.buffers_end = SRAM_BUFFERS
+
+        # CPU interrupt entry latency, for the IRQ handlers
+        self.irq_latency = 15e-6
+        self.irq_jitter = 5e-6
+        self.random = random.Random(0)
+
+        self.irq_enabled = True
+
+    def state_machines(self):
+        return self.pio[0].sm + self.pio[1].sm
+
+    def wake(self):
+        for pio in self.pio:
+            for sm in pio.sm:
+                if sm.blocked:
+                    sm.wake()
+
+    def cpu_irq(self, pio, flag):
+        latency = self.irq_latency + \
+                self.random.uniform(-self.irq_jitter, self.irq_jitter)
+        when = self.clock.now + self.clock.ticks(max(0.0, latency))
+        self.clock.at(when, self._dispatch, pio, flag)
+
+    def _dispatch(self, pio, flag):
+        bit = 1 << flag
+        if not pio.irq_flags & bit or flag not in pio.handlers:
+            return
+        handler, sm = pio.handlers[flag]
+        handler(sm)
+        pio.clear_irq(bit)
+
+    def addressof(self, buf):
+        # a fixed, made-up SRAM address for a buffer, so that DMA (and the
+        # 'uctypes' shim) reach its contents through 'read32()'/'write32()'
+        for addr, b in self.buffers:
+            if b is buf:
+                return addr
+        addr = self.buffers_end
+        self.buffers_end = (addr + memoryview(buf).nbytes + 7) & ~7
+        self.buffers.append((addr, buf))
+        return addr
+
+    def buffer_at(self, addr):
+        # (bytes view, offset) of the buffer holding 'addr', or (None, 0)
+        for base, buf in self.buffers:
+            view = memoryview(buf).cast("B")
+            if base <= addr <= base + len(view) - 4:
+                return view, addr - base
+        return None, 0
+
+    def dma_claim(self):
+        for ch in self.dma:
+            if ch.index not in self.dma_claimed:
+                self.dma_claimed.add(ch.index)
+                return ch
+        raise OSError("no DMA channels free")
+
+    def pwm_period(self, slice):
+        # sub-ticks between wraps of a slice, DIV is 8.4 fixed point
+        regs = PWM_BASE + (slice * PWM_STRIDE)
+        top = self.memory.get(regs + PWM_TOP, 0xffff) & 0xffff
+        div = self.memory.get(regs + PWM_DIV, 1 << 4) & 0xfff
+        return ((top + 1) * div * SUB) >> 4
+
+    def pwm_pace(self, ch):
+        # start a block on the slice's next wrap, once it is running
+        started = self.pwm_started[ch.slice]
+        if started is None:
+            self.pwm_waiting.append(ch)
+            return
+        period = self.pwm_period(ch.slice)
+        wraps = (self.clock.now - started) // period + 1
+        ch.start(started + wraps * period, period)
+
+    def pwm_enable(self, old, new):
+        for slice in range(8):
+            bit = 1 << slice
+            if new & bit and not old & bit:
+                self.pwm_started[slice] = self.clock.now
+                waiting = [ch for ch in self.pwm_waiting if ch.slice == slice]
+                for ch in waiting:
+                    self.pwm_waiting.remove(ch)
+                    self.pwm_pace(ch)
+            elif old & bit and not new & bit:
+                # the pending blocks stall, and restart on the next enable
+                self.pwm_started[slice] = None
+                for ch in self.dma:
+                    if ch.busy and ch.slice == slice and ch not in self.pwm_waiting:
+                        ch.block += 1
+                        self.pwm_waiting.append(ch)
+
+    def alias(self, addr):
+        # (register address, alias) - reads through an alias are plain reads
+        if PERIPH_BASE <= addr < PERIPH_END:
+            return (addr & ~0x3000, addr & 0x3000)
+        return (addr, 0)
+
+    def pio_for(self, addr):
+        for pio in self.pio:
+            if pio.base <= addr < pio.base + 0x1000:
+                return pio
+        return None
+
+    def sm_for(self, addr):
+        # StateMachine owning a register address, ie. from a SMx_EXECCTRL
+        addr = self.alias(addr)[0]
+        pio = self.pio_for(addr)
+        o = addr - pio.base - SM0_CLKDIV
+        return pio.sm[o // SM_STRIDE]
+
+    def read32(self, addr):
+        addr = self.alias(addr)[0]
+        pio = self.pio_for(addr)
+        if pio:
+            return pio.read((addr - pio.base) & ~0x3)
+        if DMA_BASE <= addr < DMA_BASE + (DMA_CHANNELS * DMA_STRIDE):
+            o = addr - DMA_BASE
+            return self.dma[o // DMA_STRIDE].read(o % DMA_STRIDE)
+        view, o = self.buffer_at(addr)
+        if view:
+            return int.from_bytes(view[o:o + 4], "little")
+        if addr == SIO_CPUID:
+            return 0
+        if addr == SYST_CVR and self.memory.get(SYST_CSR, 0) & 1:
+            # SysTick, counting down at the CPU clock
+            reload = self.memory.get(SYST_RVR, 0) & 0xffffff
+            cycles = int(self.clock.seconds() * self.clock.hz)
+            return reload - (cycles % (reload + 1))
+        return self.memory.get(addr, 0)
+
+    def write32(self, addr, value):
+        value &= MASK32
+        addr, op = self.alias(addr)
+        pio = self.pio_for(addr)
+        if pio:
+            pio.write((addr - pio.base) & ~0x3, value, op)
+            return
+        if DMA_BASE <= addr < DMA_BASE + (DMA_CHANNELS * DMA_STRIDE):
+            o = addr - DMA_BASE
+            ch = self.dma[o // DMA_STRIDE]
+            ch.write(o % DMA_STRIDE, atomic(ch.read(o % DMA_STRIDE), value, op))
+            return
+        view, o = self.buffer_at(addr)
+        if view:
+            view[o:o + 4] = value.to_bytes(4, "little")
+            return
+        old = self.memory.get(addr, 0)
+        self.memory[addr] = atomic(old, value, op)
+        if addr == PWM_EN:
+            self.pwm_enable(old, self.memory[addr])
+
+
+board = Board()
+
+
+def reset(hz=125_000_000):
+    # Fresh board, ie. between automated test runs
+    global board
+    board = Board(hz)
+    return board
+
+
+# --- models for '@micropython.asm_thumb' functions, keyed by name
+#
+# The Thumb code cannot run on the host, so a model reproduces its effect
+# using the registers/constants recorded from the assembly listing.
+
+def _abort_signal(func):
+    # any 'str' after 'label(abort)' signals completion, as (address, value)
+    # from the table word it loaded and the preceding 'mov'
+    listing = func.listing
+    for i, (op, args) in enumerate(listing):
+        if op == "label" and args[0] == "abort":
+            tail = listing[i:]
+            break
+    else:
+        return None
+
+    addr = value = None
+    for op, args in tail:
+        if op == "ldr" and args[1][0] == "r7":
+            addr = func.data[args[1][1] // 4]
+        if op == "mov" and isinstance(args[1], int):
+            value = args[1]
+        if op == "str":
+            return (addr, value)
+    return None
+
+
+def _trigger_count(func):
+    # 'str's before 'label(abort)', other than to the table (diagnostics)
+    count = 0
+    for op, args in func.listing:
+        if op == "label" and args[0] == "abort":
+            break
+        if op == "str" and args[1][0] != "r7":
+            count += 1
+    return count
+
+
+def _table(func):
+    # the table words, at a made-up address, as 'mem32' sees them
+    if not hasattr(func, "table"):
+        func.table = 0x20030000 + (id(func) & 0xff00)
+        for i, w in enumerate(func.data):
+            board.write32(func.table + (4 * i), w)
+    return func.table
+
+
+def _precision_handler(func, sm):
+    table = _table(func)
+    if sm == 1:
+        return table
+
+    words = [board.read32(table + (4 * i)) for i in range(len(func.data))]
+    if len(words) > 14:
+        # SysTick at entry
+        board.write32(table + 0x38, board.read32(words[13]))
+    sm0_exec, sm1_exec = words[0], words[1]
+    done = _abort_signal(func)
+    triggers = [(words[2 + 2 * i], words[3 + 2 * i]) \
+                    for i in range(_trigger_count(func))]
+
+    def signal():
+        if done:
+            board.write32(*done)
+
+    # phase, from where SM-1 has stopped
+    top = (board.read32(sm1_exec) >> 12) & 0x1f
+    r0 = board.read32(sm1_exec + 8) - (top - 10)
+    if r0 > 10 or r0 <= 0:
+        signal()
+        return r0
+    r0 <<= 1
+
+    # did we enter IRQ handler too late?
+    base = ((board.read32(sm0_exec) >> 7) & 0x1f) + 1
+    if board.read32(sm0_exec + 8) < base + 6:
+        signal()
+        return r0
+
+    def fire():
+        for addr, mask in triggers:
+            board.write32(addr, mask)
+        if len(words) > 12:
+            # diagnostics, always as Flow-1 - the model has no flow timing
+            board.write32(table + 0x28, 0x1c)
+            board.write32(table + 0x2c, base + 1)
+            board.write32(table + 0x30, r0 + words[7])
+        if len(words) > 15:
+            # SysTick just after the triggers
+            board.write32(table + 0x3c, board.read32(words[13]))
+        signal()
+
+    # the correction nops which the jump into the sled does not skip, by
+    # Flow-1's correction (2 x (3 + cycles earlier)) as above
+    late = (6 - (words[7] // 2)) * SUB
+    def aligned():
+        board.clock.at(board.clock.now + late, fire)
+
+    # ISR spins until SM-0 loops back around, then starts the others
+    board.sm_for(sm0_exec).watch(base, aligned)
+    return r0
+
+
+def _sync_sm(func, r0, r1):
+    board.write32(r0, 0xf00)
+    board.write32(r1, 0xf00)
+
+
+thumb_models = {
+    "precision_handler": _precision_handler,
+    "sync_sm": _sync_sm,
+}
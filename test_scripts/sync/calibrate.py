@@ -0,0 +1,192 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Calibration sweep for the precision trigger in 'pico-irig.py'. Runs many
+# trigger cycles from a 1PPS, restarting SM-0 at a random time for each so
+# that the handler sees every flow/phase, and measures the delay from the
+# PPS edge to the start of 'regen_1hz' (started by trigger 1, on GPIO6).
+#
+# The delay is counted by two StateMachines at the CPU clock, sampling 1
+# cycle apart - so together they resolve the edge to 1 cycle (8.3ns). With
+# the flow and phase left by the handler, the per-flow corrections are fitted
+# (see 'libs/trigger_cal.py') and saved for 'pico-irig.py' to load.
+#
+# The StateMachines are placed by 'libs/pio_loader.py', and the handler's
+# table is written to match - so it does not depend on the layout which
+# 'pico-irig.py' uses.
+#
+# MIT license - go make something cool....
+#
+# On the Pico, with 'pico-irig.py', 'precision.py' and 'libs/' copied over:
+# $ mpremote run calibrate.py
+#
+# settings (edit here)
+
+TRIALS = 200
+VERIFY = True                   # sweep again, with the corrections applied
+CAL_FILE = "trigger_cal.txt"
+trigger_rtc = False             # else a (fake) PPS driven from GPIO18
+
+import rp2
+import utime
+from random import random
+from machine import Pin, mem32, freq, I2C
+
+from libs.ds3231 import DS3231
+from libs.pio_loader import PIOLoader, PIO_IRQ_FORCE, PIO_IRQ_DONE, \
+                wait_for
+from libs.trigger_cal import TriggerCal, table, set_corrections, \
+                corrections, last_flow, save
+from precision import regen_1hz
+
+try:
+    irig = __import__("pico_irig")
+except ImportError:
+    irig = __import__("pico-irig")
+
+cpu_freq = irig.cpu_freq
+MEAS = ("meas_a", "meas_b")     # Y=0/1, sampling 1 cycle apart
+
+
+@rp2.asm_pio(in_shiftdir=rp2.PIO.SHIFT_LEFT, autopush=True, push_thresh=32,
+             fifo_join=rp2.PIO.JOIN_RX)
+
+def edge_delay():
+    wrap_target()
+    mov(x, invert(null))
+    wait(0, pin, 0)
+    wait(1, pin, 0)                 # PPS edge
+    jmp(not_y, "count")
+    nop()                           # Y=1, sample 1 cycle later
+    label("count")
+    jmp(pin, "done")                # 2 cycles per count
+    jmp(x_dec, "count")
+    label("done")
+    in_(x, 32)
+    wrap()
+
+
+@rp2.asm_pio()
+
+def idle():
+    wrap_target()
+    nop()
+    wrap()
+
+
+def delay(a, b):
+    # cycles from the PPS edge to the output, from the two counts
+    ca = 2 + 2 * (0xffffffff - a)
+    cb = 3 + 2 * (0xffffffff - b)
+    return min(ca, cb)
+
+
+def sweep(cal, trials, loader, addr, sm0_args, meas):
+    pps = Pin(18, Pin.IN, Pin.PULL_UP)
+    sync_ctrl, sync_run = loader.ctrl(["counter", "phase"])
+    meas_ctrl, meas_run = loader.ctrl(MEAS)
+    for t in range(trials):
+        # output stopped (and low), the counters running
+        mem32[meas_ctrl] = meas_run
+        rp2.StateMachine(loader.index("regen"), regen_1hz, freq=12_000, \
+                    set_base=Pin(6))
+        for sm in meas:
+            while sm.rx_fifo():
+                sm.get()
+
+        if trigger_rtc:
+            wait_for(lambda: pps.value() == 0, 1100)
+
+        # SM-0 restarted at a random point, for a different flow/phase
+        utime.sleep(random() * 0.01)
+        sm0 = rp2.StateMachine(loader.index("counter"), irig.precision_12k, \
+                    **sm0_args)
+        sm0.irq(handler=irig.precision_handler, hard=True)
+        mem32[sync_ctrl] = sync_run
+
+        if not trigger_rtc:
+            pps = Pin(18, Pin.OUT, value=0)
+            utime.sleep(0.01)
+            pps = Pin(18, Pin.IN, Pin.PULL_UP)
+
+        ok = wait_for(lambda: meas[0].rx_fifo() and meas[1].rx_fifo(), 1100)
+        flow = last_flow(addr)
+        mem32[sync_ctrl] = 0
+        if not ok or flow is None:
+            cal.lost += 1
+            continue
+        cal.add(delay(meas[0].get(), meas[1].get()), flow[0], flow[1])
+
+
+def setup():
+    # (loader, table address, SM-0 arguments, counter SMs), with the handler's
+    # table written to match where the StateMachines were placed
+    if freq() != cpu_freq:
+        freq(cpu_freq)
+
+    # as 'pico-irig.py', 'idle' takes the place of the FIFO (trigger 2)
+    loader = PIOLoader()
+    sm0_args = {"freq": cpu_freq // 10, "set_base": Pin(8)}
+    loader.add("sync", "counter", irig.precision_12k, **sm0_args)
+    loader.add("sync", "phase", irig.start_from_pin_rising, cpu_freq, \
+                set_base=Pin(7), sideset_base=Pin(7), in_base=Pin(18), \
+                jmp_pin=Pin(8))
+    loader.add("sync", "idle", idle, cpu_freq)
+
+    # output started by trigger 1, with the counters which it leaves running
+    loader.add("output", "regen", regen_1hz, 12_000, set_base=Pin(6))
+    for name in MEAS:
+        loader.add("output", name, edge_delay, cpu_freq, \
+                in_base=Pin(18), jmp_pin=Pin(6))
+    loader.reserve_irq("counter", PIO_IRQ_DONE)
+    loader.plan()
+    loader.report()
+    loader.load()
+
+    meas = []
+    for y, name in enumerate(MEAS):
+        sm = loader.sm(name)
+        sm.exec("set(y, %d)" % y)
+        meas.append(sm)
+
+    # the handler's triggers for this layout
+    addr = table(irig.precision_handler)
+    words = loader.handler_table("counter", "phase", \
+                loader.ctrl(["regen"] + list(MEAS), restart=["regen"]), \
+                loader.ctrl(["counter", "phase", "idle"], restart=["idle"]), \
+                loader.pio_reg("counter", PIO_IRQ_FORCE))
+    for i, w in enumerate(words):
+        mem32[addr + (4 * i)] = w
+    return loader, addr, sm0_args, meas
+
+
+if __name__ == "__main__":
+    if trigger_rtc:
+        ds = DS3231(I2C(0, sda=Pin(16), scl=Pin(17)))
+        ds.square_wave(freq=ds.FREQ_1)
+
+    loader, addr, sm0_args, meas = setup()
+    set_corrections(addr, [0, 0, 0])
+    cal = TriggerCal(cpu_freq)
+    print("Sweeping %d triggers..." % TRIALS)
+    sweep(cal, TRIALS, loader, addr, sm0_args, meas)
+    fitted = cal.fit()
+    cal.report(fitted)
+    if fitted is None:
+        raise SystemExit
+
+    # the corrected delay, for placing the reference pulses
+    save(CAL_FILE, cpu_freq, fitted, int(round(cal.target)))
+    print("Saved to '%s'" % CAL_FILE)
+
+    if VERIFY:
+        set_corrections(addr, fitted)
+        check = TriggerCal(cpu_freq)
+        print("Verifying with %s..." % corrections(addr))
+        sweep(check, TRIALS, loader, addr, sm0_args, meas)
+        for f in range(1, 6):
+            s = check.flows[f]
+            if s.count:
+                print("Flow-%d: %9.2f cycles mean, %d..%d" % (f, s.mean, s.min, s.max))
@@ -0,0 +1,88 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Check the "what time is it now" clock ('libs/irig_clock.py'). SysTick is
+# stamped as the handler would at the trigger, then the clock is queried after
+# random sleeps (some longer than SysTick's 140ms wrap, and across frames and
+# midnight) and compared with the time since the stamp - from the virtual
+# clock on the host, or 'ticks_us()' on the Pico (so there to ~2us). One more
+# query follows a gap of 20 minutes, past the 2^29 us reach of 'ticks_diff()',
+# with the clock updated once per frame meanwhile (as the frame loop does).
+# Then the cost of a query is timed, and the heap it uses.
+#
+# MIT license - go make something cool....
+#
+# On the Pico, with 'libs/' copied over:
+# $ mpremote run clock_check.py
+#
+# or on the host, with the shim:
+# $ python3 ../shim/run_virtual.py clock_check.py -p ../.. -s 120
+
+import gc
+import utime
+from array import array
+from machine import mem32
+from random import random
+
+from libs.irig_clock import IrigClock, TRIGGER_STAMP
+from libs.trigger_window import SYST_CVR
+
+try:
+    import vpico
+    virtual = vpico.board.clock
+except ImportError:
+    virtual = None
+
+CPU_FREQ = 125000000 if virtual else 120000000
+START = 86400 * 20454 - 5               # 5s before a midnight
+QUERIES = 200
+GAP_S = 1200
+
+fails = 0
+for irig_freq in (1000, 10000):
+    clock = IrigClock(CPU_FREQ, irig_freq, START)
+    stamp = mem32[SYST_CVR]
+    stamp_us = utime.ticks_us()
+    t0 = virtual.seconds() if virtual else 0
+    clock.start(stamp, stamp_us)
+    worst = 0
+    result = array("i", [0, 0, 0])
+    for n in range(QUERIES + 1):
+        if n < QUERIES:
+            utime.sleep_ms(int(random() * (400 if n % 4 else 20)))
+        else:
+            for f in range(GAP_S * clock.rate):
+                utime.sleep_ms(1000 // clock.rate)
+                clock.update()
+        clock.now(result)
+        if virtual:
+            elapsed_ns = int((virtual.seconds() - t0) * 1e9)
+        else:
+            elapsed_ns = utime.ticks_diff(utime.ticks_us(), stamp_us) * 1000
+        got_ns = (((result[0] * 86400) + result[1] - START) * 1000000000) + \
+                result[2]
+        # the first frame started TRIGGER_STAMP cycles before the stamp
+        err = got_ns - elapsed_ns - (TRIGGER_STAMP * 1000 // (CPU_FREQ // 1000000))
+        worst = max(worst, abs(err))
+        if abs(err) > (10 if virtual else 5000):
+            fails += 1
+            if fails < 10:
+                print("MISMATCH %s: %d ns" % (clock, err))
+    print("IRIG %dHz: %d queries over %s, worst %d ns" % \
+            (irig_freq, QUERIES + 1, clock, worst))
+
+    # cost, and heap, of a query
+    gc.collect()
+    before = gc.mem_alloc()
+    start = utime.ticks_us()
+    for n in range(1000):
+        clock.now(result)
+    took = utime.ticks_diff(utime.ticks_us(), start)
+    alloc = gc.mem_alloc() - before
+    frame, symbol, enc = clock.symbol()
+    print("  now(): %d us/query, %d bytes/query, frame %d symbol %d clock %d" % \
+            (took // 1000, alloc // 1000, frame, symbol, enc))
+
+print("%d failure(s)" % fails)
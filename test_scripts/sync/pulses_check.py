@@ -0,0 +1,67 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Check the reference pulses ('libs/pulses.py'): primed for a PPS edge at a
+# known time, started 'LATENCY' cycles later (as trigger 1 would be), and
+# every rising edge compared with the on-time marks. The CPU clock is scaled
+# down, as the virtual board is too slow for a 12MHz StateMachine.
+#
+# MIT license - go make something cool....
+#
+# Host only, as the edges are traced on the virtual clock:
+# $ python3 ../shim/run_virtual.py pulses_check.py -p ../.. -s 8
+
+import rp2
+import utime
+import vpico
+from machine import Pin, mem32
+
+from libs.pio_loader import PIO_BASE, PIO_CTRL
+from libs.pulses import Pulses, pulse_gen, PULSE_DIV, PULSE_PPS, PULSE_10PPS, \
+                PULSE_PPM
+
+CPU_FREQ = 1000000              # SM at 100KHz, ie. 10us resolution
+LATENCY = 83                    # cycles, PPS edge to trigger 1
+PIN = 9
+START = 1735689600 - 2          # UTC of the PPS edge, 2s before a minute
+
+clock = vpico.board.clock
+gpio = vpico.board.gpio
+
+edges = []
+def trace(seconds, pin, level):
+    if pin == PIN and level:
+        edges.append(seconds)
+gpio.trace = trace
+
+fails = 0
+for name, period_ms, width_ms, run in (("1PPS", PULSE_PPS, 10, 2.5), \
+            ("10PPS", PULSE_10PPS, 10, 0.75), ("1PPM", PULSE_PPM, 100, 2.5)):
+    sm = rp2.StateMachine(7, pulse_gen, freq=CPU_FREQ // PULSE_DIV, \
+                sideset_base=Pin(PIN))
+    pulses = Pulses(sm, CPU_FREQ, period_ms, width_ms, LATENCY)
+    delay = pulses.prime(START, 0, 1)
+
+    # PPS edge on a whole SM clock, then trigger 1 (enable and restart)
+    pps = clock.seconds() + 0.01
+    pps -= pps % (PULSE_DIV / CPU_FREQ)
+    utime.sleep(pps + (LATENCY / CPU_FREQ) - clock.seconds())
+    del edges[:]
+    mem32[PIO_BASE[1] + PIO_CTRL] = 0x808
+    utime.sleep(run)
+    mem32[PIO_BASE[1] + PIO_CTRL] = 0x000
+
+    # on-time marks, whole periods of UTC after the PPS edge
+    first = (-(START * 1000) % period_ms) or period_ms
+    want = [pps + (first + n * period_ms) / 1000 for n in range(len(edges))]
+    error = [(e - w) * 1e6 for e, w in zip(edges, want)]
+    res = PULSE_DIV * 1e6 / CPU_FREQ
+    bad = [e for e in error if abs(e) > res]
+    fails += len(bad) + (0 if edges else 1)
+    print("%-5s %d edge(s), first in %d us, error %s us (%.0f us resolution)" % \
+            (name, len(edges), delay * res, \
+            "%.1f..%.1f" % (min(error), max(error)) if error else "-", res))
+
+print("%d failure(s)" % fails)
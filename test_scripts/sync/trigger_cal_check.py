@@ -0,0 +1,73 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Check that the per-flow corrections ('libs/trigger_cal.py') move the
+# precision trigger. The same correction is written for every flow, from
+# -3 to +3 cycles, and a few triggers are measured for each as 'calibrate.py'
+# does - the delay from the PPS edge to the output should be the uncorrected
+# delay less the correction, flow by flow. Corrections outside +/-3 cycles
+# should be refused.
+#
+# MIT license - go make something cool....
+#
+# On the Pico, with 'pico-irig.py', 'precision.py', 'calibrate.py' and
+# 'libs/' copied over:
+# $ mpremote run trigger_cal_check.py
+#
+# or on the host, with the shim:
+# $ python3 ../shim/run_virtual.py trigger_cal_check.py -p ../.. -s 60
+
+from libs.trigger_cal import TriggerCal, CAL_PAD, set_corrections, corrections
+from calibrate import setup, sweep, cpu_freq
+
+try:
+    import vpico
+    virtual = True
+except ImportError:
+    virtual = False
+
+TRIALS = 5 if virtual else 50
+TOLERANCE = 0 if virtual else 0.5   # cycles, of a flow's mean delay
+
+fails = 0
+loader, addr, sm0_args, meas = setup()
+
+delays = {}
+for c in [0] + [c for c in range(-CAL_PAD, CAL_PAD + 1) if c]:
+    set_corrections(addr, [c] * 3)
+    if corrections(addr) != [c] * 3:
+        print("FAIL: corrections read back as %s" % corrections(addr))
+        fails += 1
+    cal = TriggerCal(cpu_freq)
+    sweep(cal, TRIALS, loader, addr, sm0_args, meas)
+    for f in range(1, 6):
+        s = cal.flows[f]
+        if not s.count:
+            continue
+        if c == 0:
+            delays[f] = s.mean
+            print("Flow-%d: %d trials, %.2f cycles uncorrected" % (f, s.count, s.mean))
+            continue
+        if f not in delays:
+            continue
+        moved = delays[f] - s.mean
+        print("Flow-%d: %d trials, correction %+d, %+.2f cycles earlier" % \
+                (f, s.count, c, moved))
+        if abs(moved - c) > TOLERANCE:
+            print("FAIL: Flow-%d moved %+.2f cycles, not %+d" % (f, moved, c))
+            fails += 1
+    if cal.lost:
+        print("FAIL: %d trials without a measurement" % cal.lost)
+        fails += 1
+
+for c in (-CAL_PAD - 1, CAL_PAD + 1):
+    try:
+        set_corrections(addr, [c, 0, 0])
+        print("FAIL: correction %+d accepted" % c)
+        fails += 1
+    except ValueError as e:
+        print("Correction %+d refused: %s" % (c, e))
+
+print("%d failure(s)" % fails)
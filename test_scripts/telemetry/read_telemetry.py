@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+#
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Host reader for the binary telemetry from 'libs/telemetry.py' (with
+# 'irig_telemetry = True'). Reads the USB serial port (needs 'pyserial'), a
+# saved capture, or stdin - skipping any text in between - and writes the
+# records as CSV and/or prints running statistics. Event timestamps (from
+# 'libs/events.py', with 'irig_events = True') and heap records (from
+# 'libs/heap.py', with 'irig_gc_frame = True') are in the same stream. Time
+# service replies ('libs/time_service.py') are skipped, see 'time_client.py'.
+#
+# MIT license - go make something cool....
+#
+# $ python3 read_telemetry.py /dev/ttyACM0 --csv run.csv --stats 60
+# $ python3 read_telemetry.py capture.bin --csv -
+# $ python3 read_telemetry.py /dev/ttyACM0 --events events.csv
+# $ python3 read_telemetry.py /dev/ttyACM0 --heap heap.csv
+
+import argparse
+import os
+import struct
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+from libs.stats import Stats
+
+# must match 'libs/telemetry.py', 'libs/events.py', 'libs/heap.py' and
+# 'libs/time_service.py'
+KIND_FRAMES = 1
+KIND_EVENTS = 2
+KIND_HEAP = 3
+KIND_TIME = 4
+SYNC = b"\xa5\x5a"
+HEADER = struct.Struct("<2sBBHHI")
+RECORDS = {
+    KIND_FRAMES: struct.Struct("<IHHIi"),
+    KIND_EVENTS: struct.Struct("<IIHBB"),
+    KIND_HEAP: struct.Struct("<IIHH"),
+    KIND_TIME: struct.Struct("<8sHIIHII"),
+}
+PPS_NONE = -0x80000000
+EVENT_LOST = 0x01
+
+FIELDS = ("frame", "slack_us", "underflows", "phase_us", "pps_us")
+EVENT_FIELDS = ("frame", "offset_ns", "seq", "pin", "flags")
+HEAP_FIELDS = ("frame", "free", "collect_us", "alloc")
+
+
+def line(stats, name, unit="us"):
+    # one line summary of a 'Stats'
+    if not stats.count:
+        return "%-10s -" % name
+    return "%-10s %9.1f mean %9.1f sigma %9d min %9d max %s" % \
+            (name, stats.mean, stats.sigma(), stats.min, stats.max, unit)
+
+
+def batches(read):
+    # Yield (header, [records]) from a byte source 'read(n)', resyncing on
+    # SYNC and dropping batches with a bad checksum or unknown kind
+    buf = b""
+    bad = 0
+    while True:
+        i = buf.find(SYNC)
+        if i < 0 or len(buf) - i < HEADER.size:
+            # keep a possible partial SYNC/header, and read more
+            buf = buf[-1:] if i < 0 else buf[i:]
+            data = read(4096)
+            if not data:
+                return
+            buf += data
+            continue
+        buf = buf[i:]
+
+        sync, kind, count, dropped, check, write_us = HEADER.unpack_from(buf)
+        record = RECORDS.get(kind)
+        if record is None or count == 0:
+            buf = buf[1:]
+            continue
+        size = HEADER.size + count * record.size
+        while len(buf) < size:
+            data = read(4096)
+            if not data:
+                return
+            buf += data
+
+        body = buf[HEADER.size:size]
+        if sum(body) & 0xffff != check:
+            bad += 1
+            buf = buf[1:]
+            continue
+        buf = buf[size:]
+
+        records = [record.unpack_from(body, n * record.size) for n in range(count)]
+        yield ({"kind": kind, "dropped": dropped, "write_us": write_us, "bad": bad}, records)
+
+
+def open_source(name, baud):
+    if name == "-":
+        return sys.stdin.buffer.read, None
+    if name.startswith("/dev/") or name.upper().startswith("COM"):
+        import serial
+        port = serial.Serial(name, baud, timeout=None)
+        return (lambda n: port.read(max(1, min(n, port.in_waiting)))), port
+    f = open(name, "rb")
+    return f.read, f
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode pico-irig binary telemetry")
+    parser.add_argument("source", help="Serial port (ie. /dev/ttyACM0), capture file, or '-' for stdin")
+    parser.add_argument("--baud", type=int, default=115200, help="Serial baud rate (ignored by USB CDC)")
+    parser.add_argument("--csv", help="Write records as CSV to file, or '-' for stdout")
+    parser.add_argument("--events", help="Write event timestamps as CSV to file, or '-' for stdout")
+    parser.add_argument("--heap", help="Write heap records as CSV to file, or '-' for stdout")
+    parser.add_argument("--stats", type=int, default=0, help="Print statistics every N frames. Default only at end")
+    parser.add_argument("--frame", type=float, default=1.0, help="Frame period (s), for the write CPU share. Default 1 (IRIG-B)")
+    args = parser.parse_args()
+
+    read, handle = open_source(args.source, args.baud)
+    out = None
+    if args.csv:
+        out = sys.stdout if args.csv == "-" else open(args.csv, "w")
+        out.write(",".join(FIELDS) + "\n")
+    events_out = None
+    if args.events:
+        events_out = sys.stdout if args.events == "-" else open(args.events, "w")
+        events_out.write(",".join(EVENT_FIELDS) + "\n")
+    heap_out = None
+    if args.heap:
+        heap_out = sys.stdout if args.heap == "-" else open(args.heap, "w")
+        heap_out.write(",".join(HEAP_FIELDS) + "\n")
+
+    slack = Stats()
+    phase = Stats()
+    pps = Stats()
+    write = Stats()
+    collect = Stats()
+    alloc = Stats()
+    free = Stats()
+    heap_allocating = 0
+    frames = underflows = dropped = bad = 0
+    events = events_lost = events_dropped = events_missing = 0
+    last = None
+    last_seq = None
+
+    def report():
+        print("Frames %d, underflows %d, batches dropped %d, bad %d, missing frames %d" % \
+                (frames, underflows, dropped, bad, missing), file=sys.stderr)
+        if events:
+            print("Events %d, missing %d, lost flags %d, batches dropped %d" % \
+                    (events, events_missing, events_lost, events_dropped), file=sys.stderr)
+        for s, name in ((slack, "slack"), (phase, "phase"), (pps, "pps"), (write, "write")):
+            print(line(s, name), file=sys.stderr)
+        if collect.count:
+            # the first frames (warming up) and those with reports allocate
+            print("Heap %d records, %d allocating" % (collect.count, heap_allocating), \
+                    file=sys.stderr)
+            print(line(collect, "collect"), file=sys.stderr)
+            print(line(alloc, "alloc", "bytes"), file=sys.stderr)
+            print(line(free, "free", "bytes"), file=sys.stderr)
+        if write.count:
+            # each batch is written once per 'batch' frames
+            period = args.frame * batch
+            print("Telemetry CPU: %.4f%% avg, %.4f%% max" % \
+                    (100 * write.mean * 1e-6 / period, 100 * write.max * 1e-6 / period), \
+                    file=sys.stderr)
+
+    missing = 0
+    batch = 1
+    try:
+        for header, records in batches(read):
+            bad = header["bad"]
+            if header["kind"] == KIND_EVENTS:
+                events_dropped = header["dropped"]
+                for r in records:
+                    if last_seq is not None:
+                        events_missing += (r[2] - last_seq - 1) & 0xffff
+                    last_seq = r[2]
+                    events += 1
+                    if r[4] & EVENT_LOST:
+                        events_lost += 1
+                    if events_out:
+                        events_out.write(",".join(["%d" % v for v in r]) + "\n")
+                continue
+            if header["kind"] == KIND_TIME:
+                continue
+            if header["kind"] == KIND_HEAP:
+                for r in records:
+                    free.add(r[1])
+                    collect.add(r[2])
+                    alloc.add(r[3])
+                    if r[3]:
+                        heap_allocating += 1
+                    if heap_out:
+                        heap_out.write(",".join(["%d" % v for v in r]) + "\n")
+                continue
+
+            dropped = header["dropped"]
+            batch = max(batch, len(records))
+            if header["write_us"]:
+                write.add(header["write_us"])
+            for r in records:
+                if last is not None and r[0] != last + 1:
+                    missing += r[0] - last - 1
+                last = r[0]
+                frames += 1
+                underflows = r[2]
+                slack.add(r[1])
+                phase.add(r[3])
+                if r[4] != PPS_NONE:
+                    pps.add(r[4])
+                if out:
+                    out.write(",".join(["%d" % v for v in r]) + "\n")
+                if args.stats and frames % args.stats == 0:
+                    report()
+    except KeyboardInterrupt:
+        pass
+
+    for f in (out, events_out, heap_out):
+        if f and f is not sys.stdout:
+            f.close()
+    if handle:
+        handle.close()
+    report()
@@ -0,0 +1,96 @@
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Check the time service ('libs/time_service.py') against the host client
+# ('time_client.py'). Queries stamped with the virtual clock are fed to the
+# service, mixed with user data lines and malformed queries, and the offset
+# the client estimates from each reply compared with the real one - the IRIG
+# time is the virtual clock plus a known offset. The virtual serial has no
+# latency, so the delay should be 0 and the offset exact to the CPU clock.
+# The last query follows a gap of 20 minutes (past the 2^29 us reach of
+# 'ticks_diff()'), with the clock updated once per frame as the frame loop
+# does.
+#
+# MIT license - go make something cool....
+#
+# Host only, as the serial is a buffer:
+# $ python3 ../shim/run_virtual.py time_check.py -p ../.. -s 60
+
+import io
+import utime
+import vpico
+from machine import mem32
+from random import random
+
+from libs.irig_clock import IrigClock, TRIGGER_STAMP
+from libs.time_service import TimeService
+from libs.trigger_window import SYST_CVR
+from libs.user_data import UserData
+from read_telemetry import batches, KIND_TIME
+from time_client import parse, offset_delay, NS
+
+CPU_FREQ = 125000000
+START = 86400 * 20454 - 5       # IRIG time of the trigger, 5s before a midnight
+QUERIES = 100
+GAP_S = 1200
+
+clock = vpico.board.clock
+virtual_ns = lambda: int(clock.seconds() * NS)
+
+irig = IrigClock(CPU_FREQ, 1000, START)
+t0 = virtual_ns()
+irig.start(mem32[SYST_CVR], utime.ticks_us())
+# device - host, the first frame started TRIGGER_STAMP cycles before
+true_offset = (START * NS) - t0 + (TRIGGER_STAMP * 1000 // (CPU_FREQ // 1000000))
+
+user = UserData()
+out = io.BytesIO()
+service = TimeService(irig, stream=io.BytesIO(), out=out, other=user.feed)
+
+fails = 0
+worst = 0
+sent = {}
+for n in range(QUERIES + 1):
+    if n < QUERIES:
+        utime.sleep_ms(int(random() * 300))
+    else:
+        for f in range(GAP_S):
+            utime.sleep_ms(1000)
+            irig.update()
+    t1 = virtual_ns()
+    sent[t1] = True
+    line = b"?%016x\n" % t1
+    if n % 10 == 3:
+        line = b"1a2b\n" + line         # user data before
+    if n % 10 == 7:
+        line += b"?12zz34\n"            # malformed, skipped
+    service.stream = io.BytesIO(line)
+    service.poll()
+
+out.seek(0)
+replies = 0
+for header, records in batches(out.read):
+    if header["kind"] != KIND_TIME:
+        continue
+    for r in records:
+        t1, t2, t3 = parse(r)
+        if t1 not in sent:
+            fails += 1
+            continue
+        offset, delay = offset_delay(t1, t2, t3, t1)
+        err = offset - true_offset
+        worst = max(worst, abs(err))
+        replies += 1
+        if abs(err) > 10 or delay:
+            fails += 1
+            if fails < 10:
+                print("MISMATCH: offset error %d ns, delay %d ns" % (err, delay))
+
+fails += (QUERIES + 1 - replies) + abs(service.bad - (QUERIES // 10)) + \
+        abs(user.pending() - (QUERIES // 10))
+service.report()
+print("%d replies, offset error %d ns worst, %d user words passed on" % \
+        (replies, worst, user.pending()))
+print("%d failure(s)" % fails)
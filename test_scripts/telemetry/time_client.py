@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+#
+# Pico-Irig for Raspberry-Pi Pico
+# (c) 2026 Simon Wood <simon@mungewell.org>
+#
+# https://github.com/mungewell/pico-irig
+#
+# Host client for the time service on the USB serial ('libs/time_service.py',
+# with 'irig_time_service = True'), for the IRIG time of the generator without
+# decoding its audio. As NTP, each query gives four timestamps:
+#   t1 host sends the query, t2 device receives it,
+#   t3 device sends the reply, t4 host receives it
+# from which the offset (device - host) and the round trip delay, less the
+# device's handling (t3 - t2), are estimated. The USB latency is not the same
+# each way, so the sample with the smallest delay is the best estimate.
+#
+# Can be used as a library:
+#   client = TimeClient("/dev/ttyACM0")
+#   best = client.sync(16)          # Sample, with .offset and .delay in ns
+#   irig_ns = time.time_ns() + best.offset
+#
+# MIT license - go make something cool....
+#
+# $ python3 time_client.py /dev/ttyACM0 --count 16
+
+import argparse
+import struct
+import sys
+import time
+
+from read_telemetry import batches, KIND_TIME, RECORDS
+
+DAY = 86400
+NS = 1000000000
+
+
+def device_ns(day, tod, ns):
+    # IRIG time from the reply's day/seconds/ns, as UTC ns
+    return (((day * DAY) + tod) * NS) + ns
+
+
+def offset_delay(t1, t2, t3, t4):
+    # NTP's offset and round trip delay, in the units of the timestamps
+    return ((t2 - t1) + (t3 - t4)) // 2, (t4 - t1) - (t3 - t2)
+
+
+class Sample:
+    def __init__(self, t1, t2, t3, t4):
+        self.t1, self.t2, self.t3, self.t4 = t1, t2, t3, t4
+        self.offset, self.delay = offset_delay(t1, t2, t3, t4)
+        self.handling = t3 - t2
+
+    def __str__(self):
+        return "offset %+.6f ms, delay %.3f ms, handling %.3f ms" % \
+                (self.offset / 1e6, self.delay / 1e6, self.handling / 1e6)
+
+
+def parse(record):
+    # (originate, t2, t3) from a reply record
+    originate = int.from_bytes(record[0], "big")
+    return originate, device_ns(*record[1:4]), device_ns(*record[4:7])
+
+
+class TimeClient:
+    def __init__(self, port, baud=115200, timeout=0.5, clock=time.time_ns):
+        if isinstance(port, str):
+            import serial
+            port = serial.Serial(port, baud, timeout=0.01)
+        self.port = port
+        self.timeout = timeout
+        self.clock = clock
+        self.lost = 0
+
+    def query(self):
+        # one Sample, or None if the reply was dropped/lost
+        deadline = time.monotonic() + self.timeout
+        last = [0]
+
+        def read(n):
+            while time.monotonic() < deadline:
+                data = self.port.read(max(1, min(n, self.port.in_waiting)))
+                if data:
+                    last[0] = self.clock()
+                    return data
+            return b""
+
+        self.port.reset_input_buffer()
+        t1 = self.clock()
+        self.port.write(b"?%016x\n" % t1)
+        self.port.flush()
+        for header, records in batches(read):
+            if header["kind"] != KIND_TIME:
+                continue
+            for r in records:
+                originate, t2, t3 = parse(r)
+                if originate == t1:
+                    return Sample(t1, t2, t3, last[0])
+        self.lost += 1
+        return None
+
+    def sync(self, count=8, interval=0.05):
+        # the best (smallest delay) of 'count' queries, or None
+        best = None
+        for n in range(count):
+            s = self.query()
+            if s and (best is None or s.delay < best.delay):
+                best = s
+            time.sleep(interval)
+        return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the pico-irig time service")
+    parser.add_argument("port", help="Serial port, ie. /dev/ttyACM0")
+    parser.add_argument("--count", "-c", type=int, default=16, help="Queries. Default 16")
+    parser.add_argument("--interval", "-i", type=float, default=0.05, help="Between queries (s). Default 0.05")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Print every sample")
+    args = parser.parse_args()
+
+    client = TimeClient(args.port)
+    samples = []
+    for n in range(args.count):
+        s = client.query()
+        if s:
+            samples.append(s)
+            if args.verbose:
+                print(s)
+        time.sleep(args.interval)
+    if not samples:
+        print("No replies, is 'irig_time_service = True'?", file=sys.stderr)
+        sys.exit(1)
+
+    best = min(samples, key=lambda s: s.delay)
+    offsets = sorted(s.offset for s in samples)
+    print("%d of %d replies, best %s" % (len(samples), args.count, best))
+    print("Offset median %+.6f ms, spread %.3f ms" % \
+            (offsets[len(offsets) // 2] / 1e6, (offsets[-1] - offsets[0]) / 1e6))
+    print("IRIG time now: %.6f" % ((time.time_ns() + best.offset) / 1e9))